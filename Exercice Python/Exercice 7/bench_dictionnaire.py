@@ -0,0 +1,120 @@
+"""
+MESURE : liste, set et dictionnaire.py
+======================================
+Sur une liste de mots (--mots fichier.txt, sinon --nombre mots inventés) :
+
+- chargement : lire le fichier en liste, en faire un set, construire
+  l'index (une seule fois) puis l'ouvrir avec mmap, construire l'index
+  de hachage
+- mémoire : allocations Python (tracemalloc) ; pour le fichier mappé, sa
+  taille sur disque (le système ne charge que les pages lues)
+- recherches par seconde, moitié de mots présents, moitié absents :
+  `in` sur la liste (parcours complet, peu de requêtes), `in` sur le set,
+  cherche() par bisect, cherche() avec l'index de hachage, cherche_lot(),
+  et prefixe()
+
+Ligne de commande :
+    python bench_dictionnaire.py --nombre 300000
+    python bench_dictionnaire.py --mots /usr/share/dict/french
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import dictionnaire
+
+LETTRES = "aaabcdeeeeéèfghiiijlmnnooprrsssttuuvz"
+
+
+def inventer(nombre, graine=1):
+    rng = random.Random(graine)
+    mots = set()
+    while len(mots) < nombre:
+        mots.add("".join(rng.choice(LETTRES) for _ in range(rng.randint(3, 14))))
+    return list(mots)
+
+
+def chrono(fonction):
+    debut = time.perf_counter()
+    resultat = fonction()
+    return resultat, time.perf_counter() - debut
+
+
+def memoire(fonction):
+    tracemalloc.start()
+    resultat = fonction()
+    octets = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return resultat, octets
+
+
+def debit(nom, requetes, fonction):
+    debut = time.perf_counter()
+    fonction(requetes)
+    duree = time.perf_counter() - debut
+    print(f"    {nom:<24}{len(requetes) / duree:>14,.0f} requêtes/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure de dictionnaire.py")
+    parser.add_argument("--mots", help="fichier texte, un mot par ligne")
+    parser.add_argument("--nombre", type=int, default=300000, help="mots inventés sans --mots")
+    parser.add_argument("--requetes", type=int, default=100000)
+    args = parser.parse_args()
+
+    dossier = tempfile.mkdtemp(prefix="dico_")
+    texte = args.mots
+    if texte is None:
+        texte = os.path.join(dossier, "mots.txt")
+        with open(texte, "w", encoding="utf-8") as fichier:
+            fichier.write("\n".join(inventer(args.nombre)) + "\n")
+    index = os.path.join(dossier, "mots.idx")
+
+    print("chargement")
+    liste, duree = chrono(lambda: dictionnaire.lire_liste(texte))
+    print(f"    {'liste':<24}{duree * 1000:>10.0f} ms")
+    ensemble, duree = chrono(lambda: set(liste))
+    print(f"    {'set (depuis la liste)':<24}{duree * 1000:>10.0f} ms")
+    nombre, duree = chrono(lambda: dictionnaire.construire(liste, index))
+    print(f"    {'construire l index':<24}{duree * 1000:>10.0f} ms   (une seule fois, {nombre} mots)")
+    dico, duree = chrono(lambda: dictionnaire.Dictionnaire.ouvrir(index))
+    print(f"    {'ouvrir (mmap)':<24}{duree * 1000:>10.2f} ms")
+    avec_table = dictionnaire.Dictionnaire.ouvrir(index)
+    _, duree = chrono(avec_table.indexer)
+    print(f"    {'index de hachage':<24}{duree * 1000:>10.0f} ms")
+
+    print("mémoire")
+    _, octets = memoire(lambda: dictionnaire.lire_liste(texte))
+    print(f"    {'liste':<24}{octets / 2**20:>10.1f} Mo")
+    _, octets = memoire(lambda: set(dictionnaire.lire_liste(texte)))
+    print(f"    {'set':<24}{octets / 2**20:>10.1f} Mo")
+    print(f"    {'index mmap (disque)':<24}{os.path.getsize(index) / 2**20:>10.1f} Mo")
+    table = dictionnaire.Dictionnaire.ouvrir(index)
+    _, octets = memoire(table.indexer)
+    print(f"    {'index de hachage':<24}{octets / 2**20:>10.1f} Mo")
+
+    rng = random.Random(2)
+    presents = rng.sample(liste, min(len(liste), args.requetes // 2))
+    absents = [mot + "q" for mot in presents]
+    requetes = presents + absents
+    rng.shuffle(requetes)
+    print("recherches")
+    debit("in liste", requetes[:200], lambda r: [m in liste for m in r])
+    debit("in set", requetes, lambda r: [m in ensemble for m in r])
+    debit("cherche (bisect)", requetes, lambda r: [dico.cherche(m) for m in r])
+    debit("cherche (hachage)", requetes, lambda r: [avec_table.cherche(m) for m in r])
+    debit("cherche_lot (bisect)", requetes, dico.cherche_lot)
+    debit("cherche_lot (hachage)", requetes, avec_table.cherche_lot)
+    prefixes = [mot[:3] for mot in presents[:10000]]
+    debit("prefixe (3 lettres)", prefixes, lambda r: [dico.prefixe(p, limite=20) for p in r])
+
+    for d in (dico, avec_table, table):
+        d.fermer()
+
+
+if __name__ == "__main__":
+    main()
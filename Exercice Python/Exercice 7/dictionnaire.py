@@ -0,0 +1,272 @@
+"""
+DICTIONNAIRE DE MOTS
+====================
+La recherche dichotomique de EX5.py, pour une vraie liste de mots
+(des centaines de milliers) : la liste est triée une seule fois, écrite
+dans un fichier index, puis relue sans copie avec mmap.
+
+Fichier index (construire()) :
+    en-tête   "MOTSIDX1" + nombre de mots (8 octets)
+    décalages nombre + 1 entiers de 4 octets : début de chaque mot
+    mots      tous les mots en UTF-8, collés, triés par octets
+Le tri par octets UTF-8 est le même que le tri des str de Python.
+
+Dictionnaire :
+- cherche(mot), `mot in dico` : bisect sur les mots du fichier (l'index
+  n'est jamais chargé en entier, seules les pages lues sont en mémoire)
+- prefixe(debut), intervalle(de, a) : tous les mots d'une tranche, avec
+  deux bisect
+- indexer() : index de hachage optionnel (un tableau d'entiers, adresses
+  ouvertes), une recherche exacte ne coûte plus qu'une ou deux lectures
+- cherche_lot(mots) : plusieurs mots d'un coup, parcourus dans l'ordre
+  du fichier
+
+Ligne de commande :
+    python dictionnaire.py construire mots.txt mots.idx
+    python dictionnaire.py chercher mots.idx bonjour
+    python dictionnaire.py prefixe mots.idx bon
+"""
+
+import bisect
+import mmap
+import struct
+import sys
+from array import array
+
+MAGIC = b"MOTSIDX1"
+ENTETE = struct.Struct("<8sQ")
+DECALAGE = "I"   # 4 octets : tous les mots tiennent dans 4 Go
+
+
+# CONSTRUCTION
+# ============
+def _trier(mots):
+    """Mots uniques, sans blancs autour, en UTF-8, triés."""
+    return sorted({mot.strip().encode("utf-8") for mot in mots} - {b""})
+
+
+def _blocs(mots_tries):
+    decalages = array(DECALAGE, [0])
+    total = 0
+    for mot in mots_tries:
+        total += len(mot)
+        decalages.append(total)
+    if total >= 1 << 32:
+        raise ValueError("plus de 4 Go de mots")
+    return decalages, b"".join(mots_tries)
+
+
+def construire(mots, chemin):
+    """Écrit le fichier index de `mots` (itérable de str). Renvoie le nombre de mots."""
+    tries = _trier(mots)
+    decalages, texte = _blocs(tries)
+    with open(chemin, "wb") as fichier:
+        fichier.write(ENTETE.pack(MAGIC, len(tries)))
+        if sys.byteorder != "little":
+            decalages.byteswap()   # le fichier est toujours en petit-boutiste
+        decalages.tofile(fichier)
+        fichier.write(texte)
+    return len(tries)
+
+
+def lire_liste(chemin):
+    """Mots d'un fichier texte, un par ligne."""
+    with open(chemin, encoding="utf-8") as fichier:
+        return [ligne.rstrip("\n") for ligne in fichier]
+
+
+# LECTURE
+# =======
+class _Octets:
+    """Les mots en bytes, vus comme une séquence : bisect travaille dessus."""
+    __slots__ = ("texte", "decalages")
+
+    def __init__(self, texte, decalages):
+        self.texte = texte
+        self.decalages = decalages
+
+    def __len__(self):
+        return len(self.decalages) - 1
+
+    def __getitem__(self, i):
+        return self.texte[self.decalages[i]:self.decalages[i + 1]]
+
+
+class Dictionnaire:
+    def __init__(self, texte, decalages, fichier=None, carte=None):
+        self._octets = _Octets(texte, decalages)
+        self._fichier = fichier
+        self._carte = carte
+        self._table = None
+
+    @classmethod
+    def ouvrir(cls, chemin):
+        """Ouvre un fichier index sans le charger (mmap)."""
+        fichier = open(chemin, "rb")
+        try:
+            carte = mmap.mmap(fichier.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:   # fichier vide
+            fichier.close()
+            raise ValueError(f"{chemin} n'est pas un index de mots") from None
+        if len(carte) < ENTETE.size:
+            magic, fin = None, 0   # plus court que l'en-tête
+        else:
+            magic, nombre = ENTETE.unpack_from(carte)
+            fin = ENTETE.size + 4 * (nombre + 1)
+        if magic != MAGIC or len(carte) < fin or sys.byteorder != "little":
+            carte.close()
+            fichier.close()
+            raise ValueError(f"{chemin} n'est pas un index de mots")
+        decalages = memoryview(carte)[ENTETE.size:fin].cast(DECALAGE)
+        # Les mots commencent après les décalages : on lit dans la carte à
+        # partir de `fin` en ajoutant fin à chaque décalage
+        return cls(_Decale(carte, fin), decalages, fichier, carte)
+
+    @classmethod
+    def depuis_mots(cls, mots):
+        """Même structure, en mémoire, sans fichier."""
+        decalages, texte = _blocs(_trier(mots))
+        return cls(texte, decalages)
+
+    def fermer(self):
+        if self._carte is not None:
+            self._octets.decalages.release()
+            self._carte.close()
+            self._fichier.close()
+            self._carte = self._fichier = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+    def __len__(self):
+        return len(self._octets)
+
+    def __getitem__(self, i):
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        return self._octets[i % len(self)].decode("utf-8")
+
+    def __contains__(self, mot):
+        return self.cherche(mot) is not None
+
+    # RECHERCHES
+    # ==========
+    def cherche(self, mot):
+        """Rang du mot dans l'ordre alphabétique, ou None s'il n'y est pas."""
+        return self._cherche(mot.encode("utf-8"))
+
+    def _cherche(self, cle):
+        if self._table is not None:
+            return self._cherche_table(cle)
+        i = bisect.bisect_left(self._octets, cle)
+        return i if i < len(self._octets) and self._octets[i] == cle else None
+
+    def _tranche(self, de, a):
+        return [self._octets[i].decode("utf-8") for i in range(de, a)]
+
+    def prefixe(self, debut, limite=None):
+        """Mots qui commencent par `debut`, dans l'ordre."""
+        cle = debut.encode("utf-8")
+        de = bisect.bisect_left(self._octets, cle)
+        # 0xFF n'apparaît jamais en UTF-8 : cle + 0xFF est après tous les mots
+        # qui commencent par cle
+        a = bisect.bisect_left(self._octets, cle + b"\xff", de)
+        if limite is not None:
+            a = min(a, de + limite)
+        return self._tranche(de, a)
+
+    def intervalle(self, de, a):
+        """Mots m tels que de <= m < a."""
+        debut = bisect.bisect_left(self._octets, de.encode("utf-8"))
+        fin = bisect.bisect_left(self._octets, a.encode("utf-8"), debut)
+        return self._tranche(debut, fin)
+
+    def cherche_lot(self, mots):
+        """
+        Rangs (ou None) de plusieurs mots, dans l'ordre donné. Les mots sont
+        cherchés dans l'ordre du fichier : chaque bisect part de la position
+        du précédent et relit les mêmes pages.
+        """
+        cles = [mot.encode("utf-8") for mot in mots]
+        resultats = [None] * len(cles)
+        debut = 0
+        for n in sorted(range(len(cles)), key=cles.__getitem__):
+            if self._table is not None:
+                resultats[n] = self._cherche_table(cles[n])
+                continue
+            i = bisect.bisect_left(self._octets, cles[n], debut)
+            debut = i
+            if i < len(self._octets) and self._octets[i] == cles[n]:
+                resultats[n] = i
+        return resultats
+
+    # INDEX DE HACHAGE
+    # ================
+    def indexer(self):
+        """
+        Construit l'index de hachage (en mémoire, 4 octets par case, deux
+        fois plus de cases que de mots). cherche() s'en sert ensuite.
+        """
+        taille = 1 << max(4, (2 * len(self)).bit_length())
+        masque = taille - 1
+        table = array("I", bytes(4 * taille))   # 0 = vide, sinon rang + 1
+        octets = self._octets
+        for i in range(len(octets)):
+            h = hash(octets[i]) & masque
+            while table[h]:
+                h = (h + 1) & masque
+            table[h] = i + 1
+        self._table = (table, masque)
+
+    def _cherche_table(self, cle):
+        table, masque = self._table
+        h = hash(cle) & masque
+        while True:
+            rang = table[h]
+            if not rang:
+                return None
+            if self._octets[rang - 1] == cle:
+                return rang - 1
+            h = (h + 1) & masque
+
+
+class _Decale:
+    """texte[a:b] lu dans la carte mmap à partir de `debut`."""
+    __slots__ = ("carte", "debut")
+
+    def __init__(self, carte, debut):
+        self.carte = carte
+        self.debut = debut
+
+    def __getitem__(self, tranche):
+        return self.carte[self.debut + tranche.start:self.debut + tranche.stop]
+
+
+# LIGNE DE COMMANDE
+# =================
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 3 or argv[0] not in ("construire", "chercher", "prefixe"):
+        print(__doc__.split("Ligne de commande :")[1])
+        return 2
+    action, chemin, valeur = argv
+    if action == "construire":
+        nombre = construire(lire_liste(chemin), valeur)
+        print(f"{nombre} mots écrits dans {valeur}")
+        return 0
+    with Dictionnaire.ouvrir(chemin) as dico:
+        if action == "chercher":
+            rang = dico.cherche(valeur)
+            print(f"le mot {valeur} n'existe pas" if rang is None
+                  else f"le mot {valeur} existe (rang {rang})")
+        else:
+            for mot in dico.prefixe(valeur, limite=50):
+                print(mot)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
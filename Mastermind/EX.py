@@ -1,70 +1,95 @@
 import random
 
-nom=input("Entrez votre nom : ")
-print("Bienvenue",nom)
+from partie import GAGNEE, Partie
+from scoring import evaluer
+
 #On demande la proposition du joueur
-def propJoueur():
-    nombres=map(int,input("entrez 4 chiffres entre 1 et 6 : ").split(" ")) #map permet de mettre les réponses en liste et split de les séparer avec une virgule
+def propJoueur(pions=4, couleurs=6):
+    nombres=map(int,input(f"entrez {pions} chiffres entre 1 et {couleurs} : ").split(" ")) #map permet de mettre les réponses en liste et split de les séparer avec une virgule
     return list(nombres)
 
 #On génere une combinaison aléatoire
-def genRand():
-    nb=random.randint(1, 6) #random.randint pour générer une variable entière aléatoire
+#rng : générateur à utiliser, random.Random(graine) pour rejouer la même partie
+def genRand(rng=random, couleurs=6):
+    nb=rng.randint(1, couleurs) #randint pour générer une variable entière aléatoire
     return nb
 
 #À l'aide de la fonction ci-dessus on génere une liste entiere aléatoire
-def listRand():
+def listRand(rng=random, pions=4, couleurs=6):
     liste=[]
-    for i in range(4):
-        liste.append(genRand())
+    for i in range(pions):
+        liste.append(genRand(rng, couleurs))
     return liste
 
 
 
+# bienPlace et malPlac ne modifient plus les listes : avant, secretclone=secret
+# ne copiait pas la liste, les 0 mis pour marquer les pions comptés
+# abîmaient le vrai secret. Le calcul est dans scoring.py.
 def bienPlace(jouclone, secretclone):
-    nbBienPlac=0
-    for i in range(0,4):
-        if jouclone[i] == secretclone[i]:
-            jouclone[i]=0
-            secretclone[i]=0
-            nbBienPlac+=1
-    return nbBienPlac
-
+    return evaluer(jouclone, secretclone)[0]
 
 
 def malPlac(jouclone,secretclone):
-    nbMalPlac=0
-    for i in range (0,4):
-        for j in range (0,4):
-            if secretclone[j]!=0 and jouclone[i]!=0:
-                if jouclone[i]==secretclone[j] and i!=j :
-                    secretclone[j]=0
-                    jouclone[i]=0
-                    nbMalPlac+=1
-    return nbMalPlac
-
-
-def jouer():
-    tour=0
-    gagner=False
-    secret= listRand()
-    while tour<10 and gagner== False:
-        tour+=1
-        combijou= propJoueur()
-        secretclone=secret
-        jouclone=combijou
-        bienPla=bienPlace(jouclone, secretclone)
-        malPla=malPlac(jouclone, secretclone)
+    return evaluer(jouclone, secretclone)[1]
+
+
+#Parties sans affichage en masse (plusieurs stratégies) : voir tournoi.py
+#La partie elle-même (secret, tours, historique) est un objet Partie
+#(partie.py), le même que celui du serveur (serveur.py) : ici il ne reste
+#que les questions et les affichages
+def jouer(pions=4, couleurs=6, toursMax=10, graine=None):
+    partie=Partie(listRand(random.Random(graine), pions, couleurs), couleurs, toursMax)
+    while not partie.finie:
+        combijou= propJoueur(pions, couleurs)
+        try:
+            bienPla, malPla = partie.proposer(combijou)
+        except ValueError as erreur:
+            print(erreur)
+            continue
         print(f"il y a {bienPla} bon chiffre bien placé et {malPla} de bon chiffre mal placé")
-        print(secretclone)
-        print(jouclone)
-        if bienPla==4:
-            gagner=True
-    if gagner==True:
+    if partie.etat==GAGNEE:
         print("Bien joué tu as gagné")
     else:
         print("GAME OVER")
-        print("La réponse était", secret)
+        print("La réponse était", list(partie.secret))
+
+
+#Mode solveur : l'ordinateur cherche la combinaison (voir solveur.py)
+#Sans secret, c'est le joueur qui en pense une et qui donne les réponses
+def reponseJoueur(combinaison):
+    print("L'ordinateur propose :", " ".join(map(str, combinaison)))
+    bien=int(input("combien de bien placés ? "))
+    mal=int(input("combien de mal placés ? "))
+    return bien, mal
 
 
-jouer()
\ No newline at end of file
+def jouerAuto(secret=None):
+    from solveur import Solveur
+    solveur=Solveur()
+    if secret is None:
+        repondre=reponseJoueur
+    else:
+        repondre=lambda combinaison: evaluer(combinaison, secret)
+    try:
+        coups=solveur.partie(repondre, tours_max=10)
+    except ValueError:
+        print("Ces réponses sont impossibles, il y a une erreur quelque part")
+        return
+    for combinaison, (bienPla, malPla) in coups:
+        print(combinaison, f"{bienPla} bien placé(s), {malPla} mal placé(s)")
+    #Le solveur s'arrête aussi à tours_max sans avoir trouvé
+    if coups[-1][1][0]==solveur.pions:
+        print(f"Trouvé en {len(coups)} coups")
+    else:
+        print(f"GAME OVER : pas trouvé en {len(coups)} coups")
+
+
+if __name__ == "__main__":
+    nom=input("Entrez votre nom : ")
+    print("Bienvenue",nom)
+    mode=input("1 : tu cherches la combinaison, 2 : l'ordinateur la cherche : ")
+    if mode.strip()=="2":
+        jouerAuto()
+    else:
+        jouer()
@@ -1,7 +1,9 @@
 combijou=   [9,5,4,8]
 combisecret=[5,4,5,8]
-secretclone=combisecret
-jouclone=combijou
+# list() fait une vraie copie : sans elle les 0 ci-dessous modifient aussi
+# combisecret et combijou (les deux noms désignent la même liste)
+secretclone=list(combisecret)
+jouclone=list(combijou)
 compteur=0
 compteur2=0
 for i in range(0,4):
@@ -0,0 +1,157 @@
+"""
+MESURE DU SERVEUR DE PARTIES
+============================
+1. Mémoire : --memoire parties créées directement dans un Serveur, avec
+   --tours-joues propositions chacune ; tracemalloc donne la mémoire
+   totale, divisée par le nombre de parties (objet Partie + entrée du
+   dictionnaire + identifiant)
+2. Débit : le serveur tourne dans ce processus (asyncio), --clients
+   connexions jouent chacune --parties parties complètes en lignes JSON
+   (ou en HTTP avec --http). Les propositions viennent de solveur.py
+   (minimax, choix en cache), le client coûte donc peu.
+   Affiche parties / s, propositions / s et le nombre maximum de parties
+   actives en même temps.
+
+Ligne de commande :
+    python bench_serveur.py --clients 1000 --parties 5
+    python bench_serveur.py --http --clients 200
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import tracemalloc
+
+import numpy as np
+
+from serveur import Serveur
+from solveur import Solveur
+
+solveur = Solveur()
+
+
+# MÉMOIRE
+# =======
+def mesurer_memoire(nombre, tours_joues):
+    rng = random.Random(1)
+    tracemalloc.start()
+    avant = tracemalloc.take_snapshot()
+    serveur = Serveur(ttl=3600, max_parties=nombre, rng=rng)
+    for _ in range(nombre):
+        identifiant = serveur.nouvelle()["id"]
+        for _ in range(tours_joues):
+            reponse = serveur.proposer(identifiant, [rng.randint(1, 6) for _ in range(4)])
+            if reponse["etat"] != "en cours":
+                break
+    apres = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    octets = sum(stat.size_diff for stat in apres.compare_to(avant, "filename"))
+    print(f"mémoire : {nombre} parties de {tours_joues} tours -> "
+          f"{octets / 1024 / 1024:.1f} Mo, {octets / nombre:.0f} octets par partie")
+    return serveur
+
+
+# DÉBIT
+# =====
+async def jouer_lignes(port, parties, compteurs):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+    async def envoyer(commande):
+        writer.write(json.dumps(commande).encode() + b"\n")
+        return json.loads(await reader.readline())
+
+    for _ in range(parties):
+        identifiant = (await envoyer({"action": "nouvelle"}))["id"]
+
+        async def repondre(combinaison):
+            return await envoyer({"action": "proposer", "id": identifiant,
+                                  "combinaison": combinaison})
+        await jouer_partie(repondre, compteurs)
+    writer.close()
+
+
+async def jouer_http(port, parties, compteurs):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+    async def envoyer(methode, chemin, corps):
+        contenu = json.dumps(corps).encode()
+        writer.write(f"{methode} {chemin} HTTP/1.1\r\nHost: bench\r\n"
+                     f"Content-Length: {len(contenu)}\r\n\r\n".encode() + contenu)
+        longueur = 0
+        await reader.readline()
+        while True:
+            entete = await reader.readline()
+            if entete in (b"\r\n", b""):
+                break
+            if entete.lower().startswith(b"content-length:"):
+                longueur = int(entete.split(b":", 1)[1])
+        return json.loads(await reader.readexactly(longueur))
+
+    for _ in range(parties):
+        identifiant = (await envoyer("POST", "/parties", {}))["id"]
+
+        async def repondre(combinaison):
+            return await envoyer("POST", f"/parties/{identifiant}", {"combinaison": combinaison})
+        await jouer_partie(repondre, compteurs)
+    writer.close()
+
+
+async def jouer_partie(repondre, compteurs):
+    """Une partie avec le solveur : chaque réponse du serveur filtre les candidats."""
+    masque = np.ones(len(solveur.espace), dtype=bool)
+    while True:
+        proposition = solveur.choisir(masque)
+        reponse = await repondre(solveur.espace.combinaison(proposition))
+        compteurs["propositions"] += 1
+        if reponse["etat"] != "en cours":
+            compteurs["parties"] += 1
+            return
+        masque = solveur.filtrer(masque, proposition,
+                                 reponse["bien"] * (solveur.pions + 1) + reponse["mal"])
+
+
+async def mesurer_debit(clients, parties, http):
+    serveur = Serveur(ttl=600)
+    await serveur.start(port=0)
+    compteurs = {"parties": 0, "propositions": 0}
+    pic = [0]
+
+    async def surveiller():
+        while True:
+            pic[0] = max(pic[0], len(serveur.parties))
+            await asyncio.sleep(0.01)
+
+    surveillance = asyncio.ensure_future(surveiller())
+    jouer = jouer_http if http else jouer_lignes
+    debut = time.perf_counter()
+    await asyncio.gather(*(jouer(serveur.port, parties, compteurs) for _ in range(clients)))
+    duree = time.perf_counter() - debut
+    surveillance.cancel()
+    await serveur.stop()
+    print(f"débit ({'HTTP' if http else 'lignes JSON'}) : {clients} clients, "
+          f"{compteurs['parties']} parties en {duree:.2f}s -> "
+          f"{compteurs['parties'] / duree:,.0f} parties/s, "
+          f"{compteurs['propositions'] / duree:,.0f} propositions/s, "
+          f"jusqu'à {pic[0]} parties actives")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure du serveur de parties")
+    parser.add_argument("--memoire", type=int, default=10000, help="parties pour la mesure mémoire")
+    parser.add_argument("--tours-joues", type=int, default=5)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--parties", type=int, default=5, help="parties par client")
+    parser.add_argument("--http", action="store_true")
+    args = parser.parse_args()
+
+    mesurer_memoire(args.memoire, args.tours_joues)
+    # Remplit le cache du solveur avant de chronométrer
+    for indice in range(len(solveur.espace)):
+        solveur.resoudre(solveur.espace.combinaison(indice))
+    asyncio.run(mesurer_debit(args.clients, args.parties, args.http))
+
+
+if __name__ == "__main__":
+    main()
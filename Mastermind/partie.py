@@ -0,0 +1,94 @@
+"""
+ÉTAT D'UNE PARTIE
+=================
+Toute la logique d'une partie, sans input() ni print() : le jeu en
+console (EX.py) et le serveur (serveur.py) s'en servent tous les deux.
+
+L'objet est petit parce qu'un serveur en garde des milliers en mémoire :
+- __slots__ : pas de dictionnaire par objet
+- le secret est un bytes (un octet par pion)
+- l'historique est un seul bytearray : pour chaque tour, les pions de la
+  proposition puis le code retour (scoring.code_retour) sur un octet
+"""
+
+import random
+import time
+
+from scoring import code_retour, decoder_retour, evaluer
+
+EN_COURS, GAGNEE, PERDUE = 0, 1, 2
+ETATS = ("en cours", "gagnée", "perdue")
+
+
+class PartieFinie(Exception):
+    """Proposition envoyée à une partie déjà gagnée ou perdue."""
+
+
+class Partie:
+    __slots__ = ("secret", "couleurs", "tours_max", "tour", "coups", "etat", "vue")
+
+    def __init__(self, secret, couleurs=6, tours_max=10):
+        if not 1 <= couleurs <= 255 or not all(1 <= c <= couleurs for c in secret):
+            raise ValueError(f"secret invalide pour {couleurs} couleurs : {list(secret)}")
+        if not 1 <= len(secret) <= 15:
+            raise ValueError("entre 1 et 15 pions")   # code retour sur un octet
+        self.secret = bytes(secret)
+        self.couleurs = couleurs
+        self.tours_max = tours_max
+        self.tour = 0
+        self.coups = bytearray()
+        self.etat = EN_COURS
+        self.vue = time.monotonic()   # dernière activité (expiration)
+
+    @classmethod
+    def nouvelle(cls, pions=4, couleurs=6, tours_max=10, rng=random):
+        """Partie avec un secret tiré au hasard (rng = random.Random(graine) pour rejouer)."""
+        return cls([rng.randint(1, couleurs) for _ in range(pions)], couleurs, tours_max)
+
+    @property
+    def pions(self):
+        return len(self.secret)
+
+    @property
+    def finie(self):
+        return self.etat != EN_COURS
+
+    def proposer(self, combinaison):
+        """Joue un tour. Renvoie (bien placés, mal placés)."""
+        if self.etat != EN_COURS:
+            raise PartieFinie("la partie est terminée")
+        combinaison = list(combinaison)
+        if len(combinaison) != self.pions or not all(
+                isinstance(c, int) and 1 <= c <= self.couleurs for c in combinaison):
+            raise ValueError(f"il faut {self.pions} chiffres entre 1 et {self.couleurs}")
+        bien, mal = evaluer(combinaison, self.secret)
+        self.tour += 1
+        self.coups += bytes(combinaison)
+        self.coups.append(code_retour(bien, mal, self.pions))
+        if bien == self.pions:
+            self.etat = GAGNEE
+        elif self.tour >= self.tours_max:
+            self.etat = PERDUE
+        self.vue = time.monotonic()
+        return bien, mal
+
+    def historique(self):
+        """[(combinaison, bien, mal), ...] des tours joués."""
+        taille = self.pions + 1
+        tours = []
+        for debut in range(0, len(self.coups), taille):
+            bien, mal = decoder_retour(self.coups[debut + self.pions], self.pions)
+            tours.append((list(self.coups[debut:debut + self.pions]), bien, mal))
+        return tours
+
+    def resume(self):
+        """État publiable (le secret n'y est qu'une fois la partie finie)."""
+        data = {
+            "pions": self.pions, "couleurs": self.couleurs, "tours_max": self.tours_max,
+            "tour": self.tour, "etat": ETATS[self.etat],
+            "historique": [{"combinaison": c, "bien": b, "mal": m}
+                           for c, b, m in self.historique()],
+        }
+        if self.finie:
+            data["secret"] = list(self.secret)
+        return data
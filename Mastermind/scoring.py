@@ -0,0 +1,168 @@
+"""
+CALCUL DES RÉPONSES DU MASTERMIND
+=================================
+Nombre de pions bien placés et mal placés d'une proposition, pour
+n'importe quel nombre de pions et de couleurs (couleurs 1..couleurs).
+
+- evaluer() ne modifie jamais les listes reçues (l'ancien bienPlace /
+  malPlac mettait des 0 dans le secret du joueur)
+- Espace : toutes les combinaisons d'un jeu dans un tableau NumPy ;
+  Espace.retours() évalue une proposition contre toutes les combinaisons
+  (ou une partie) en un seul appel, sans boucle Python
+- Espace.table() : tableau retour[i, j] précalculé pour tous les couples
+  de combinaisons (1296 x 1296 pour le jeu standard 4 pions / 6 couleurs),
+  ensuite une réponse est une simple lecture
+
+Une réponse est aussi codée par un seul entier :
+    code = bien * (pions + 1) + mal
+ce qui permet de compter les réponses avec numpy.bincount.
+
+NumPy n'est nécessaire que pour Espace ; evaluer() marche sans.
+"""
+
+import sys
+import time
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PIONS = 4
+COULEURS = 6
+
+# Au-delà, la table n x n prendrait trop de mémoire (n² octets)
+TABLE_MAX = 8192
+
+
+def evaluer(proposition, secret):
+    """(bien placés, mal placés) de `proposition` face à `secret`."""
+    if len(proposition) != len(secret):
+        raise ValueError(f"{len(proposition)} pions proposés pour {len(secret)} pions secrets")
+    bien = sum(p == s for p, s in zip(proposition, secret))
+    # Pions de même couleur des deux côtés, bien placés ou non
+    communs = sum((Counter(proposition) & Counter(secret)).values())
+    return bien, communs - bien
+
+
+def code_retour(bien, mal, pions=PIONS):
+    return bien * (pions + 1) + mal
+
+
+def decoder_retour(code, pions=PIONS):
+    """Inverse de code_retour() : (bien, mal)."""
+    return divmod(int(code), pions + 1)
+
+
+# ESPACE DES COMBINAISONS (NUMPY)
+# ===============================
+class Espace:
+    """
+    Toutes les combinaisons de `pions` pions parmi `couleurs` couleurs,
+    dans l'ordre de itertools.product (1111, 1112, ...). L'indice d'une
+    combinaison se calcule directement (écriture en base `couleurs`).
+    """
+
+    def __init__(self, pions=PIONS, couleurs=COULEURS):
+        if np is None:
+            raise ImportError("Espace a besoin de numpy (pip install numpy)")
+        self.pions = pions
+        self.couleurs = couleurs
+        dtype = np.uint8 if couleurs < 256 else np.uint16
+        # indices((6, 6, 6, 6)) -> chaque ligne est une combinaison, 1..couleurs
+        self.codes = (np.indices((couleurs,) * pions, dtype=dtype)
+                      .reshape(pions, -1).T + 1)
+        # comptes[i, c] = nombre de pions de couleur c + 1 dans la combinaison i
+        self.comptes = (self.codes[:, :, None] == np.arange(1, couleurs + 1, dtype=dtype)) \
+            .sum(axis=1, dtype=np.uint8)
+        self._poids = couleurs ** np.arange(pions - 1, -1, -1)
+        self.dtype_retour = np.uint8 if (pions + 1) ** 2 <= 256 else np.uint16
+        self._table = None
+
+    def __len__(self):
+        return len(self.codes)
+
+    def index(self, combinaison):
+        """Indice d'une combinaison (liste de couleurs 1..couleurs)."""
+        valeurs = np.asarray(combinaison) - 1
+        if valeurs.shape != (self.pions,) or valeurs.min() < 0 or valeurs.max() >= self.couleurs:
+            raise ValueError(f"combinaison invalide : {list(combinaison)}")
+        return int(valeurs @ self._poids)
+
+    def combinaison(self, indice):
+        return [int(c) for c in self.codes[indice]]
+
+    def retours(self, proposition, indices=None):
+        """
+        Codes retour (voir code_retour) de `proposition` face à chaque
+        combinaison de l'espace, ou seulement à celles de `indices`.
+        """
+        if self._table is not None:
+            ligne = self._table[self.index(proposition)]
+            return ligne if indices is None else ligne[indices]
+        codes, comptes = self.codes, self.comptes
+        if indices is not None:
+            codes, comptes = codes[indices], comptes[indices]
+        proposition = np.asarray(proposition, dtype=codes.dtype)
+        dtype = self.dtype_retour
+        bien = (codes == proposition).sum(axis=1, dtype=dtype)
+        communs = np.minimum(comptes, self.comptes[self.index(proposition)]) \
+            .sum(axis=1, dtype=dtype)
+        return bien * dtype(self.pions + 1) + (communs - bien)
+
+    def evaluer_lot(self, proposition, indices=None):
+        """(bien, mal) sous forme de deux tableaux, comme evaluer() mais en lot."""
+        return np.divmod(self.retours(proposition, indices), self.pions + 1)
+
+    def table(self):
+        """
+        Précalcule (une fois) retour[i, j] pour tous les couples : ensuite
+        retours() lit une ligne de la table au lieu de calculer.
+        """
+        if self._table is None:
+            n = len(self)
+            if n > TABLE_MAX:
+                raise MemoryError(f"table {n} x {n} trop grande (TABLE_MAX = {TABLE_MAX})")
+            table = np.empty((n, n), dtype=self.dtype_retour)
+            for i in range(n):
+                table[i] = self.retours(self.codes[i])
+            self._table = table
+        return self._table
+
+
+_espaces = {}
+
+
+def espace(pions=PIONS, couleurs=COULEURS):
+    """Espace partagé pour un jeu (construit au premier appel)."""
+    cle = (pions, couleurs)
+    if cle not in _espaces:
+        _espaces[cle] = Espace(pions, couleurs)
+    return _espaces[cle]
+
+
+# MESURE
+# ======
+# python scoring.py : une proposition contre les 1296 combinaisons du jeu
+# standard, en Python pur, avec NumPy et avec la table précalculée
+def _mesurer(nom, fonction, repetitions):
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        fonction()
+    duree = (time.perf_counter() - debut) / repetitions
+    print(f"{nom:<12}{duree * 1e6:>10.1f} us / proposition")
+
+
+if __name__ == "__main__":
+    if np is None:
+        sys.exit("numpy n'est pas installé")
+    jeu = Espace()
+    proposition = [1, 1, 2, 3]
+    liste = [jeu.combinaison(i) for i in range(len(jeu))]
+    _mesurer("python", lambda: [evaluer(proposition, c) for c in liste], 20)
+    _mesurer("numpy", lambda: jeu.retours(proposition), 500)
+    debut = time.perf_counter()
+    jeu.table()
+    print(f"table construite en {(time.perf_counter() - debut) * 1000:.1f} ms")
+    _mesurer("table", lambda: jeu.retours(proposition), 500)
@@ -0,0 +1,303 @@
+"""
+SERVEUR DE PARTIES
+==================
+Un seul processus asyncio qui héberge des milliers de parties en même
+temps (une Partie de partie.py par partie, aucun thread par joueur).
+
+Chaque partie a un identifiant. Le même port parle deux protocoles,
+reconnus à la première ligne reçue :
+
+- lignes JSON sur TCP (une commande par ligne, une réponse par ligne) :
+    {"action": "nouvelle", "pions": 4, "couleurs": 6, "tours": 10}
+    {"action": "proposer", "id": "...", "combinaison": [1, 1, 2, 2]}
+    {"action": "etat", "id": "..."}
+    {"action": "abandonner", "id": "..."}
+    {"action": "stats"}
+  une erreur répond {"erreur": "...", "statut": 404}
+- HTTP/1.1 (keep-alive), corps JSON :
+    POST   /parties            nouvelle partie (options dans le corps)
+    POST   /parties/<id>       {"combinaison": [1, 1, 2, 2]}
+    GET    /parties/<id>       état et historique
+    DELETE /parties/<id>       abandon (le secret est donné)
+    GET    /stats
+
+Une partie sans activité depuis TTL secondes est supprimée : les parties
+sont rangées de la moins récemment utilisée à la plus récente
+(OrderedDict), l'expiration ne regarde donc que le début de la liste.
+
+Ligne de commande :
+    python serveur.py --port 8765 --ttl 600
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import secrets
+import time
+from collections import OrderedDict
+
+from partie import ETATS, Partie, PartieFinie
+
+# CONFIGURATION
+# =============
+TTL = float(os.environ.get("MASTERMIND_TTL", "600"))
+MAX_PARTIES = int(os.environ.get("MASTERMIND_MAX_PARTIES", "100000"))
+TOURS_MAX = 100
+LIGNE_MAX = 65536   # taille maximale d'une ligne / d'un corps HTTP
+
+RAISONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+           503: "Service Unavailable"}
+
+_HTTP = re.compile(rb"^(GET|POST|DELETE|PUT|HEAD) (\S+) HTTP/1\.([01])\r?\n$")
+_CHEMIN = re.compile(r"^/parties(?:/([A-Za-z0-9_-]+))?/?$")
+
+
+class Erreur(Exception):
+    def __init__(self, statut, message):
+        super().__init__(message)
+        self.statut = statut
+
+
+def _entier(valeur, nom, minimum, maximum):
+    if not isinstance(valeur, int) or isinstance(valeur, bool) or not minimum <= valeur <= maximum:
+        raise Erreur(400, f"{nom} doit être un entier entre {minimum} et {maximum}")
+    return valeur
+
+
+class Serveur:
+    def __init__(self, ttl=TTL, max_parties=MAX_PARTIES, rng=None):
+        self.ttl = ttl
+        self.max_parties = max_parties
+        self.rng = rng or random.Random()
+        self.parties = OrderedDict()   # id -> Partie, la moins récemment utilisée d'abord
+        self.compteurs = {"creees": 0, "propositions": 0, "expirees": 0, "connexions": 0}
+        self.port = None
+        self._serveur = None
+        self._nettoyeur = None
+
+    # PARTIES
+    # =======
+    def expirer(self):
+        """Supprime les parties inactives depuis plus de ttl secondes."""
+        limite = time.monotonic() - self.ttl
+        parties = self.parties
+        while parties:
+            identifiant = next(iter(parties))
+            if parties[identifiant].vue > limite:
+                break
+            del parties[identifiant]
+            self.compteurs["expirees"] += 1
+
+    def _partie(self, identifiant):
+        self.expirer()   # ne regarde que les parties déjà expirées : peu coûteux
+        partie = self.parties.get(identifiant) if isinstance(identifiant, str) else None
+        if partie is None:
+            raise Erreur(404, "partie inconnue ou expirée")
+        partie.vue = time.monotonic()
+        self.parties.move_to_end(identifiant)
+        return partie
+
+    def nouvelle(self, pions=4, couleurs=6, tours=10):
+        self.expirer()
+        if len(self.parties) >= self.max_parties:
+            raise Erreur(503, "trop de parties en cours")
+        partie = Partie.nouvelle(_entier(pions, "pions", 1, 15),
+                                 _entier(couleurs, "couleurs", 1, 255),
+                                 _entier(tours, "tours", 1, TOURS_MAX), self.rng)
+        identifiant = secrets.token_urlsafe(9)
+        self.parties[identifiant] = partie
+        self.compteurs["creees"] += 1
+        return {"id": identifiant, **partie.resume()}
+
+    def proposer(self, identifiant, combinaison):
+        partie = self._partie(identifiant)
+        if not isinstance(combinaison, list):
+            raise Erreur(400, "combinaison doit être une liste de chiffres")
+        try:
+            bien, mal = partie.proposer(combinaison)
+        except PartieFinie as erreur:
+            raise Erreur(409, str(erreur)) from None
+        except ValueError as erreur:
+            raise Erreur(400, str(erreur)) from None
+        self.compteurs["propositions"] += 1
+        reponse = {"id": identifiant, "tour": partie.tour, "bien": bien, "mal": mal,
+                   "etat": ETATS[partie.etat]}
+        if partie.finie:
+            reponse["secret"] = list(partie.secret)
+        return reponse
+
+    def etat(self, identifiant):
+        return {"id": identifiant, **self._partie(identifiant).resume()}
+
+    def abandonner(self, identifiant):
+        partie = self._partie(identifiant)
+        del self.parties[identifiant]
+        return {"id": identifiant, **partie.resume(), "secret": list(partie.secret)}
+
+    def stats(self):
+        self.expirer()
+        return {"parties": len(self.parties), "ttl": self.ttl, **self.compteurs}
+
+    def commande(self, data):
+        """Exécute une commande (dict d'une ligne JSON) et renvoie la réponse."""
+        if not isinstance(data, dict):
+            raise Erreur(400, "une commande est un objet JSON")
+        action = data.get("action")
+        if action == "nouvelle":
+            return self.nouvelle(data.get("pions", 4), data.get("couleurs", 6),
+                                 data.get("tours", 10))
+        if action == "proposer":
+            return self.proposer(data.get("id"), data.get("combinaison"))
+        if action == "etat":
+            return self.etat(data.get("id"))
+        if action == "abandonner":
+            return self.abandonner(data.get("id"))
+        if action == "stats":
+            return self.stats()
+        raise Erreur(400, f"action inconnue : {action!r}")
+
+    # LIGNES JSON
+    # ===========
+    def _ligne(self, ligne):
+        try:
+            reponse = self.commande(json.loads(ligne))
+        except (ValueError, RecursionError):   # RecursionError : [[[[... très imbriqué
+            reponse = {"erreur": "JSON invalide", "statut": 400}
+        except Erreur as erreur:
+            reponse = {"erreur": str(erreur), "statut": erreur.statut}
+        return json.dumps(reponse, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+
+    async def _lignes(self, ligne, reader, writer):
+        while ligne:
+            if ligne.strip():
+                writer.write(self._ligne(ligne))
+                await writer.drain()
+            ligne = await reader.readline()
+
+    # HTTP
+    # ====
+    def _route(self, methode, chemin, corps):
+        if chemin == "/stats":
+            if methode != "GET":
+                raise Erreur(405, "GET seulement")
+            return 200, self.stats()
+        trouve = _CHEMIN.match(chemin.split("?", 1)[0])
+        if trouve is None:
+            raise Erreur(404, "chemin inconnu")
+        try:
+            data = json.loads(corps) if corps.strip() else {}
+        except (ValueError, RecursionError):
+            raise Erreur(400, "JSON invalide") from None
+        if not isinstance(data, dict):
+            raise Erreur(400, "le corps doit être un objet JSON")
+        identifiant = trouve.group(1)
+        if identifiant is None:
+            if methode != "POST":
+                raise Erreur(405, "POST seulement")
+            return 201, self.nouvelle(data.get("pions", 4), data.get("couleurs", 6),
+                                      data.get("tours", 10))
+        if methode == "GET":
+            return 200, self.etat(identifiant)
+        if methode == "POST":
+            return 200, self.proposer(identifiant, data.get("combinaison"))
+        if methode == "DELETE":
+            return 200, self.abandonner(identifiant)
+        raise Erreur(405, "GET, POST ou DELETE")
+
+    async def _http(self, ligne, reader, writer):
+        while ligne:
+            requete = _HTTP.match(ligne)
+            entetes = {}
+            while True:
+                entete = await reader.readline()
+                if entete in (b"\r\n", b"\n", b""):
+                    break
+                nom, _, valeur = entete.decode("latin-1").partition(":")
+                entetes[nom.strip().lower()] = valeur.strip()
+            version_11 = requete is not None and requete.group(3) == b"1"
+            connexion = entetes.get("connection", "").lower()
+            garder = requete is not None and (
+                connexion != "close" if version_11 else connexion == "keep-alive")
+            try:
+                if requete is None:
+                    raise Erreur(400, "requête HTTP invalide")
+                longueur = entetes.get("content-length", "0")
+                if not longueur.isdigit():
+                    garder = False
+                    raise Erreur(400, "Content-Length invalide")
+                if int(longueur) > LIGNE_MAX:
+                    garder = False
+                    raise Erreur(413, "corps trop grand")
+                corps = await reader.readexactly(int(longueur)) if int(longueur) else b""
+                statut, reponse = self._route(requete.group(1).decode(),
+                                              requete.group(2).decode("latin-1"), corps)
+            except Erreur as erreur:
+                statut, reponse = erreur.statut, {"erreur": str(erreur), "statut": erreur.statut}
+            contenu = json.dumps(reponse, ensure_ascii=False, separators=(",", ":")).encode()
+            entete = (f"HTTP/1.1 {statut} {RAISONS[statut]}\r\n"
+                      f"Content-Type: application/json; charset=utf-8\r\n"
+                      f"Content-Length: {len(contenu)}\r\n")
+            if not garder:
+                entete += "Connection: close\r\n"
+            writer.write(entete.encode() + b"\r\n" + contenu)
+            await writer.drain()
+            if not garder:
+                return
+            ligne = await reader.readline()
+
+    # CONNEXIONS
+    # ==========
+    async def _connexion(self, reader, writer):
+        self.compteurs["connexions"] += 1
+        try:
+            ligne = await reader.readline()
+            if _HTTP.match(ligne):
+                await self._http(ligne, reader, writer)
+            else:
+                await self._lignes(ligne, reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass   # client parti, ou ligne plus longue que LIGNE_MAX
+        finally:
+            writer.close()
+
+    async def _nettoyer(self):
+        while True:
+            await asyncio.sleep(max(1.0, min(self.ttl / 4, 30.0)))
+            self.expirer()
+
+    async def start(self, host="127.0.0.1", port=8765):
+        self._serveur = await asyncio.start_server(self._connexion, host, port, limit=LIGNE_MAX)
+        self.port = self._serveur.sockets[0].getsockname()[1]
+        self._nettoyeur = asyncio.ensure_future(self._nettoyer())
+
+    async def stop(self):
+        self._nettoyeur.cancel()
+        self._serveur.close()
+        await self._serveur.wait_closed()
+
+
+async def _servir(host, port, ttl):
+    serveur = Serveur(ttl)
+    await serveur.start(host, port)
+    print(f"Mastermind sur {host}:{serveur.port} (lignes JSON ou HTTP), TTL {ttl:.0f}s")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur de parties de Mastermind")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttl", type=float, default=TTL, help="secondes d'inactivité")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_servir(args.host, args.port, args.ttl))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
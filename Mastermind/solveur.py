@@ -0,0 +1,219 @@
+"""
+SOLVEUR AUTOMATIQUE DU MASTERMIND
+=================================
+L'ordinateur trouve le secret : à chaque tour il choisit la proposition
+qui découpe le mieux les combinaisons encore possibles (les candidats),
+puis ne garde que les candidats compatibles avec la réponse reçue.
+
+- une combinaison est un entier : son indice dans scoring.Espace
+- l'ensemble des candidats est un masque de bits NumPy (un booléen par
+  combinaison) ; sa version compactée (numpy.packbits, 162 octets pour
+  1296 combinaisons) sert de clé au cache des choix déjà calculés,
+  limité à CACHE_CHOIX entrées (les moins récemment utilisées partent)
+- pour chaque proposition possible, la matrice des réponses face à tous
+  les candidats se calcule en un bloc (lecture de la table précalculée
+  pour le jeu standard, calcul par paquets NumPy au-delà), puis
+  numpy.bincount compte la taille de chaque groupe de réponse
+- heuristiques de choix :
+    minimax   plus petit « pire groupe » (Knuth, 1977)
+    moyenne   plus petite taille moyenne du groupe restant
+    entropie  plus grande quantité d'information
+  à égalité on préfère un candidat (il peut gagner tout de suite), puis
+  le plus petit indice
+- la première proposition ne dépend que de la forme de la combinaison
+  (1122 et 3344 découpent pareil) : on n'en évalue qu'une par forme
+
+Ligne de commande :
+    python solveur.py                         les 1296 secrets du jeu standard
+    python solveur.py --pions 5 --couleurs 8 --echantillon 300
+"""
+
+import argparse
+import random
+import time
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+import scoring
+
+HEURISTIQUES = ("minimax", "moyenne", "entropie")
+
+# Au-delà de ce nombre de cases (propositions x candidats), on ne cherche
+# la proposition que parmi les candidats
+BUDGET_PROPOSITIONS = 4_000_000
+
+# Taille maximale d'un bloc de calcul (cases propositions x candidats)
+BLOC = 1 << 22
+
+# Nombre maximal de choix gardés en cache (une clé pèse len(espace) / 8
+# octets : 162 octets pour le jeu standard, plusieurs Ko au-delà)
+CACHE_CHOIX = 20_000
+
+
+class Solveur:
+    def __init__(self, pions=scoring.PIONS, couleurs=scoring.COULEURS, heuristique="minimax"):
+        if heuristique not in HEURISTIQUES:
+            raise ValueError(f"heuristique inconnue : {heuristique!r}, choix : {HEURISTIQUES}")
+        self.espace = scoring.espace(pions, couleurs)
+        self.pions = pions
+        self.heuristique = heuristique
+        self.nb_retours = (pions + 1) ** 2
+        self.gagne = scoring.code_retour(pions, 0, pions)
+        self.table = self.espace.table() if len(self.espace) <= scoring.TABLE_MAX else None
+        self._choix = OrderedDict()   # candidats (bits compactés) -> proposition, LRU
+
+    # REPONSES EN BLOC
+    # ================
+    def retours_croises(self, propositions, candidats):
+        """Matrice (len(propositions), len(candidats)) des codes retour."""
+        if self.table is not None:
+            return self.table[np.ix_(propositions, candidats)]
+        espace = self.espace
+        dtype = espace.dtype_retour
+        # Colonnes contiguës : une comparaison 2D par pion et un minimum 2D
+        # par couleur, sans tableau temporaire à trois dimensions
+        codes_c = np.ascontiguousarray(espace.codes[candidats].T)
+        comptes_c = np.ascontiguousarray(espace.comptes[candidats].T)
+        pas = max(1, BLOC // max(1, len(candidats)))
+        resultat = np.empty((len(propositions), len(candidats)), dtype=dtype)
+        for debut in range(0, len(propositions), pas):
+            bloc = propositions[debut:debut + pas]
+            codes_p, comptes_p = espace.codes[bloc], espace.comptes[bloc]
+            bien = np.zeros((len(bloc), len(candidats)), dtype=dtype)
+            communs = np.zeros_like(bien)
+            for i in range(self.pions):
+                bien += codes_p[:, i, None] == codes_c[i]
+            for c in range(espace.couleurs):
+                communs += np.minimum(comptes_p[:, c, None], comptes_c[c])
+            communs -= bien
+            bien *= self.pions + 1
+            bien += communs
+            resultat[debut:debut + pas] = bien
+        return resultat
+
+    def _tailles(self, propositions, candidats):
+        """tailles[i, r] = nombre de candidats qui répondraient r à la proposition i."""
+        retours = self.retours_croises(propositions, candidats).astype(np.int64)
+        retours += (np.arange(len(propositions)) * self.nb_retours)[:, None]
+        return np.bincount(retours.ravel(), minlength=len(propositions) * self.nb_retours) \
+            .reshape(len(propositions), self.nb_retours)
+
+    def _notes(self, tailles, total):
+        """Note de chaque proposition : la plus petite est la meilleure."""
+        if self.heuristique == "minimax":
+            return tailles.max(axis=1).astype(np.float64)
+        if self.heuristique == "moyenne":
+            return (tailles.astype(np.float64) ** 2).sum(axis=1) / total
+        p = tailles / total
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(p > 0, p * np.log2(p), 0.0).sum(axis=1)   # -entropie
+
+    def _meilleure(self, propositions, candidats, masque):
+        notes = self._notes(self._tailles(propositions, candidats), len(candidats))
+        egales = propositions[notes == notes.min()]
+        parmi_candidats = egales[masque[egales]]
+        return int((parmi_candidats if len(parmi_candidats) else egales).min())
+
+    # CHOIX D'UNE PROPOSITION
+    # =======================
+    def formes(self):
+        """Une combinaison par forme : les couleurs apparaissent dans l'ordre 1, 2, 3..."""
+        codes = self.espace.codes
+        # Une couleur c ne peut apparaître que si c - 1 est déjà apparue avant
+        maximum = np.maximum.accumulate(codes, axis=1)
+        debut = np.concatenate([np.zeros((len(codes), 1), codes.dtype), maximum[:, :-1]], axis=1)
+        return np.flatnonzero(((codes <= debut + 1)).all(axis=1))
+
+    def choisir(self, masque):
+        """Indice de la proposition à jouer pour ces candidats (masque booléen)."""
+        cle = np.packbits(masque).tobytes()
+        choix = self._choix.get(cle)
+        if choix is not None:
+            self._choix.move_to_end(cle)
+            return choix
+        candidats = np.flatnonzero(masque)
+        if len(candidats) <= 2:
+            choix = int(candidats[0])
+        elif masque.all():
+            choix = self._meilleure(self.formes(), candidats, masque)
+        elif len(self.espace) * len(candidats) <= BUDGET_PROPOSITIONS:
+            choix = self._meilleure(np.arange(len(self.espace)), candidats, masque)
+        else:
+            choix = self._meilleure(candidats, candidats, masque)
+        self._choix[cle] = choix
+        if len(self._choix) > CACHE_CHOIX:
+            self._choix.popitem(last=False)
+        return choix
+
+    def filtrer(self, masque, proposition, retour):
+        """Candidats qui auraient donné `retour` (code) à `proposition` (indice)."""
+        candidats = np.flatnonzero(masque)
+        if self.table is not None:
+            retours = self.table[proposition, candidats]
+        else:
+            retours = self.espace.retours(self.espace.codes[proposition], candidats)
+        nouveau = np.zeros_like(masque)
+        nouveau[candidats[retours == retour]] = True
+        return nouveau
+
+    # PARTIES
+    # =======
+    def partie(self, repondre, tours_max=None):
+        """
+        Joue une partie : repondre(combinaison) doit renvoyer (bien, mal).
+        Renvoie la liste des (combinaison, (bien, mal)) jouées.
+        Lève ValueError si les réponses sont incohérentes.
+        """
+        masque = np.ones(len(self.espace), dtype=bool)
+        coups = []
+        while tours_max is None or len(coups) < tours_max:
+            proposition = self.choisir(masque)
+            combinaison = self.espace.combinaison(proposition)
+            bien, mal = repondre(combinaison)
+            coups.append((combinaison, (bien, mal)))
+            if bien == self.pions:
+                break
+            masque = self.filtrer(masque, proposition, scoring.code_retour(bien, mal, self.pions))
+            if not masque.any():
+                raise ValueError("aucune combinaison ne correspond à ces réponses")
+        return coups
+
+    def resoudre(self, secret):
+        """Partie contre un secret connu (liste de couleurs)."""
+        return self.partie(lambda combinaison: scoring.evaluer(combinaison, secret))
+
+
+# LIGNE DE COMMANDE
+# =================
+def main():
+    parser = argparse.ArgumentParser(description="Résout toutes les parties (ou un échantillon)")
+    parser.add_argument("--pions", type=int, default=scoring.PIONS)
+    parser.add_argument("--couleurs", type=int, default=scoring.COULEURS)
+    parser.add_argument("--heuristique", choices=HEURISTIQUES, default="minimax")
+    parser.add_argument("--echantillon", type=int, help="nombre de secrets tirés au hasard")
+    parser.add_argument("--graine", type=int, default=1)
+    args = parser.parse_args()
+
+    debut = time.perf_counter()
+    solveur = Solveur(args.pions, args.couleurs, args.heuristique)
+    total = len(solveur.espace)
+    secrets = range(total)
+    if args.echantillon and args.echantillon < total:
+        secrets = random.Random(args.graine).sample(range(total), args.echantillon)
+    coups = Counter()
+    for indice in secrets:
+        coups[len(solveur.resoudre(solveur.espace.combinaison(indice)))] += 1
+    duree = time.perf_counter() - debut
+
+    parties = sum(coups.values())
+    moyenne = sum(n * nombre for n, nombre in coups.items()) / parties
+    print(f"{args.pions} pions, {args.couleurs} couleurs ({total} combinaisons), "
+          f"{args.heuristique} : {parties} parties en {duree:.2f}s")
+    print(f"coups : moyenne {moyenne:.4f}, pire {max(coups)}")
+    for n in sorted(coups):
+        print(f"    {n} coups : {coups[n]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+TOURNOI DE STRATÉGIES
+=====================
+Simule sans affichage des milliers (ou des millions) de parties pour
+comparer des stratégies, sur plusieurs jeux (pions, couleurs, tours max).
+
+- les parties sont découpées en lots, joués en parallèle par un pool de
+  processus (un par cœur par défaut)
+- tirages reproductibles : les secrets d'un lot viennent de
+  numpy.random.default_rng([graine, pions, couleurs, lot]), les choix au
+  hasard d'une stratégie d'un générateur à part. Le résultat ne dépend
+  donc ni du nombre de processus ni de l'ordre des lots, et toutes les
+  stratégies jouent contre les mêmes secrets
+- chaque partie est écrite au fil de l'eau dans un fichier par colonne
+  (--sortie) : jeu, stratégie, secret, coups, gagné. Les fichiers sont
+  des tableaux binaires bruts, relus avec lire() (numpy.memmap) ;
+  colonnes.json décrit les types et la liste des jeux / stratégies
+- rapport par jeu et par stratégie : taux de victoire, moyenne et
+  répartition du nombre de coups, propositions par seconde
+
+Stratégies :
+    aleatoire   une combinaison au hasard à chaque tour
+    compatible  un candidat au hasard (compatible avec toutes les réponses)
+    premier     le premier candidat dans l'ordre 1111, 1112, ...
+    minimax, moyenne, entropie   voir solveur.py
+
+Ligne de commande :
+    python tournoi.py --strategies minimax compatible --parties 100000
+    python tournoi.py --pions 4 5 --couleurs 6 8 --tours 10 12 --sortie resultats
+"""
+
+import argparse
+import itertools
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import scoring
+from solveur import HEURISTIQUES, Solveur
+
+# COLONNES DU FICHIER DE RÉSULTATS
+# ================================
+COLONNES = {
+    "jeu": np.uint16,        # indice dans la liste "jeux" de colonnes.json
+    "strategie": np.uint8,   # indice dans la liste "strategies"
+    "secret": np.uint32,     # indice de la combinaison secrète (scoring.Espace)
+    "coups": np.uint8,       # propositions jouées
+    "gagne": np.bool_,
+}
+
+TAILLE_LOT = 2000
+
+
+# STRATÉGIES
+# ==========
+# strategie(solveur, masque des candidats, générateur) -> indice proposé
+def _aleatoire(solveur, masque, rng):
+    return int(rng.integers(len(masque)))
+
+
+def _compatible(solveur, masque, rng):
+    candidats = np.flatnonzero(masque)
+    return int(candidats[rng.integers(len(candidats))])
+
+
+def _premier(solveur, masque, rng):
+    return int(masque.argmax())
+
+
+def _choix_solveur(solveur, masque, rng):
+    return solveur.choisir(masque)
+
+
+STRATEGIES = {
+    "aleatoire": _aleatoire,
+    "compatible": _compatible,
+    "premier": _premier,
+    **{heuristique: _choix_solveur for heuristique in HEURISTIQUES},
+}
+
+# Un solveur par processus et par jeu : son cache de choix sert à tous les lots
+_solveurs = {}
+
+
+def _solveur(pions, couleurs, strategie):
+    heuristique = strategie if strategie in HEURISTIQUES else "minimax"
+    cle = (pions, couleurs, heuristique)
+    if cle not in _solveurs:
+        _solveurs[cle] = Solveur(pions, couleurs, heuristique)
+    return _solveurs[cle]
+
+
+# SIMULATION
+# ==========
+def simuler_lot(pions, couleurs, tours, strategie, graine, lot, taille):
+    """
+    Joue `taille` parties. Renvoie (secrets, coups, gagne, secondes) ;
+    les secrets ne dépendent que de (graine, pions, couleurs, lot).
+    """
+    solveur = _solveur(pions, couleurs, strategie)
+    choisir = STRATEGIES[strategie]
+    espace = solveur.espace
+    secrets = np.random.default_rng([graine, pions, couleurs, lot]) \
+        .integers(len(espace), size=taille, dtype=np.uint32)
+    rng = np.random.default_rng(
+        [graine, pions, couleurs, lot, 1 + sorted(STRATEGIES).index(strategie)])
+    coups = np.zeros(taille, dtype=np.uint8)
+    gagne = np.zeros(taille, dtype=np.bool_)
+    tout = np.ones(len(espace), dtype=bool)
+
+    debut = time.process_time()
+    for n, secret in enumerate(secrets):
+        masque = tout
+        secret = int(secret)
+        for tour in range(1, tours + 1):
+            proposition = choisir(solveur, masque, rng)
+            if proposition == secret:
+                coups[n], gagne[n] = tour, True
+                break
+            if solveur.table is not None:
+                retour = solveur.table[proposition, secret]
+            else:
+                retour = espace.retours(espace.codes[proposition], [secret])[0]
+            masque = solveur.filtrer(masque, proposition, retour)
+        else:
+            coups[n] = tours
+    return secrets, coups, gagne, time.process_time() - debut
+
+
+class Ecrivain:
+    """Ajoute les résultats à la fin d'un fichier binaire par colonne."""
+
+    def __init__(self, dossier, jeux, strategies):
+        os.makedirs(dossier, exist_ok=True)
+        self.dossier = dossier
+        self.jeux = jeux
+        self.strategies = strategies
+        self.lignes = 0
+        self._fichiers = {nom: open(os.path.join(dossier, f"{nom}.bin"), "wb")
+                          for nom in COLONNES}
+
+    def ajouter(self, **colonnes):
+        for nom, valeurs in colonnes.items():
+            np.asarray(valeurs, dtype=COLONNES[nom]).tofile(self._fichiers[nom])
+        self.lignes += len(colonnes["secret"])
+
+    def fermer(self):
+        for fichier in self._fichiers.values():
+            fichier.close()
+        meta = {
+            "lignes": self.lignes,
+            "colonnes": {nom: np.dtype(dtype).str for nom, dtype in COLONNES.items()},
+            "jeux": [dict(zip(("pions", "couleurs", "tours"), jeu)) for jeu in self.jeux],
+            "strategies": self.strategies,
+        }
+        with open(os.path.join(self.dossier, "colonnes.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+
+def lire(dossier):
+    """Colonnes d'un fichier de résultats (tableaux numpy.memmap) + description."""
+    with open(os.path.join(dossier, "colonnes.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    colonnes = {}
+    for nom, dtype in meta["colonnes"].items():
+        chemin = os.path.join(dossier, f"{nom}.bin")
+        colonnes[nom] = np.memmap(chemin, dtype=np.dtype(dtype), mode="r") \
+            if meta["lignes"] else np.empty(0, dtype=np.dtype(dtype))
+    return colonnes, meta
+
+
+# RAPPORT
+# =======
+class Bilan:
+    def __init__(self):
+        self.parties = 0
+        self.victoires = 0
+        self.propositions = 0
+        self.secondes = 0.0
+        self.repartition = Counter()   # coups des parties gagnées
+
+    def ajouter(self, coups, gagne, secondes):
+        self.parties += len(coups)
+        self.victoires += int(gagne.sum())
+        self.propositions += int(coups.sum())
+        self.secondes += secondes
+        self.repartition.update(coups[gagne].tolist())
+
+    def ligne(self, nom):
+        gagnes = sum(self.repartition.values())
+        moyenne = sum(n * k for n, k in self.repartition.items()) / gagnes if gagnes else 0
+        vitesse = self.propositions / self.secondes if self.secondes else 0
+        repartition = " ".join(f"{n}:{self.repartition[n]}" for n in sorted(self.repartition))
+        return (f"    {nom:<11}{self.parties:>9}{self.victoires / self.parties:>9.2%}"
+                f"{moyenne:>8.3f}{vitesse:>13,.0f}   {repartition}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tournoi de stratégies de Mastermind")
+    parser.add_argument("--pions", type=int, nargs="+", default=[scoring.PIONS])
+    parser.add_argument("--couleurs", type=int, nargs="+", default=[scoring.COULEURS])
+    parser.add_argument("--tours", type=int, nargs="+", default=[10], help="tours maximum")
+    parser.add_argument("--strategies", nargs="+", choices=sorted(STRATEGIES),
+                        default=["minimax", "compatible", "premier", "aleatoire"])
+    parser.add_argument("--parties", type=int, default=10000, help="parties par jeu et stratégie")
+    parser.add_argument("--graine", type=int, default=1)
+    parser.add_argument("--processus", type=int, default=os.cpu_count())
+    parser.add_argument("--lot", type=int, default=TAILLE_LOT, help="parties par tâche")
+    parser.add_argument("--sortie", help="dossier des fichiers colonnes (rien n'est écrit sinon)")
+    args = parser.parse_args()
+
+    jeux = list(itertools.product(args.pions, args.couleurs, args.tours))
+    taches = []
+    for (j, (pions, couleurs, tours)), (s, strategie) in itertools.product(
+            enumerate(jeux), enumerate(args.strategies)):
+        for lot, debut in enumerate(range(0, args.parties, args.lot)):
+            taille = min(args.lot, args.parties - debut)
+            taches.append((j, s, (pions, couleurs, tours, strategie, args.graine, lot, taille)))
+
+    ecrivain = Ecrivain(args.sortie, jeux, args.strategies) if args.sortie else None
+    bilans = defaultdict(Bilan)
+    debut = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.processus) as pool:
+        futures = {pool.submit(simuler_lot, *params): (j, s) for j, s, params in taches}
+        for future in as_completed(futures):
+            j, s = futures[future]
+            secrets, coups, gagne, secondes = future.result()
+            bilans[j, s].ajouter(coups, gagne, secondes)
+            if ecrivain:
+                ecrivain.ajouter(jeu=np.full(len(secrets), j), strategie=np.full(len(secrets), s),
+                                 secret=secrets, coups=coups, gagne=gagne)
+    if ecrivain:
+        ecrivain.fermer()
+    duree = time.perf_counter() - debut
+
+    total = sum(bilan.parties for bilan in bilans.values())
+    print(f"{total} parties en {duree:.1f}s ({total / duree:,.0f} parties/s, "
+          f"{args.processus} processus)")
+    for j, (pions, couleurs, tours) in enumerate(jeux):
+        print(f"{pions} pions, {couleurs} couleurs, {tours} tours")
+        print(f"    {'stratégie':<11}{'parties':>9}{'gagnées':>9}{'coups':>8}"
+              f"{'prop./s':>13}   coups des parties gagnées")
+        for s, strategie in enumerate(args.strategies):
+            print(bilans[j, s].ligne(strategie))
+    if ecrivain:
+        print(f"résultats : {args.sortie} ({ecrivain.lignes} lignes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,8 @@
-const parametres = new URLSearchParams(window.location.search);
\ No newline at end of file
+const parametres = new URLSearchParams(window.location.search);
+
+// visualiseur.html?id=3 -> le PDF est servi par /lessons/3/file
+// (requêtes Range : le lecteur ne télécharge que les pages affichées)
+const idLesson = parametres.get("id");
+if (idLesson) {
+    document.getElementById("lecteurPDF").src = "/lessons/" + encodeURIComponent(idLesson) + "/file";
+}
@@ -1,31 +1,62 @@
-import sqlite3
+import os
+import sys
 from flask import Flask
+
+# database.py, users.py, hashing.py sont dans le dossier parent (Projet Certif/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import hashing
+import users
+
 app = Flask (__name__)
-from flask import request, render_template
+# Réponses JSON compactes (pas d'indentation ni d'espaces inutiles)
+app.json.compact = True
+from flask import request
 
 @app.route('/connexion', methods=['GET', 'POST'])
 def connexion():
-    if request.method == 'POST':
-        # C'est ici qu'on récupère les données du formulaire
-        # Disons que tes champs HTML ont name="pseudo" et name="password"
-        
-    
-        valeur_pseudo = request.form['username']
-        valeur_mdp = request.form['password']
+    """
+    API JSON de connexion (appelée en AJAX, voir demo ajax/ajax.js).
+    POST username + password (formulaire ou JSON)
+    Réponses :
+        200 {"ok":true,"username":"..."}
+        400 {"ok":false,"error":"missing fields"}
+        400 {"ok":false,"error":"bad request"}   (JSON qui n'est pas un objet,
+                                                   champs qui ne sont pas du texte)
+        401 {"ok":false,"error":"invalid credentials"}
+        405 {"ok":false,"error":"method not allowed"}   (GET)
+        429 / 503 trop d'essais / serveur occupé
+    """
+    if request.method != 'POST':
+        return {"ok": False, "error": "method not allowed"}, 405, {"Allow": "POST"}
 
-        # 1. On se connecte à la base de données
-        conn = sqlite3.connect('../BDD/BDD.db')
-        cursor = conn.cursor()
+    # On accepte un formulaire classique ou un corps JSON
+    donnees = request.get_json(silent=True)
+    if donnees is None:
+        donnees = request.form
+    if not isinstance(donnees, dict):
+        return {"ok": False, "error": "bad request"}, 400
+    valeur_pseudo = donnees.get('username')
+    valeur_mdp = donnees.get('password')
+    if not valeur_pseudo or not valeur_mdp:
+        return {"ok": False, "error": "missing fields"}, 400
+    if not isinstance(valeur_pseudo, str) or not isinstance(valeur_mdp, str):
+        return {"ok": False, "error": "bad request"}, 400
 
-        # 2. On vérifie si ce duo (username + pwd) existe dans la table Users
-        cursor.execute("SELECT * FROM Users WHERE username = ? AND pwd = ?", (valeur_pseudo, valeur_mdp))
-        utilisateur = cursor.fetchone()
+    # Trop d'essais pour ce pseudo ou cette IP -> refus avant tout calcul
+    try:
+        hashing.check_attempt(valeur_pseudo, request.remote_addr)
+    except hashing.TooManyAttempts:
+        return {"ok": False, "error": "too many attempts"}, 429
 
-        # 3. On ferme la connexion (c'est important !)
-        conn.close()
+    # Une seule requête SQL sur l'index UNIQUE de username, via le pool de
+    # connexions (users.py), puis vérification du hash (hashing.py).
+    # Un ancien mot de passe en clair est remplacé par un hash au passage.
+    try:
+        valide = users.authenticate(valeur_pseudo, valeur_mdp)
+    except hashing.HashingBusy:
+        return {"ok": False, "error": "busy"}, 503
 
-        # 4. On décide quoi afficher
-        if utilisateur:
-            return "Connexion réussie ! Bienvenue " + valeur_pseudo
-        else:
-            return "Erreur : Identifiant ou mot de passe incorrect."
\ No newline at end of file
+    if valide:
+        hashing.login_succeeded(valeur_pseudo)
+        return {"ok": True, "username": valeur_pseudo}
+    return {"ok": False, "error": "invalid credentials"}, 401
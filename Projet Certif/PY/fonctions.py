@@ -1,26 +1,46 @@
-import sqlite3
+import os
+import sys
+
+# database.py est dans le dossier parent (Projet Certif/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import connection
+from queries import lessons_by, lessons_by_ids, lessons_page, iter_lessons
 
 def fetch_lessons_by_id(select,id) :
     """
     id => value to search for
     select => column to search in (e.g., 'lesson' or 'user')
+    Raises ValueError if select is not a known column (see queries.COLUMNS).
     """
-    conn = sqlite3.connect("node/BDD/BDD.db")
-    cursor = conn.cursor()
-    cursor.execute(f"SELECT file_path FROM Lessons WHERE id_{select} = {id}")
-    donnees = [x[0] for x in cursor.fetchall()]
-    conn.close()
-    return donnees
+    return [lesson.file_path for lesson in lessons_by(select, id)]
+
+def fetch_lessons_by_ids(ids) :
+    """
+    ids => list of id_lesson
+    One query per chunk of ids (IN (...)), not one query per id.
+    """
+    return [lesson.file_path for lesson in lessons_by_ids(ids)]
+
+def fetch_lessons_page(offset, limit) :
+    """
+    offset => number of lessons to skip
+    limit => number of lessons to return
+    """
+    return [lesson.file_path for lesson in lessons_page(offset, limit)]
+
+def iter_lessons_all() :
+    """Same as fetch_lessons_all but yields the paths one by one."""
+    for lesson in iter_lessons() :
+        yield lesson.file_path
 
 def fetch_lessons_all() :
-    conn = sqlite3.connect("node/BDD/BDD.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT file_path FROM Lessons")
-    donnees = [x[0] for x in cursor.fetchall()]
-    conn.close()
+    with connection() as conn:
+        cursor = conn.execute("SELECT file_path FROM Lessons")
+        donnees = [x[0] for x in cursor.fetchall()]
     return donnees
 
-for p in fetch_lessons_by_id('user',1) :
-    print(p)
-# print(fetch_lessons_by_id('user',1))
-# print(fetch_lessons_by_id('lesson',2))
\ No newline at end of file
+if __name__ == "__main__":
+    for p in fetch_lessons_by_id('user',1) :
+        print(p)
+    # print(fetch_lessons_by_id('user',1))
+    # print(fetch_lessons_by_id('lesson',2))
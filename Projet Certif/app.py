@@ -10,21 +10,41 @@ Features:
 - Password security using werkzeug
 
 Why Flask? Lightweight web framework perfect for small to medium applications.
-Why Werkzeug? Provides cryptographic password hashing for security.
+Why Werkzeug? Provides cryptographic password hashing for security
+(run in a separate process pool, see hashing.py).
 Why Sessions? Keeps users logged in across multiple page visits.
 """
 
 # IMPORT REQUIRED LIBRARIES
 # =========================
-from flask import Flask, render_template, request, redirect, session
-from werkzeug.security import generate_password_hash, check_password_hash
-import sqlite3
+import json
+import os
+import threading
+
+from flask import Flask, Response, abort, request, redirect, send_file, session, stream_with_context
+import assets
+import database
+import favorites
+import hashing
+import importer
+import lesson_files
+import migrations
+import page_cache
+import previews
+import profiling
+import sessions
+import queries
+import replicas
+import search
+import users
 
 # Fonction utilitaire pour obtenir une connexion
+# La connexion vient du pool partagé (database.py) : elle n'est plus ouverte
+# et fermée à chaque requête, le bloc `with` la rend au pool.
+#   with get_db_connection() as conn:
+#       conn.execute(...)
 def get_db_connection():
-    conn = sqlite3.connect('BDD.db')  # ton fichier SQLite
-    conn.row_factory = sqlite3.Row   # pour pouvoir accéder aux colonnes par nom
-    return conn
+    return database.connection()
 
 
 # INITIALIZE FLASK APPLICATION
@@ -41,19 +61,52 @@ app = Flask(__name__)
 # BETTER: Load from environment variable: os.getenv('SECRET_KEY')
 app.secret_key = "un_truc_long_et_secret"
 
-# IN-MEMORY USER DATABASE
+# STATIC ASSETS
+# =============
+# CSS / JS / HTML are minified, fingerprinted and pre-compressed by the
+# build step (assets.py, run by start() if build/assets/ is missing) and
+# served under /assets/ with far-future immutable cache headers
+load_assets = assets.install(app)
+
+# COMPILED TEMPLATES AND PAGE CACHE
+# =================================
+# Every template is compiled by start() (bytecode cached on disk), the
+# home page and the login form are rendered once and kept in memory with
+# an ETag (page_cache.py)
+pages = page_cache.install(app)
+
+# SERVER-SIDE SESSIONS
+# ====================
+# The session cookie only holds a random id, the data is kept on the server
+# (Sessions table + in-memory cache, see sessions.py). Logout really deletes
+# the session, and all sessions of a user can be revoked at once.
+# SESSION_BACKEND=cookie goes back to Flask's signed cookies.
+sessions.install(app)
+
+# ZERO-COPY FILE DELIVERY
 # =======================
-# Dictionary to store users: { "username": "hashed_password" }
-# This simulates a database. In production, use SQLite, PostgreSQL, etc.
-# Why a dict? Fast lookups by username, easy to understand for learning
-# Why in-memory? Data is lost when server restarts (fine for demo)
-#
-# Example after 2 registrations:
-# users_db = {
-#     "alice": "pbkdf2:sha256:260000$...",
-#     "bob": "pbkdf2:sha256:260000$..."
-# }
-users_db = {}
+# send_file() hands the open file to the WSGI server (wsgi.file_wrapper):
+# gunicorn then uses sendfile(), the PDF goes from disk to socket without
+# being copied through Python. Behind nginx/apache, USE_X_SENDFILE=1 lets
+# the web server send the file itself.
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
+LESSON_FILE_MAX_AGE = int(os.environ.get('LESSON_FILE_MAX_AGE', '3600'))
+
+# PROFILING
+# =========
+# PROFILING=1: per-route wall / CPU / SQL / template / hashing time and a
+# slow-query log (profiling.py). /__metrics gathers them with the pool and
+# hashing metrics; without PROFILING nothing is measured per request.
+profiling.install(app)
+
+# PERSISTENT USER STORE
+# =====================
+# Users are stored in the Users table of BDD.db (see users.py):
+# - accounts survive a server restart
+# - every worker process (gunicorn -w 4 ...) sees the same accounts
+# - username is UNIQUE in the table, so the lookup uses its index
+# A short-lived cache username -> hash avoids a database query for each
+# login; a write (new account, new password) invalidates it in every worker.
 
 # ROUTE 1: CONNECTION PAGE
 # ========================
@@ -69,8 +122,10 @@ def connexion():
     
     Why separate route? Allows users to access the login form.
     Why separate template? Keeps HTML organized, not mixed with Python.
+    Why cached? The form is the same for everybody: it is rendered once,
+    then served from memory (304 if the browser already has it).
     """
-    return render_template("connexion.html")
+    return page_cache.respond(pages.page("connexion.html"))
 
 # ROUTE 2: HOME PAGE
 # ==================
@@ -88,19 +143,25 @@ def accueil():
     3. If no: user is not logged in -> show welcome message + login/register links
     
     Sessions:
-    - Session is a dictionary stored in encrypted user cookie
+    - Session is a dictionary stored on the server, the cookie holds its id
     - Survives browser refresh/page navigation
     - Expires when browser closes (or after timeout)
     
-    Returns: HTML string with content appropriate for user status
+    Caching:
+    - anonymous page: rendered once, same bytes and ETag for everybody
+    - logged-in page: rendered once around the username, each request only
+      inserts the (escaped) username; private ETag per user
+    
+    Returns: HTML page 'accueil.html' with content appropriate for user status
     """
     if 'username' in session:
         # User is logged in
         # session['username'] contains their username
-        return f"Hello, {session['username']}! <a href='/logout'>Logout</a>"
+        return page_cache.respond(pages.user_page("accueil.html", session['username']),
+                                  private=True)
     
     # User is not logged in
-    return "Welcome! <a href='/login'>Login</a> or <a href='/register'>Register</a>"
+    return page_cache.respond(pages.page("accueil.html"))
 
 # ROUTE 3: USER REGISTRATION
 # ===========================
@@ -133,7 +194,7 @@ def register():
         ↓
     Get username + password from form
         ↓
-    Username exists in users_db?
+    Username exists in Users table?
         ├→ YES: Return error message
         └→ NO: Hash password → Store in DB → Redirect to /login
     """
@@ -141,21 +202,35 @@ def register():
         # Extract form data
         username = request.form['nom']   # Get username from form
         password = request.form['password']   # Get password from form
+        birth_date = request.form.get('ddn', '')   # Other NOT NULL columns of Users
+        tel = request.form.get('tel', '')
+        email = request.form.get('email', '')
+        if not (birth_date and tel and email):
+            return "Missing fields. <a href='/register'>Try again</a>."
         
         # CHECK IF USERNAME ALREADY EXISTS
         # Prevent duplicate accounts with same username
-        if username in users_db:
+        # (fast path: the cache / the UNIQUE index on username)
+        if users.get_password_hash(username) is not None:
             return "Username already exists. <a href='/register'>Try again</a>."
         
         # HASH THE PASSWORD
-        # generate_password_hash() uses PBKDF2 with SHA256
+        # hashing.hash_password() uses werkzeug's PBKDF2 with SHA256
         # Applies salt (random data) to prevent rainbow table attacks
         # Creates irreversible hash of password
-        hashed_password = generate_password_hash(password)
+        # Runs in the hashing process pool so this thread is not blocked
+        try:
+            hashed_password = hashing.hash_password(password)
+        except hashing.HashingBusy:
+            return "Server busy, please retry in a moment.", 503
         
         # STORE NEW USER IN DATABASE
-        # Key: username, Value: hashed password
-        users_db[username] = hashed_password
+        # The UNIQUE constraints (username, tel, email) still protect us if
+        # two workers register the same user at the same time
+        try:
+            users.create_user(username, hashed_password, birth_date, tel, email)
+        except users.UserExists:
+            return "Username, phone or email already used. <a href='/register'>Try again</a>."
         
         # REDIRECT TO LOGIN PAGE
         # User must now log in with their new credentials
@@ -193,9 +268,9 @@ def login():
     - If hashes match, we know password is correct
     
     Sessions:
-    - session['username'] = username stores data in encrypted cookie
-    - This cookie is sent with every request to server
-    - Server decrypts it using secret_key to access data
+    - session['username'] = username stores data in the session store
+    - The session id cookie is sent with every request to server
+    - Server looks the id up (memory first, then the Sessions table)
     - Persists across page navigation
     
     Flow chart:
@@ -203,30 +278,46 @@ def login():
         ↓
     Get username + password from form
         ↓
-    Username exists in users_db?
+    Username exists in Users table?
         ├→ NO: Return error
         └→ YES: Hash input password, compare with stored hash
             ├→ MISMATCH: Return error
             └→ MATCH: Create session → Redirect to /
+    (users.authenticate(), shared with PY/app.py and asgi_app.py)
     """
     if request.method == 'POST':
         # Extract form data
         username = request.form['username']   # Get username from form
         password = request.form['password']   # Get password from form
         
-        # LOOK UP USER IN DATABASE
-        # Get the stored hashed password for this username
-        # .get() returns None if username doesn't exist (safe)
-        hashed_password = users_db.get(username)
+        # LIMIT ATTEMPTS
+        # Too many tries for this username or from this IP -> refuse
+        # before spending any CPU on hashing
+        try:
+            hashing.check_attempt(username, request.remote_addr)
+        except hashing.TooManyAttempts:
+            return "Too many attempts, please wait a minute.", 429
         
         # VALIDATE CREDENTIALS
-        # Two conditions must be true:
-        # 1. User exists (hashed_password is not None)
-        # 2. Password matches (check_password_hash compares input with stored hash)
-        if hashed_password and check_password_hash(hashed_password, password):
+        # users.authenticate() looks the user up in the database and:
+        # 1. User exists (stored password is not None)
+        # 2. Password matches (compared with the stored hash in the hashing
+        #    process pool, or in constant time for a legacy plaintext one)
+        # A plaintext or old-cost password is replaced by a new hash, since
+        # we know the plain password right now
+        try:
+            valid = users.authenticate(username, password)
+        except hashing.HashingBusy:
+            return "Server busy, please retry in a moment.", 503
+        if valid:
             # PASSWORD IS CORRECT
-            # Create session for this user
+            hashing.login_succeeded(username)
+            
+            # Create session for this user, under a new session id: an id
+            # planted before login (session fixation) stays anonymous
+            sessions.regenerate(session)
             session['username'] = username
+            session['id_user'] = users.get_user_id(username)
             
             # Redirect to home page
             # Now home() will see 'username' in session and show logged-in content
@@ -255,19 +346,19 @@ def logout():
     Methods: GET (link click)
     
     Process:
-    1. Remove username from session dictionary
+    1. Empty the session dictionary
     2. Redirect to home page
     3. Home page will now show logged-out content
     
-    session.pop() explanation:
-    - Removes 'username' key from session dictionary
-    - Second argument 'None' is default if key doesn't exist (no error)
-    - After this, session is empty
+    session.clear() explanation:
+    - Removes every key (username, id_user, ...) from the session
+    - An empty session is deleted from the session store and its
+      cookie is removed
     
     Flow:
     GET /logout
         ↓
-    session.pop('username', None)  [Remove user session]
+    session.clear()  [Remove user session]
         ↓
     Redirect to /  [Go to home page]
         ↓
@@ -275,8 +366,358 @@ def logout():
         ↓
     Display logged-out content
     """
-    # Remove the username from the session dictionary
-    session.pop('username', None)
+    # Empty the session: the server-side row and the cookie are deleted
+    session.clear()
     
     # Redirect to lgin page
-    return redirect('accueil.html')
\ No newline at end of file
+    return redirect('accueil.html')
+
+# ROUTE 6: LOGOUT EVERYWHERE
+# ==========================
+# Revoke every session of the current user (all browsers / devices)
+@app.route('/logout/all')
+def logout_all():
+    """
+    Log the current user out of every session.
+    URL: http://localhost:5000/logout/all
+    Methods: GET (link click)
+
+    Only possible with server-side sessions: a signed cookie cannot be
+    revoked, a session row can.
+    """
+    username = session.get('username')
+    if username is not None:
+        sessions.revoke_user(username)
+    session.clear()
+    return redirect('/')
+
+
+# ROUTE 7: LESSONS CATALOGUE (JSON API)
+# =====================================
+# List the Lessons table page by page, streamed as it is read
+LESSONS_PAGE_DEFAULT = 50
+LESSONS_PAGE_MAX = 500
+
+@app.route('/api/lessons')
+def api_lessons():
+    """
+    Return one page of the lessons catalogue as JSON.
+    URL: http://localhost:5000/api/lessons?after=0&limit=50&id_user=3
+    Methods: GET (only)
+
+    Parameters (query string, all optional):
+    - after: last id_lesson of the previous page (keyset pagination)
+    - limit: page size (default 50, max 500)
+    - id_user: only the lessons of this user
+
+    Response:
+    {"lessons": [{"id_lesson": 1, ...}, ...], "next": 51}
+    "next" is the value to pass as `after` for the next page,
+    or null when there is nothing left.
+
+    Why keyset and not OFFSET? "id_lesson > after" jumps straight to the
+    page through the primary key, OFFSET re-reads every skipped row.
+    Why a generator? Each row is written to the response as soon as it is
+    read, the page is never built as a whole list in memory.
+    """
+    after = request.args.get('after', 0, type=int)
+    limit = request.args.get('limit', LESSONS_PAGE_DEFAULT, type=int)
+    limit = max(1, min(limit, LESSONS_PAGE_MAX))
+    id_user = request.args.get('id_user', None, type=int)
+
+    def generate():
+        yield '{"lessons": ['
+        last_id = None
+        count = 0
+        has_more = False
+        # One row more than asked tells us whether a next page exists
+        for lesson in queries.iter_lessons_after(after, limit + 1, id_user):
+            if count == limit:
+                has_more = True
+                break
+            yield (',' if count else '') + json.dumps(lesson._asdict())
+            last_id = lesson.id_lesson
+            count += 1
+        yield '], "next": ' + json.dumps(last_id if has_more else None) + '}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+# ROUTE 8: LESSON PDF DELIVERY
+# ============================
+# Serve the PDF of a lesson, with Range requests and conditional GETs
+@app.route('/lessons/<int:id_lesson>/file')
+def lesson_file(id_lesson):
+    """
+    Send the PDF file of one lesson.
+    URL: http://localhost:5000/lessons/3/file
+    Methods: GET, HEAD
+
+    - file_path is read from the Lessons table, then checked to be inside
+      the lessons/ folder (404 otherwise)
+    - Range: bytes=... -> 206 Partial Content, so the PDF viewer can seek
+      in a large file without downloading all of it
+    - ETag / Last-Modified -> If-None-Match / If-Modified-Since answer
+      304 Not Modified, nothing is re-downloaded
+    """
+    lesson = queries.lesson_by_id(id_lesson)
+    path = lesson_files.resolve_lesson_file(lesson.file_path) if lesson else None
+    if path is None:
+        abort(404)
+    return send_file(path, mimetype='application/pdf', conditional=True,
+                     etag=True, max_age=LESSON_FILE_MAX_AGE,
+                     download_name=os.path.basename(path))
+
+# ROUTE 9: LESSON PREVIEWS
+# ========================
+# Thumbnail image and page count of a lesson, from the preview cache
+@app.route('/lessons/<int:id_lesson>/preview')
+def lesson_preview(id_lesson):
+    """
+    Send the first-page thumbnail of a lesson (PNG, or SVG without renderer).
+    URL: http://localhost:5000/lessons/3/preview
+    Methods: GET
+
+    The ETag is the SHA-256 of the PDF: as long as the PDF does not change
+    the browser gets 304. With ?v=<sha> in the URL (as returned by
+    /api/lessons/<id>/preview) the image is cached for a year.
+    404 while the preview is not built yet: the lesson is queued for the
+    background indexer, nothing is rendered during the request.
+    """
+    preview = previews.get_preview(id_lesson)
+    if preview is None:
+        abort(404)
+    versioned = request.args.get('v') == preview['sha256'][:12]
+    response = send_file(preview['thumbnail'], conditional=True,
+                         etag=preview['sha256'],
+                         max_age=31536000 if versioned else 300)
+    if versioned:
+        response.cache_control.immutable = True
+    return response
+
+@app.route('/api/lessons/<int:id_lesson>/preview')
+def api_lesson_preview(id_lesson):
+    """
+    Preview metadata as JSON.
+    URL: http://localhost:5000/api/lessons/3/preview
+    Returns: {"id_lesson": 3, "page_count": 12, "thumbnail": "/lessons/3/preview?v=..."}
+    """
+    preview = previews.get_preview(id_lesson)
+    if preview is None:
+        abort(404)
+    return {
+        'id_lesson': id_lesson,
+        'page_count': preview['page_count'],
+        'thumbnail': f"/lessons/{id_lesson}/preview?v={preview['sha256'][:12]}",
+    }
+
+# ROUTE 10: FULL-TEXT SEARCH
+# ==========================
+# Search lesson titles and PDF contents
+SEARCH_LIMIT_MAX = 100
+
+@app.route('/api/search')
+def api_search():
+    """
+    Search the lessons.
+    URL: http://localhost:5000/api/search?q=fonc&limit=20
+    Methods: GET
+
+    - every word must appear, as a word prefix ("fonc" finds "fonctions")
+    - results are ranked with BM25, a match in the title counts more
+    - snippet: piece of text around the match, matches in <mark>...</mark>
+
+    Returns: {"query": "fonc", "results": [{"id_lesson", "title", "snippet", "score"}, ...]}
+    """
+    text = request.args.get('q', '')
+    limit = max(1, min(request.args.get('limit', 20, type=int), SEARCH_LIMIT_MAX))
+    return {'query': text, 'results': search.search(text, limit)}
+
+# ROUTE 11: FAVORITES
+# ===================
+# Favorite / unfavorite lessons, list favorites, most favorited lessons
+FAVORITES_LIMIT_MAX = 500
+
+def current_user_id():
+    """id_user of the logged-in user, or None."""
+    if 'username' not in session:
+        return None
+    if session.get('id_user') is None:
+        session['id_user'] = users.get_user_id(session['username'])
+    return session['id_user']
+
+@app.route('/api/favorites/<int:id_lesson>', methods=['POST', 'DELETE'])
+def api_favorite(id_lesson):
+    """
+    Favorite (POST) or unfavorite (DELETE) a lesson for the logged-in user.
+    URL: http://localhost:5000/api/favorites/3
+    Returns: {"id_lesson": 3, "favorite": true, "changed": true}
+    """
+    id_user = current_user_id()
+    if id_user is None:
+        return {'error': 'login required'}, 401
+    if request.method == 'POST':
+        # fresh: a lesson created a second ago may not be in the snapshot yet
+        if queries.lesson_by_id(id_lesson, fresh=True) is None:
+            abort(404)
+        try:
+            changed = favorites.add(id_user, id_lesson)
+        except favorites.NotFound:
+            # Lesson deleted since the check above, or the account behind
+            # this session was deleted: log it out
+            if queries.lesson_by_id(id_lesson, fresh=True) is None:
+                abort(404)
+            session.clear()
+            return {'error': 'login required'}, 401
+        return {'id_lesson': id_lesson, 'favorite': True, 'changed': changed}, 201 if changed else 200
+    changed = favorites.remove(id_user, id_lesson)
+    return {'id_lesson': id_lesson, 'favorite': False, 'changed': changed}
+
+@app.route('/api/favorites')
+def api_favorites():
+    """
+    Favorites of the logged-in user.
+    URL: http://localhost:5000/api/favorites?limit=100
+    Returns: {"count": 2, "favorites": [{"id_lesson": ..., "date_added": ...}, ...]}
+    The count comes from the counter table, not from a COUNT(*).
+    """
+    id_user = current_user_id()
+    if id_user is None:
+        return {'error': 'login required'}, 401
+    limit = max(1, min(request.args.get('limit', 100, type=int), FAVORITES_LIMIT_MAX))
+    rows, count = favorites.of_user(id_user, limit)
+    return {'count': count,
+            'favorites': [dict(lesson._asdict(), date_added=date) for lesson, date in rows]}
+
+@app.route('/api/lessons/<int:id_lesson>/favorites')
+def api_lesson_favorites(id_lesson):
+    """
+    Who favorited a lesson, latest first (index on id_lesson, date_added).
+    URL: http://localhost:5000/api/lessons/3/favorites?limit=100
+    """
+    limit = max(1, min(request.args.get('limit', 100, type=int), FAVORITES_LIMIT_MAX))
+    rows, count = favorites.of_lesson(id_lesson, limit)
+    return {'id_lesson': id_lesson, 'count': count, 'users': rows}
+
+@app.route('/api/lessons/trending')
+def api_trending():
+    """
+    Most favorited lessons.
+    URL: http://localhost:5000/api/lessons/trending?limit=10
+    Reads the first `limit` rows of the popularity index: O(limit).
+    """
+    limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+    return {'lessons': [dict(lesson._asdict(), favorites=count)
+                        for lesson, count in favorites.trending(limit)]}
+
+# ROUTE 12: HASHING POOL METRICS
+# =============================
+# Queue depth and hash latency percentiles in Prometheus text format
+@app.route('/metrics/hash')
+def metrics_hash():
+    """
+    Expose the password hashing pool metrics.
+    URL: http://localhost:5000/metrics/hash
+    Methods: GET
+    Local requests or PROFILING_TOKEN only, like /__metrics.
+    """
+    profiling.check_access()
+    return hashing.metrics_text(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
+# ROUTE 13: DATABASE POOL METRICS
+# ==============================
+# Pool hit/miss/wait counters in Prometheus text format
+@app.route('/metrics/bdd')
+def metrics_bdd():
+    """
+    Expose the connection pool counters.
+    URL: http://localhost:5000/metrics/bdd
+    Methods: GET (scraped by Prometheus or read by hand)
+    Local requests or PROFILING_TOKEN only, like /__metrics.
+    """
+    profiling.check_access()
+    return database.metrics_text(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
+# ROUTE 14: READ REPLICA METRICS
+# ==============================
+# Staleness of the snapshot serving the catalogue and search reads
+@app.route('/metrics/replicas')
+def metrics_replicas():
+    """
+    Expose the read replica staleness and refresh counters.
+    URL: http://localhost:5000/metrics/replicas
+    Methods: GET
+    bdd_replica_staleness_seconds never exceeds bdd_replica_max_staleness_seconds
+    for the reads it serves: past the bound they go to the primary database.
+    Local requests or PROFILING_TOKEN only, like /__metrics.
+    """
+    profiling.check_access()
+    return replicas.metrics_text(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
+
+# STARTUP
+# =======
+# Importing this module changes nothing on disk and starts no thread
+# (python -c "import app", tools, tests). The schema migration, the asset
+# build, the template compilation and the background jobs run once, when
+# a server starts: create_app() (gunicorn 'app:create_app()', python
+# app.py) or the first request (flask run).
+_started = False
+_start_lock = threading.Lock()
+
+
+def start():
+    global _started
+    if _started:
+        return
+    with _start_lock:
+        if _started:
+            return
+
+        # DATABASE SCHEMA
+        # Bring BDD.db up to the schema version the code expects
+        # (migrations.py): extra tables, indexes and triggers used by the
+        # modules below
+        migrations.migrate()
+        # Indexes / triggers left dropped by a bulk import that was killed
+        importer.recover()
+
+        # STATIC ASSETS AND COMPILED TEMPLATES
+        # build/assets/ is built if missing (each worker may try: the new
+        # build is switched in atomically, see assets.build()), then every
+        # template is compiled into the bytecode cache
+        load_assets()
+        page_cache.configure_environment(app.jinja_env)
+
+        # LESSON PREVIEWS
+        # Page count + first-page thumbnail of each PDF are computed in the
+        # background (previews.py), never while answering a request.
+        previews.start_indexer()
+
+        # FULL-TEXT SEARCH INDEX
+        # The FTS5 index is kept up to date by a background pass that only
+        # re-reads new or changed PDFs (search.py)
+        search.start_indexer()
+
+        # READ REPLICAS
+        # READ_REPLICAS=1: the catalogue and search reads are served by
+        # read-only snapshots of BDD.db refreshed every few seconds
+        # (replicas.py), so a long import or a burst of writes does not slow
+        # them down. Their staleness is bounded (REPLICA_MAX_STALENESS) and
+        # exposed on /metrics/replicas.
+        replicas.start()
+        _started = True
+
+
+@app.before_request
+def start_on_first_request():
+    start()
+
+
+def create_app():
+    """Start the server side (migration, background jobs) and return the app."""
+    start()
+    return app
+
+
+if __name__ == "__main__":
+    create_app().run()
@@ -0,0 +1,508 @@
+"""
+ASGI AUTHENTICATION APPLICATION
+===============================
+The routes of app.py (/connexion, /register, /login, /logout, /) served
+by an asyncio application instead of Flask threads.
+
+With the WSGI app every request in flight holds an OS thread, and most
+of that time the thread only waits: for SQLite, or for the hashing
+process pool. Here a request is a coroutine:
+- database work (users.py, sessions.py) runs in a small thread pool,
+  one thread per pooled connection (ASGI_DB_THREADS)
+- hashing is awaited on the hashing process pool without any thread
+  (hashing.hash_password_async / verify_password_async)
+- waiting requests and idle keep-alive connections cost a few KB each,
+  so one process holds thousands of them
+
+Same database, same server-side sessions and same session cookie as
+app.py: both apps can run side by side on one BDD.db.
+
+Run it (from Projet Certif/):
+    uvicorn asgi_app:app            (any ASGI server)
+    python asgi_app.py [port]       (built-in server, no dependency)
+"""
+
+import asyncio
+import logging
+import os
+import secrets
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qsl, unquote
+
+import jinja2
+
+import assets
+import database
+import hashing
+import migrations
+import page_cache
+import sessions
+import users
+
+# CONFIGURATION
+# =============
+ASGI_DB_THREADS = int(os.environ.get("ASGI_DB_THREADS", str(database.POOL_SIZE)))
+ASGI_MAX_BODY = int(os.environ.get("ASGI_MAX_BODY", "65536"))
+# Same cookie name as Flask's default, so a session opened on one app is
+# valid on the other
+SESSION_COOKIE = os.environ.get("SESSION_COOKIE_NAME", "session")
+# Same attributes as the Flask cookie (sessions.install())
+SESSION_COOKIE_ATTRIBUTES = "; HttpOnly; Path=/" + (
+    f"; SameSite={sessions.SESSION_COOKIE_SAMESITE}" if sessions.SESSION_COOKIE_SAMESITE else "") + (
+    "; Secure" if sessions.SESSION_COOKIE_SECURE else "")
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+log = logging.getLogger(__name__)
+
+
+class Request:
+    """What a route needs from the ASGI scope and body."""
+
+    def __init__(self, scope, body):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.headers = {name.decode("latin-1"): value.decode("latin-1")
+                        for name, value in scope.get("headers", [])}
+        self.remote_addr = (scope.get("client") or ("", 0))[0]
+        self.body = body
+        cookie = SimpleCookie()
+        try:
+            cookie.load(self.headers.get("cookie", ""))
+        except Exception:
+            pass   # malformed cookie header: behave as if there was none
+        self.cookies = {name: morsel.value for name, morsel in cookie.items()}
+        self._form = None
+
+    @property
+    def form(self):
+        if self._form is None:
+            self._form = dict(parse_qsl(self.body.decode("utf-8", "replace")))
+        return self._form
+
+
+class Session(dict):
+    """Session data + id, like sessions.ServerSession without Flask."""
+
+    def __init__(self, data=None, sid=None, new=False):
+        super().__init__(data or {})
+        self.sid = sid or secrets.token_urlsafe(32)
+        self.new = new
+        self.modified = False
+        self.replaced = None
+
+    def regenerate(self):
+        if not self.new:
+            self.replaced = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.new = True
+        self.modified = True
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.modified = True
+
+    def pop(self, key, default=None):
+        self.modified = self.modified or key in self
+        return super().pop(key, default)
+
+    def clear(self):
+        self.modified = self.modified or bool(self)
+        super().clear()
+
+
+def text(body, status=200):
+    return status, body, [(b"content-type", b"text/html; charset=utf-8")]
+
+
+def cached(request, page, private=False):
+    """A page_cache.Page with its ETag, or 304 if the browser has it."""
+    etag = f'"{page.etag}"'
+    headers = [(b"etag", etag.encode()),
+               (b"cache-control", b"private, no-cache" if private else b"no-cache")]
+    if etag in request.headers.get("if-none-match", ""):
+        return 304, b"", headers
+    return 200, page.body, [(b"content-type", b"text/html; charset=utf-8")] + headers
+
+
+def _read_file(path):
+    with open(path, "rb") as handle:
+        return handle.read()
+
+
+def redirect(location):
+    return 302, "", [(b"location", location.encode("latin-1"))]
+
+
+class AuthApp:
+    """ASGI application: `app = create_app()`, then `await app(scope, receive, send)`."""
+
+    def __init__(self, db_threads=ASGI_DB_THREADS):
+        self.db_threads = db_threads
+        self.executor = None
+        self.templates = jinja2.Environment(
+            loader=jinja2.FileSystemLoader(TEMPLATES_DIR), autoescape=True,
+            auto_reload=os.environ.get("TEMPLATES_AUTO_RELOAD") == "1")
+        self.immutable_assets = set()
+        self.pages = page_cache.PageCache(self.templates)
+        self.routes = {
+            "/connexion": ({"GET", "HEAD"}, self.connexion),
+            "/": ({"GET", "HEAD"}, self.accueil),
+            "/register": ({"POST"}, self.register),
+            "/login": ({"POST"}, self.login),
+            "/logout": ({"GET", "HEAD"}, self.logout),
+        }
+        self._started = None
+
+    async def db(self, func, *args):
+        """Run a blocking database function in the database threads."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    # LIFESPAN
+    # ========
+    async def startup(self):
+        # Also called on the first request if the server has no lifespan support
+        if self._started is None:
+            self._started = asyncio.ensure_future(self._startup())
+        await self._started
+
+    async def _startup(self):
+        self.executor = ThreadPoolExecutor(self.db_threads, thread_name_prefix="asgi-db")
+        await self.db(migrations.migrate)
+        await self.db(self._prepare_templates)
+
+    def _prepare_templates(self):
+        # Same fingerprinted asset URLs and same /assets/ files as the Flask
+        # app; done here, not in __init__, so importing this module writes
+        # nothing on disk (see app.py STARTUP)
+        manifest = assets.prepare()
+        self.immutable_assets = set(manifest["immutable"])
+        self.templates.globals["asset"] = assets.asset_function(manifest)
+        page_cache.configure_environment(self.templates)
+
+    async def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        self._started = None
+        hashing.pool.shutdown()
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as error:
+                    await send({"type": "lifespan.startup.failed", "message": str(error)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # ASGI ENTRY POINT
+    # ================
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+        await self.startup()
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if len(body) > ASGI_MAX_BODY:
+                return await self._send(send, 413, "Request body too large", [])
+            if not message.get("more_body"):
+                break
+        request = Request(scope, body)
+
+        if request.path.startswith(assets.ASSETS_URL):
+            if request.method not in ("GET", "HEAD"):
+                return await self._send(send, 405, "Method Not Allowed", [(b"allow", b"GET, HEAD")])
+            status, content, headers = await self.asset_file(request)
+            if request.method == "HEAD":
+                content = b""
+            return await self._send(send, status, content, headers)
+
+        methods, handler = self.routes.get(request.path, (None, None))
+        if handler is None:
+            return await self._send(send, *text("Not Found", 404))
+        if request.method not in methods:
+            allow = ", ".join(sorted(methods | {"OPTIONS"})).encode()
+            return await self._send(send, 405, "Method Not Allowed", [(b"allow", allow)])
+
+        try:
+            session = await self._open_session(request)
+            status, content, headers = await handler(request, session)
+            headers += await self._save_session(session)
+        except Exception:
+            log.exception("error on %s %s", request.method, request.path)
+            return await self._send(send, *text("Internal Server Error", 500))
+        if request.method == "HEAD":
+            content = b""
+        await self._send(send, status, content, headers)
+
+    async def _send(self, send, status, content, headers):
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        await send({"type": "http.response.start", "status": status,
+                    "headers": headers + [(b"content-length", str(len(content)).encode())]})
+        await send({"type": "http.response.body", "body": content})
+
+    # SESSIONS
+    # ========
+    # Same store and same rules as sessions.ServerSessionInterface
+    async def _open_session(self, request):
+        sid = request.cookies.get(SESSION_COOKIE)
+        if sid:
+            data = await self.db(sessions.store.load, sid)
+            if data is not None:
+                return Session(data, sid=sid)
+        return Session(new=True)
+
+    async def _save_session(self, session):
+        if session.replaced is not None:
+            await self.db(sessions.store.delete, session.replaced)
+            session.replaced = None
+        vary = [(b"vary", b"Cookie")] if session or not session.new else []
+        if not session:
+            if not session.new:
+                await self.db(sessions.store.delete, session.sid)
+                return vary + [(b"set-cookie", f"{SESSION_COOKIE}=; Expires=Thu, 01 Jan 1970 "
+                                               f"00:00:00 GMT; Max-Age=0{SESSION_COOKIE_ATTRIBUTES}"
+                                               .encode())]
+            return vary
+        if not session.modified:
+            return vary
+        await self.db(sessions.store.save, session.sid, dict(session))
+        return vary + [(b"set-cookie", f"{SESSION_COOKIE}={session.sid}{SESSION_COOKIE_ATTRIBUTES}".encode())]
+
+    # STATIC ASSETS
+    # =============
+    # Same rules as assets.install() for Flask: pre-compressed .br / .gz
+    # chosen from Accept-Encoding, hashed files immutable for a year, the
+    # others revalidated with an ETag. No session for these requests.
+    async def asset_file(self, request):
+        filename = request.path[len(assets.ASSETS_URL):]   # ASGI paths are decoded
+        found = assets.resolve(filename, request.headers.get("accept-encoding", ""))
+        if found is None:
+            return text("Not Found", 404)
+        path, mimetype, encoding = found
+        headers = [(b"content-type", mimetype.encode()), (b"vary", b"Accept-Encoding")]
+        if encoding:
+            headers.append((b"content-encoding", encoding.encode()))
+        if filename in self.immutable_assets:
+            headers.append((b"cache-control",
+                            f"public, max-age={assets.IMMUTABLE_MAX_AGE}, immutable".encode()))
+        else:
+            stat = os.stat(path)
+            etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}' + (f'-{encoding}"' if encoding else '"')
+            headers += [(b"etag", etag.encode()), (b"cache-control", b"no-cache")]
+            if etag in request.headers.get("if-none-match", ""):
+                return 304, b"", headers
+        return 200, await self.db(_read_file, path), headers
+
+    # ROUTES
+    # ======
+    # Pages come from memory (page_cache.py): templates are compiled at
+    # startup and each page is rendered once, nothing here touches the disk
+    async def connexion(self, request, session):
+        return cached(request, self.pages.page("connexion.html"))
+
+    async def accueil(self, request, session):
+        if "username" in session:
+            return cached(request, self.pages.user_page("accueil.html", session["username"]),
+                          private=True)
+        return cached(request, self.pages.page("accueil.html"))
+
+    async def register(self, request, session):
+        form = request.form
+        username = form.get("nom")
+        password = form.get("password")
+        birth_date, tel, email = form.get("ddn", ""), form.get("tel", ""), form.get("email", "")
+        if username is None or password is None:
+            return text("Bad Request", 400)
+        if not (birth_date and tel and email):
+            return text("Missing fields. <a href='/register'>Try again</a>.")
+        if await self.db(users.get_password_hash, username) is not None:
+            return text("Username already exists. <a href='/register'>Try again</a>.")
+        try:
+            hashed_password = await hashing.hash_password_async(password)
+        except hashing.HashingBusy:
+            return text("Server busy, please retry in a moment.", 503)
+        try:
+            await self.db(users.create_user, username, hashed_password, birth_date, tel, email)
+        except users.UserExists:
+            return text("Username, phone or email already used. <a href='/register'>Try again</a>.")
+        return redirect("/login")
+
+    async def login(self, request, session):
+        form = request.form
+        username = form.get("username")
+        password = form.get("password")
+        if username is None or password is None:
+            return text("Bad Request", 400)
+        try:
+            hashing.check_attempt(username, request.remote_addr)
+        except hashing.TooManyAttempts:
+            return text("Too many attempts, please wait a minute.", 429)
+
+        try:
+            valid = await users.authenticate_async(username, password, self.db)
+        except hashing.HashingBusy:
+            return text("Server busy, please retry in a moment.", 503)
+        if not valid:
+            return text("Invalid credentials. <a href='/login'>Try again</a>.")
+
+        hashing.login_succeeded(username)
+        session.regenerate()
+        session["username"] = username
+        session["id_user"] = await self.db(users.get_user_id, username)
+        return redirect("/")
+
+    async def logout(self, request, session):
+        session.clear()
+        return redirect("accueil.html")
+
+
+def create_app(db_threads=ASGI_DB_THREADS):
+    """Application factory."""
+    return AuthApp(db_threads)
+
+
+app = create_app()
+
+
+# BUILT-IN SERVER
+# ===============
+# Minimal HTTP/1.1 server (keep-alive, Content-Length bodies) so the app
+# runs without uvicorn; use a real ASGI server in production.
+class Server:
+
+    def __init__(self, asgi_app, host="127.0.0.1", port=8000):
+        self.app = asgi_app
+        self.host = host
+        self.port = port
+        self._server = None
+        self._lifespan = None
+        self._lifespan_queue = None
+
+    async def start(self):
+        self._lifespan_queue = asyncio.Queue()
+        started = asyncio.get_running_loop().create_future()
+
+        async def send(message):
+            if not started.done():
+                started.set_result(message["type"])
+
+        self._lifespan = asyncio.ensure_future(
+            self.app({"type": "lifespan"}, self._lifespan_queue.get, send))
+        await self._lifespan_queue.put({"type": "lifespan.startup"})
+        if await started != "lifespan.startup.complete":
+            raise RuntimeError("application startup failed")
+        self._server = await asyncio.start_server(
+            self._connection, self.host, self.port, backlog=4096, limit=ASGI_MAX_BODY)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        await self._lifespan_queue.put({"type": "lifespan.shutdown"})
+        await self._lifespan
+
+    async def _connection(self, reader, writer):
+        client = writer.get_extra_info("peername") or ("", 0)
+        try:
+            while await self._request(reader, writer, client):
+                pass
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _request(self, reader, writer, client):
+        """Serve one request; return True to keep the connection open."""
+        line = await reader.readline()
+        if not line.strip():
+            return False
+        method, target, version = line.decode("latin-1").split()
+        headers = []
+        while True:
+            header = await reader.readline()
+            if header in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = header.decode("latin-1").partition(":")
+            headers.append((name.strip().lower().encode("latin-1"),
+                            value.strip().encode("latin-1")))
+        fields = dict(headers)
+        length = int(fields.get(b"content-length", b"0"))
+        if length > ASGI_MAX_BODY:
+            writer.write(b"HTTP/1.1 413 Payload Too Large\r\nContent-Length: 0\r\n"
+                         b"Connection: close\r\n\r\n")
+            await writer.drain()
+            return False
+        body = await reader.readexactly(length) if length else b""
+        connection = fields.get(b"connection", b"").lower()
+        keep_alive = (connection == b"keep-alive") if version == "HTTP/1.0" \
+            else connection != b"close"
+
+        path, _, query = target.partition("?")
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": version[5:],
+            "method": method, "scheme": "http", "path": unquote(path),
+            "raw_path": path.encode("latin-1"), "query_string": query.encode("latin-1"),
+            "root_path": "", "headers": headers, "client": client[:2],
+            "server": (self.host, self.port),
+        }
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def receive():
+            return messages.pop() if messages else {"type": "http.disconnect"}
+
+        response = {"status": 500, "headers": [], "body": []}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = list(message.get("headers", []))
+            else:
+                response["body"].append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        content = b"".join(response["body"])
+        status = response["status"]
+        head = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}".encode()]
+        head += [name + b": " + value for name, value in response["headers"]
+                 if name.lower() != b"content-length"]
+        head.append(b"Content-Length: " + str(len(content)).encode())
+        head.append(b"Connection: " + (b"keep-alive" if keep_alive else b"close"))
+        writer.write(b"\r\n".join(head) + b"\r\n\r\n" + content)
+        await writer.drain()
+        return keep_alive
+
+
+async def serve(asgi_app, host="127.0.0.1", port=8000):
+    server = Server(asgi_app, host, port)
+    await server.start()
+    print(f"serving on http://{host}:{server.port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    try:
+        import uvicorn
+    except ImportError:
+        asyncio.run(serve(app, port=port))
+    else:
+        uvicorn.run(app, port=port)
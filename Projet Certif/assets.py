@@ -0,0 +1,440 @@
+"""
+STATIC ASSET PIPELINE
+=====================
+Build step for the front end (CSS/, JS/, HTML/) and the Flask glue that
+serves the result.
+
+build():
+- files with the same content are built once (dedupe)
+- CSS and JS are minified (comments and indentation removed) and get a
+  content hash in their name: CSS/connexion.3f2a9c1b.css
+- HTML pages are minified, keep their name, and their references to the
+  local CSS / JS (href="../CSS/...", src="../JS/...") are rewritten to
+  the hashed URLs
+- every file is stored pre-compressed next to itself (.gz, and .br when
+  the brotli module is installed)
+- manifest.json maps each source name to its built name
+
+install(app) (Flask), and asgi_app.py through prepare() / resolve():
+- /assets/<name> sends the .br / .gz version the browser accepts, no
+  compression work per request
+- hashed files are sent with Cache-Control: immutable, max-age=1 year:
+  a repeat visit does not even ask for them; HTML pages are revalidated
+  (ETag)
+- templates get asset("CSS/connexion.css") -> "/assets/CSS/connexion.<hash>.css"
+
+The build output (ASSETS_BUILD_DIR, default build/assets/) is not
+committed; the app builds it at startup if it is missing.
+
+Command line (from Projet Certif/):
+    python assets.py build
+    python assets.py clean
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    import brotli
+except ImportError:   # optional: only .gz files without it
+    brotli = None
+
+# CONFIGURATION
+# =============
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIRS = ("CSS", "JS", "HTML")
+ASSETS_BUILD_DIR = os.environ.get("ASSETS_BUILD_DIR", os.path.join(BASE_DIR, "build", "assets"))
+ASSETS_AUTOBUILD = os.environ.get("ASSETS_AUTOBUILD", "1") == "1"
+ASSETS_URL = "/assets/"
+IMMUTABLE_MAX_AGE = 31536000
+MANIFEST = "manifest.json"
+HASH_LENGTH = 8
+STALE_BUILD_AGE = 600   # seconds before a leftover .assets-xxxx/ folder is removed
+
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+# MINIFIERS
+# =========
+# Conservative on purpose: they remove comments and layout whitespace,
+# they never rename or reorder anything.
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACES = re.compile(r"\s+")
+_CSS_PUNCTUATION = re.compile(r"\s*([{};,>])\s*")
+
+
+def minify_css(text):
+    text = _CSS_COMMENT.sub("", text)
+    text = _CSS_SPACES.sub(" ", text)
+    text = _CSS_PUNCTUATION.sub(r"\1", text)
+    text = re.sub(r":\s+", ":", text)
+    return text.replace(";}", "}").strip()
+
+
+# A "/" after one of these starts a regular expression, not a division
+_REGEX_BEFORE = set("(,=:[!&|?{};+-*%<>~^") | {""}
+
+
+def minify_js(text):
+    """
+    Drop comments, indentation and blank lines. Line breaks are kept, so
+    automatic semicolon insertion behaves exactly as in the source.
+    """
+    out = []
+    i, n = 0, len(text)
+    last = ""   # last significant character written
+    while i < n:
+        char = text[i]
+        if char in "'\"`":
+            end = i + 1
+            while end < n and text[end] != char:
+                end += 2 if text[end] == "\\" else 1
+            out.append(text[i:end + 1])
+            last, i = char, end + 1
+        elif text.startswith("//", i):
+            end = text.find("\n", i)
+            i = n if end < 0 else end
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+            out.append(" ")
+        elif char == "/" and last in _REGEX_BEFORE:
+            end, in_class = i + 1, False
+            while end < n and (text[end] != "/" or in_class) and text[end] != "\n":
+                if text[end] == "\\":
+                    end += 1
+                elif text[end] == "[":
+                    in_class = True
+                elif text[end] == "]":
+                    in_class = False
+                end += 1
+            out.append(text[i:end + 1])
+            last, i = "/", end + 1
+        elif char == "\n":
+            # End of line: drop trailing blanks, blank lines and the
+            # indentation of the next line (never inside a string above)
+            while out and out[-1] in (" ", "\t", "\r"):
+                out.pop()
+            if out and out[-1] != "\n":
+                out.append("\n")
+            i += 1
+            while i < n and text[i] in " \t\r":
+                i += 1
+        else:
+            out.append(char)
+            if not char.isspace():
+                last = char
+            i += 1
+    return "".join(out).strip()
+
+
+_HTML_COMMENT = re.compile(r"<!--(?!\[if).*?-->", re.S)
+_HTML_RAW = re.compile(r"(<(pre|textarea|script|style)\b.*?</\2>)", re.S | re.I)
+
+
+def minify_html(text):
+    """Drop comments and indentation; <pre>, <textarea>, <script>, <style> kept as is."""
+    parts = _HTML_RAW.split(text)
+    out = []
+    # split() with two groups: text, raw block, tag name, text, ...
+    for index in range(0, len(parts), 3):
+        chunk = _HTML_COMMENT.sub("", parts[index])
+        chunk = re.sub(r"[ \t]*\n\s*", "\n", chunk)
+        out.append(re.sub(r"[ \t]+", " ", chunk))
+        if index + 1 < len(parts):
+            out.append(parts[index + 1])
+    return "".join(out).strip() + "\n"
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js, ".html": minify_html}
+
+
+# BUILD
+# =====
+_REFERENCE = re.compile(r"""(\b(?:href|src)\s*=\s*["'])([^"'#?]+)(["'])""", re.I)
+
+
+def _rewrite_references(text, name, files):
+    """Point the local href / src of a page at the built asset URLs."""
+    folder = posixpath.dirname(name)
+
+    def replace(match):
+        target = match.group(2)
+        if "//" in target or target.startswith(("/", "data:")):
+            return match.group(0)
+        logical = posixpath.normpath(posixpath.join(folder, target))
+        if logical not in files:
+            return match.group(0)
+        return match.group(1) + ASSETS_URL + files[logical] + match.group(3)
+
+    return _REFERENCE.sub(replace, text)
+
+
+def _write(path, data, report):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as handle:
+        handle.write(data)
+    # mtime=0: the same input always gives the same .gz
+    compressed = {".gz": gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        compressed[".br"] = brotli.compress(data, quality=11)
+    for suffix, payload in compressed.items():
+        if len(payload) >= len(data):
+            continue   # tiny file: the plain version is smaller
+        with open(path + suffix, "wb") as handle:
+            handle.write(payload)
+        report[suffix] = len(payload)
+
+
+def _sources(base_dir):
+    for folder in SOURCE_DIRS:
+        directory = os.path.join(base_dir, folder)
+        if not os.path.isdir(directory):
+            continue
+        for root, _, names in os.walk(directory):
+            for file_name in sorted(names):
+                suffix = os.path.splitext(file_name)[1].lower()
+                if suffix in MINIFIERS:
+                    path = os.path.join(root, file_name)
+                    yield os.path.relpath(path, base_dir).replace(os.sep, "/"), suffix, path
+
+
+def build(base_dir=BASE_DIR, out_dir=ASSETS_BUILD_DIR):
+    """
+    Build every asset into out_dir. Returns the manifest.
+    The files are written in a new folder next to out_dir (.assets-xxxx/)
+    and out_dir is a symlink to it, switched in one rename: a server
+    reading out_dir, or another worker building at the same time, never
+    sees a missing or half-written folder.
+    """
+    parent = os.path.dirname(os.path.abspath(out_dir))
+    os.makedirs(parent, exist_ok=True)
+    work = tempfile.mkdtemp(prefix=".assets-", dir=parent)
+    try:
+        os.chmod(work, 0o755)   # mkdtemp makes it private to this user
+        manifest = _build_into(base_dir, work)
+        _swap(work, out_dir)
+    except BaseException:
+        shutil.rmtree(work, ignore_errors=True)
+        raise
+    return manifest
+
+
+def _swap(new, out_dir):
+    """Point the out_dir symlink at the folder `new`, then remove the previous build."""
+    old = os.path.realpath(out_dir) if os.path.islink(out_dir) else None
+    if os.path.isdir(out_dir) and old is None:
+        # Real folder left by an older version of build(): moved away once
+        old = f"{new}.legacy"
+        os.rename(out_dir, old)
+    link = f"{new}.link"
+    os.symlink(os.path.basename(new), link)
+    os.replace(link, out_dir)
+    current = os.path.realpath(out_dir)
+    if old is not None and old != current:
+        shutil.rmtree(old, ignore_errors=True)
+    # Two builders that swapped at the same time both removed the same
+    # previous build, one of theirs is left behind: removed here once it is
+    # old enough not to be a build still in progress
+    parent = os.path.dirname(current)
+    for name in os.listdir(parent):
+        path = os.path.join(parent, name)
+        if name.startswith(".assets-") and path != current and not os.path.islink(path):
+            try:
+                if time.time() - os.path.getmtime(path) > STALE_BUILD_AGE:
+                    shutil.rmtree(path, ignore_errors=True)
+            except FileNotFoundError:
+                pass
+
+
+def clean(out_dir=ASSETS_BUILD_DIR):
+    """Remove out_dir and the build it points to."""
+    if os.path.islink(out_dir):
+        target = os.path.realpath(out_dir)
+        os.unlink(out_dir)
+        shutil.rmtree(target, ignore_errors=True)
+    else:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+def _build_into(base_dir, out_dir):
+    files, report, by_content = {}, {}, {}
+    sources = sorted(_sources(base_dir), key=lambda item: item[1] == ".html")
+
+    for name, suffix, path in sources:
+        with open(path, encoding="utf-8") as handle:
+            source = handle.read()
+        if suffix == ".html":
+            # Pages keep their name (they are the entry points), their
+            # links are rewritten to the hashed assets built before them
+            data = minify_html(_rewrite_references(source, name, files)).encode("utf-8")
+            built = name
+        else:
+            data = MINIFIERS[suffix](source).encode("utf-8")
+            digest = hashlib.sha256(data).hexdigest()
+            if digest in by_content:
+                # Same content already built (e.g. a copy in another folder)
+                files[name] = by_content[digest]
+                report[name] = {"source": len(source.encode("utf-8")), "duplicate_of": by_content[digest]}
+                continue
+            stem = posixpath.splitext(name)[0]
+            built = by_content[digest] = f"{stem}.{digest[:HASH_LENGTH]}{suffix}"
+        files[name] = built
+        report[name] = {"source": len(source.encode("utf-8")), "minified": len(data)}
+        _write(os.path.join(out_dir, *built.split("/")), data, report[name])
+
+    manifest = {"files": files, "immutable": sorted(set(files.values()) - set(files)),
+                "report": report}
+    with open(os.path.join(out_dir, MANIFEST), "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(out_dir=ASSETS_BUILD_DIR):
+    try:
+        with open(os.path.join(out_dir, MANIFEST), encoding="utf-8") as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+def asset_function(manifest):
+    """asset(name) -> URL of the built file, for the Jinja globals."""
+    files = (manifest or {}).get("files", {})
+
+    def asset(name):
+        return ASSETS_URL + files.get(name, name)
+
+    return asset
+
+
+# SERVING
+# =======
+def _accepted(header):
+    """Encodings accepted by the browser (q=0 excluded)."""
+    accepted = set()
+    for part in header.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding and params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding)
+    return accepted
+
+
+def prepare(out_dir=ASSETS_BUILD_DIR, autobuild=ASSETS_AUTOBUILD):
+    """Manifest of the built assets, building them first if they are missing."""
+    manifest = load_manifest(out_dir)
+    if manifest is None and autobuild:
+        manifest = build(out_dir=out_dir)
+    return manifest or {"files": {}, "immutable": []}
+
+
+def resolve(filename, accept_encoding, out_dir=ASSETS_BUILD_DIR):
+    """
+    File to send for /assets/<filename>: (path, mimetype, encoding) where
+    path is the .br / .gz version the browser accepts if there is one
+    (encoding is then "br" / "gzip", else None). None if there is no such
+    file or the name leaves out_dir.
+    """
+    from werkzeug.security import safe_join
+
+    path = safe_join(out_dir, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    accepted = _accepted(accept_encoding)
+    for coding, suffix in ENCODINGS:
+        if coding in accepted and os.path.isfile(path + suffix):
+            return path + suffix, mimetype, coding
+    return path, mimetype, None
+
+
+# FLASK GLUE
+# ==========
+def install(app, out_dir=ASSETS_BUILD_DIR, autobuild=ASSETS_AUTOBUILD):
+    """
+    Serve the built assets under /assets/ and add asset() to the templates.
+    Nothing is read or built here: the returned load() does it (prepare())
+    when the server starts, and returns the manifest.
+    """
+    from flask import abort, request, send_file
+
+    files, immutable = {}, set()
+
+    def load():
+        manifest = prepare(out_dir, autobuild)
+        files.update(manifest["files"])
+        immutable.update(manifest["immutable"])
+        return manifest
+
+    def asset(name):
+        return ASSETS_URL + files.get(name, name)
+
+    app.jinja_env.globals["asset"] = asset
+
+    @app.route(ASSETS_URL + "<path:filename>")
+    def assets_file(filename):
+        found = resolve(filename, request.headers.get("Accept-Encoding", ""), out_dir)
+        if found is None:
+            abort(404)
+        path, mimetype, encoding = found
+        if filename in immutable:
+            response = send_file(path, mimetype=mimetype, conditional=True,
+                                 etag=False, max_age=IMMUTABLE_MAX_AGE)
+            response.cache_control.public = True
+            response.cache_control.immutable = True
+        else:
+            response = send_file(path, mimetype=mimetype, conditional=True, etag=True)
+            response.cache_control.no_cache = True
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+            if response.headers.get("ETag"):
+                # a compressed body is another representation: another ETag
+                response.set_etag(f"{response.get_etag()[0]}-{encoding}")
+        response.vary.add("Accept-Encoding")
+        return response
+
+    return load
+
+
+# COMMAND LINE
+# ============
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the front-end assets")
+    parser.add_argument("command", choices=("build", "clean"))
+    parser.add_argument("--out", default=ASSETS_BUILD_DIR, help="output folder")
+    args = parser.parse_args(argv)
+
+    if args.command == "clean":
+        clean(args.out)
+        return 0
+
+    manifest = build(out_dir=args.out)
+    totals = {"source": 0, "minified": 0, ".gz": 0, ".br": 0}
+    print(f"{'source':<28}{'built':<34}{'bytes':>8}{'min':>8}{'gz':>8}{'br':>8}")
+    for name, row in sorted(manifest["report"].items()):
+        if "duplicate_of" in row:
+            print(f"{name:<28}{'= ' + row['duplicate_of']:<34}{row['source']:>8}  (deduplicated)")
+            totals["source"] += row["source"]
+            continue
+        print(f"{name:<28}{manifest['files'][name]:<34}{row['source']:>8}{row['minified']:>8}"
+              f"{row.get('.gz', 0):>8}{row.get('.br', '-'):>8}")
+        for key in totals:
+            totals[key] += row.get(key, 0)
+    print(f"{'total':<62}{totals['source']:>8}{totals['minified']:>8}{totals['.gz']:>8}"
+          f"{totals['.br'] or '-':>8}")
+    print(f"manifest: {os.path.join(args.out, MANIFEST)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+BENCHMARK: WSGI (app.py) vs ASGI (asgi_app.py)
+==============================================
+Both apps are served over real HTTP on the same seeded temporary
+database and driven by the same asyncio client:
+- WSGI: app.py on werkzeug's threaded server (one thread per connection)
+- ASGI: asgi_app.py on its built-in asyncio server
+
+Each of the --concurrency virtual users loops --requests times over
+POST /login, GET / (with the session cookie), GET /logout, one TCP
+connection per request. Meanwhile --idle extra connections are opened
+and left silent, like slow clients or idle keep-alives.
+
+Reported per app: throughput, p50 / p95 / p99 latency per route, errors
+and the peak number of threads of the process.
+
+The hash cost is lowered (HASH_METHOD, default pbkdf2:sha256:20000) so
+the run measures concurrency handling rather than PBKDF2 itself.
+
+Usage (from Projet Certif/):
+    python bench/bench_asgi.py --concurrency 200 --requests 5 --idle 500
+"""
+
+import argparse
+import asyncio
+import os
+import threading
+import time
+from urllib.parse import urlencode
+
+import common
+
+PASSWORD = "bench-password"
+
+os.environ.setdefault("HASH_METHOD", "pbkdf2:sha256:20000")
+os.environ.setdefault("PREVIEW_INTERVAL", "0")
+os.environ.setdefault("SEARCH_INTERVAL", "0")
+os.environ.setdefault("LOGIN_MAX_PER_IP", "1000000000")
+os.environ.setdefault("LOGIN_MAX_PER_USER", "1000000000")
+
+
+# CLIENT
+# ======
+async def http(port, method, path, cookie=None, form=None):
+    """One request on a new connection. Returns (status, session cookie or None)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = urlencode(form).encode() if form else b""
+    head = (f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n"
+            f"Content-Length: {len(body)}\r\n")
+    if form:
+        head += "Content-Type: application/x-www-form-urlencoded\r\n"
+    if cookie:
+        head += f"Cookie: session={cookie}\r\n"
+    writer.write(head.encode() + b"\r\n" + body)
+    data = await reader.read()
+    writer.close()
+    header_block = data.split(b"\r\n\r\n", 1)[0].decode("latin-1")
+    lines = header_block.split("\r\n")
+    new_cookie = None
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.lower() == "set-cookie" and value.strip().startswith("session="):
+            new_cookie = value.strip()[len("session="):].split(";", 1)[0] or None
+    return int(lines[0].split()[1]), new_cookie
+
+
+async def virtual_user(port, number, loops, users, results):
+    username = f"user{(number % users) + 1}"
+    for _ in range(loops):
+        cookie = None
+        for name, method, path, form in (
+                ("POST /login", "POST", "/login", {"username": username, "password": PASSWORD}),
+                ("GET /", "GET", "/", None),
+                ("GET /logout", "GET", "/logout", None)):
+            start = time.perf_counter()
+            try:
+                status, new_cookie = await http(port, method, path, cookie, form)
+                cookie = new_cookie or cookie
+            except OSError as error:
+                status = type(error).__name__
+            entry = results.setdefault(name, {"samples": [], "errors": 0})
+            entry["samples"].append(time.perf_counter() - start)
+            if not isinstance(status, int) or status >= 400:
+                entry["errors"] += 1
+
+
+async def drive(port, concurrency, loops, users, idle):
+    idle_connections = []
+    for _ in range(idle):
+        try:
+            idle_connections.append(await asyncio.open_connection("127.0.0.1", port))
+        except OSError:
+            break
+    peak = [threading.active_count()]
+
+    async def watch():
+        while True:
+            peak[0] = max(peak[0], threading.active_count())
+            await asyncio.sleep(0.05)
+
+    watcher = asyncio.ensure_future(watch())
+    results = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(virtual_user(port, n, loops, users, results)
+                           for n in range(concurrency)))
+    wall = time.perf_counter() - start
+    watcher.cancel()
+    for _, writer in idle_connections:
+        writer.close()
+    return results, wall, peak[0], len(idle_connections)
+
+
+# SERVERS
+# =======
+def start_wsgi():
+    import logging
+    from werkzeug.serving import make_server
+    import app as flask_app
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, flask_app.create_app(), threaded=True)
+    server.request_queue_size = 4096
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_port, server.shutdown
+
+
+def start_asgi():
+    import asgi_app
+    loop = asyncio.new_event_loop()
+    server = asgi_app.Server(asgi_app.create_app(), port=0)
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(server.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+    return server.port, stop
+
+
+def report(name, results, wall, threads, idle):
+    total = sum(len(entry["samples"]) for entry in results.values())
+    print(f"{name}: {total / wall:8.1f} req/s, {wall:.2f}s, peak threads {threads}, "
+          f"{idle} idle connections held")
+    print(f"    {'route':<14}{'count':>7}{'err':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for route, entry in sorted(results.items()):
+        stats = common.percentiles(entry["samples"])
+        print(f"    {route:<14}{stats['count']:>7}{entry['errors']:>6}"
+              f"{stats['p50_us'] / 1000:>9.2f}{stats['p95_us'] / 1000:>9.2f}"
+              f"{stats['p99_us'] / 1000:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100, help="seeded users")
+    parser.add_argument("--concurrency", type=int, default=200, help="concurrent virtual users")
+    parser.add_argument("--requests", type=int, default=5, help="scenario loops per user")
+    parser.add_argument("--idle", type=int, default=500, help="idle connections held open")
+    parser.add_argument("--only", choices=("wsgi", "asgi"), help="run a single app")
+    args = parser.parse_args()
+
+    from werkzeug.security import generate_password_hash
+    pwd_hash = generate_password_hash(PASSWORD, method=os.environ["HASH_METHOD"])
+    db_path = common.temp_database(args.users, 0, pwd_hash=pwd_hash)
+    print(f"seeded {args.users} users in {db_path}, hash {os.environ['HASH_METHOD']}")
+
+    for name, start in (("wsgi", start_wsgi), ("asgi", start_asgi)):
+        if args.only and args.only != name:
+            continue
+        port, stop = start()
+        results, wall, threads, idle = asyncio.run(
+            drive(port, args.concurrency, args.requests, args.users, args.idle))
+        report(name.upper(), results, wall, threads, idle)
+        stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+MICRO-BENCHMARK: f-string SQL vs bound parameters
+=================================================
+Runs the same lookups three ways on the same pooled connection:
+
+- before: the old fetch_lessons_by_id / lire_db style, SQL built with an
+  f-string (one different SQL text per id)
+- after:  the same query with one SQL text and a `?` parameter
+- api:    queries.lessons_by (bound query + pool + Lesson rows)
+
+For each run it prints the per-query latency and the hit rate of the
+sqlite3 statement cache. The sqlite3 module keeps an LRU of prepared
+statements keyed by SQL text (128 entries by default, the
+`cached_statements` argument of connect()); the hit rate is computed by
+replaying the SQL texts through an LRU of the same size.
+
+Usage (from Projet Certif/):
+    python bench/bench_queries.py --lessons 5000 --queries 20000
+"""
+
+import argparse
+import random
+import time
+from collections import OrderedDict
+
+import common
+
+import database
+import queries
+
+CACHE_SIZE = 128   # default of sqlite3.connect(cached_statements=...)
+
+
+def cache_hit_rate(sql_texts, size=CACHE_SIZE):
+    """Replay SQL texts through an LRU the size of the sqlite3 statement cache."""
+    cache = OrderedDict()
+    hits = 0
+    for sql in sql_texts:
+        if sql in cache:
+            hits += 1
+            cache.move_to_end(sql)
+        else:
+            cache[sql] = True
+            if len(cache) > size:
+                cache.popitem(last=False)
+    return hits / len(sql_texts) if sql_texts else 0.0
+
+
+def run_fstring(ids, select):
+    samples, texts = [], []
+    with database.connection() as conn:
+        for value in ids:
+            start = time.perf_counter()
+            sql = f"SELECT file_path FROM Lessons WHERE id_{select} = {value}"
+            [x[0] for x in conn.execute(sql).fetchall()]
+            samples.append(time.perf_counter() - start)
+            texts.append(sql)
+    return samples, texts
+
+
+def run_bound(ids, select):
+    samples, texts = [], []
+    sql = f"SELECT file_path FROM Lessons WHERE {queries.COLUMNS[select]} = ?"
+    with database.connection() as conn:
+        for value in ids:
+            start = time.perf_counter()
+            [x[0] for x in conn.execute(sql, (value,)).fetchall()]
+            samples.append(time.perf_counter() - start)
+            texts.append(sql)
+    return samples, texts
+
+
+def run_api(ids, select):
+    samples, texts = [], []
+    sql = queries.SQL_BY_COLUMN[select]
+    with database.connection():   # keep the same connection for the whole run
+        for value in ids:
+            start = time.perf_counter()
+            queries.lessons_by(select, value)
+            samples.append(time.perf_counter() - start)
+            texts.append(sql)
+    return samples, texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--lessons", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--select", choices=sorted(queries.COLUMNS), default="lesson")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    common.temp_database(users=args.users, lessons=args.lessons)
+    upper = args.lessons if args.select == "lesson" else args.users
+    rng = random.Random(args.seed)
+    ids = [rng.randint(1, upper) for _ in range(args.queries)]
+
+    print(f"{args.queries} lookups on id_{args.select}, {args.lessons} lessons")
+    print(f"{'run':<10}{'cache hit':>10}{'mean us':>10}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}")
+    for name, runner in (("before", run_fstring), ("after", run_bound), ("api", run_api)):
+        runner(ids[:500], args.select)   # warm-up
+        samples, texts = runner(ids, args.select)
+        stats = common.percentiles(samples)
+        print(f"{name:<10}{cache_hit_rate(texts):>10.1%}{stats['mean_us']:>10.1f}"
+              f"{stats['p50_us']:>10.1f}{stats['p95_us']:>10.1f}{stats['p99_us']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
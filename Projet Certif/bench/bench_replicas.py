@@ -0,0 +1,111 @@
+"""
+BENCHMARK: catalogue reads during heavy writes, primary vs read replicas
+========================================================================
+--readers threads read catalogue pages (queries.iter_lessons_after at a
+random position, the /api/lessons query) while a writer thread loads
+lessons in big transactions, like importer.py does. The run is done:
+
+- idle:     no writer, reads on the primary
+- primary:  writer running, reads on the primary (READ_REPLICAS off)
+- replicas: writer running, reads on snapshots (replicas.py)
+
+Reported: reads / second and p50 / p95 / p99 latency of one page, the
+rows written per second and, for the replicas run, the staleness seen.
+
+Usage (from Projet Certif/):
+    python bench/bench_replicas.py --lessons 200000 --seconds 5 --readers 4
+"""
+
+import argparse
+import random
+import sqlite3
+import threading
+import time
+
+import common
+
+import database
+import queries
+import replicas
+
+
+def writer(path, stop, batch, counter):
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA busy_timeout = 5000")
+    next_id = conn.execute("SELECT MAX(id_lesson) FROM Lessons").fetchone()[0] + 1
+    while not stop.is_set():
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT INTO Lessons (id_lesson, id_user, title, file_path) VALUES (?, 1, ?, ?)",
+            ((i, f"Imported {i}", f"lessons/imported{i}.pdf")
+             for i in range(next_id, next_id + batch)))
+        conn.execute("COMMIT")
+        next_id += batch
+        counter[0] += batch
+    conn.close()
+
+
+def reader(stop, upper, samples, seed):
+    rng = random.Random(seed)
+    while not stop.is_set():
+        after = rng.randint(0, upper)
+        start = time.perf_counter()
+        list(queries.iter_lessons_after(after, 50))
+        samples.append(time.perf_counter() - start)
+
+
+def run(path, seconds, readers, upper, batch, write, staleness):
+    stop = threading.Event()
+    written = [0]
+    samples = [[] for _ in range(readers)]
+    threads = [threading.Thread(target=reader, args=(stop, upper, samples[n], n))
+               for n in range(readers)]
+    if write:
+        threads.append(threading.Thread(target=writer, args=(path, stop, batch, written)))
+    for thread in threads:
+        thread.start()
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        time.sleep(0.1)
+        if replicas.replicas is not None:
+            staleness.append(replicas.replicas.staleness())
+    stop.set()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    return [s for part in samples for s in part], written[0] / wall, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--lessons", type=int, default=200000)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=50000, help="rows per write transaction")
+    parser.add_argument("--interval", type=float, default=1, help="replica refresh interval")
+    args = parser.parse_args()
+
+    path = common.temp_database(args.users, args.lessons)
+    print(f"{args.lessons} lessons, {args.readers} readers, writer batches of {args.batch}")
+    print(f"{'run':<10}{'reads/s':>10}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}"
+          f"{'written/s':>12}{'max stale s':>13}")
+    for name, write, replicated in (("idle", False, False), ("primary", True, False),
+                                    ("replicas", True, True)):
+        staleness = []
+        if replicated:
+            replicas.start(interval=args.interval, enabled=True)
+        samples, written, wall = run(path, args.seconds, args.readers, args.lessons,
+                                     args.batch, write, staleness)
+        if replicated:
+            replicas.stop()
+        stats = common.percentiles(samples)
+        stale = f"{max(staleness):.2f}" if staleness else "-"
+        print(f"{name:<10}{stats['count'] / wall:>10.0f}{stats['p50_us']:>10.1f}"
+              f"{stats['p95_us']:>10.1f}{stats['p99_us']:>10.1f}{written:>12.0f}{stale:>13}")
+    database.get_pool().close()
+
+
+if __name__ == "__main__":
+    main()
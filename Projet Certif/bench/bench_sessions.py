@@ -0,0 +1,82 @@
+"""
+BENCHMARK: signed-cookie sessions vs server-side sessions
+=========================================================
+Same tiny Flask app, run twice: once with Flask's cookie sessions, once
+with sessions.ServerSessionInterface. For each backend it measures:
+
+- open: the cost of loading the session of a logged-in request
+  (cookie: decode + HMAC check, server: LRU lookup / SQLite read)
+- request: a full GET through the test client reading session['username']
+
+Usage (from Projet Certif/):
+    python bench/bench_sessions.py --requests 5000
+"""
+
+import argparse
+import time
+
+import common
+
+from flask import Flask, session
+
+import sessions
+
+
+def build_app(backend):
+    app = Flask(__name__)
+    app.secret_key = "bench"
+    sessions.install(app, backend)
+
+    @app.route("/login")
+    def login():
+        session["username"] = "bench_user"
+        session["favorites"] = list(range(20))   # a little payload
+        return "ok"
+
+    @app.route("/")
+    def home():
+        return session.get("username", "anonymous")
+
+    return app
+
+
+def bench(backend, count):
+    app = build_app(backend)
+    client = app.test_client()
+    client.get("/login")
+    cookie = client.get_cookie("session")
+    interface = app.session_interface
+
+    open_samples = []
+    with app.test_request_context("/", headers={"Cookie": f"session={cookie.value}"}):
+        from flask import request
+        for _ in range(count):
+            start = time.perf_counter()
+            opened = interface.open_session(app, request)
+            open_samples.append(time.perf_counter() - start)
+        assert opened.get("username") == "bench_user"
+
+    request_samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        client.get("/")
+        request_samples.append(time.perf_counter() - start)
+    return common.percentiles(open_samples), common.percentiles(request_samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    common.temp_database(users=1, lessons=1)
+    print(f"{'backend':<10}{'step':<10}{'mean us':>10}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}")
+    for backend in ("cookie", "server"):
+        for step, stats in zip(("open", "request"), bench(backend, args.requests)):
+            print(f"{backend:<10}{step:<10}{stats['mean_us']:>10.1f}{stats['p50_us']:>10.1f}"
+                  f"{stats['p95_us']:>10.1f}{stats['p99_us']:>10.1f}")
+    print(f"server LRU hits={sessions.store.hits} misses={sessions.store.misses}")
+
+
+if __name__ == "__main__":
+    main()
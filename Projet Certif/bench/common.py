@@ -0,0 +1,67 @@
+"""
+Shared helpers for the benchmark scripts of this folder.
+
+Benchmarks never touch the real BDD/BDD.db: they work on a temporary copy
+(same schema) filled with generated users and lessons.
+"""
+
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+
+# The modules of Projet Certif (database.py, queries.py, ...) are one level up
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+SOURCE_DB = os.path.join(PROJECT_DIR, "BDD", "BDD.db")
+
+
+def temp_database(users=100, lessons=1000, directory=None, pwd_hash="x"):
+    """
+    Copy BDD.db into a temporary folder, seed it and point database.py at it.
+    Every seeded user gets `pwd_hash` as password hash (user1 .. userN).
+    Returns the path of the copy.
+    """
+    import sqlite3
+    import database
+
+    directory = directory or tempfile.mkdtemp(prefix="bench_bdd_")
+    path = os.path.join(directory, "BDD.db")
+    shutil.copyfile(SOURCE_DB, path)
+
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO Users (id_user, username, pwd, birth_date, tel, email) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            ((i, f"user{i}", pwd_hash, "2000-01-01", f"06{i:08d}", f"user{i}@example.com")
+             for i in range(1, users + 1)))
+        conn.executemany(
+            "INSERT INTO Lessons (id_lesson, id_user, title, file_path) VALUES (?, ?, ?, ?)",
+            ((i, (i % users) + 1, f"Lesson {i}", f"lessons/lesson{i}.pdf")
+             for i in range(1, lessons + 1)))
+    conn.close()
+
+    database.configure(path=path)
+    return path
+
+
+def percentiles(samples):
+    """p50 / p95 / p99 / mean of a list of durations (seconds -> microseconds)."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1e6
+
+    return {
+        "count": len(ordered),
+        "mean_us": statistics.fmean(ordered) * 1e6,
+        "p50_us": pick(0.50),
+        "p95_us": pick(0.95),
+        "p99_us": pick(0.99),
+    }
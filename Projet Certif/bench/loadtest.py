@@ -0,0 +1,245 @@
+"""
+LOAD TEST: Projet Certif Flask app
+==================================
+Hammers the routes of app.py with concurrent clients and reports, per
+route, the throughput and the p50 / p95 / p99 latency.
+
+- The app runs on a temporary copy of BDD.db seeded with --users users
+  and --lessons lessons (the real database is never touched).
+- Three ways to drive it:
+    default     Flask's test client, in-process (no network)
+    --server    a local threaded werkzeug server started here, over HTTP
+    --url URL   an already running server, over HTTP (start it with
+                BDD_PATH=<printed path> so it sees the seeded users)
+- Results are written as JSON (--output) and can be compared with an
+  earlier run (--compare old.json) to spot regressions.
+
+Each client loops over the scenario: GET /, GET /connexion,
+POST /register (new user), POST /login (seeded user), GET /logout.
+
+Usage (from Projet Certif/):
+    python bench/loadtest.py --requests 200 --concurrency 8 --output results.json
+    python bench/loadtest.py --server --compare results.json
+"""
+
+import argparse
+import http.cookiejar
+import itertools
+import json
+import os
+import platform
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import common
+
+PASSWORD = "loadtest-password"
+
+# The app must be configured before it is imported: no background indexers,
+# no login throttling (every client shares one IP), a known hash cost.
+os.environ.setdefault("PREVIEW_INTERVAL", "0")
+os.environ.setdefault("SEARCH_INTERVAL", "0")
+os.environ.setdefault("LOGIN_MAX_PER_IP", "1000000000")
+os.environ.setdefault("LOGIN_MAX_PER_USER", "1000000000")
+
+
+# CLIENTS
+# =======
+class TestClient:
+    """In-process client (Flask test client)."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        response.get_data()   # consume streamed bodies
+        return response.status_code
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpClient:
+    """HTTP client with its own cookie jar (one session per client)."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data else None
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(req, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+
+
+# SCENARIO
+# ========
+_counter = itertools.count()
+
+
+def scenario(users):
+    """(route name, method, path, form data) steps of one loop."""
+    n = next(_counter)
+    seeded = f"user{(n % users) + 1}"
+    new = f"load{os.getpid()}_{n}"
+    return [
+        ("GET /", "GET", "/", None),
+        ("GET /connexion", "GET", "/connexion", None),
+        ("POST /register", "POST", "/register",
+         {"nom": new, "password": PASSWORD, "ddn": "2000-01-01",
+          "tel": f"07{os.getpid()}{n:08d}", "email": f"{new}@example.com"}),
+        ("POST /login", "POST", "/login", {"username": seeded, "password": PASSWORD}),
+        ("GET /logout", "GET", "/logout", None),
+    ]
+
+
+def worker(client, loops, users, results, lock):
+    local = {}
+    for _ in range(loops):
+        for name, method, path, data in scenario(users):
+            start = time.perf_counter()
+            try:
+                status = client.request(method, path, data)
+            except Exception as error:   # connection refused, timeout...
+                status = type(error).__name__
+            elapsed = time.perf_counter() - start
+            entry = local.setdefault(name, {"samples": [], "status": {}})
+            entry["samples"].append(elapsed)
+            entry["status"][str(status)] = entry["status"].get(str(status), 0) + 1
+    with lock:
+        for name, entry in local.items():
+            target = results.setdefault(name, {"samples": [], "status": {}})
+            target["samples"].extend(entry["samples"])
+            for status, count in entry["status"].items():
+                target["status"][status] = target["status"].get(status, 0) + count
+
+
+# REPORT
+# ======
+def summarize(results, wall):
+    report = {}
+    for name, entry in sorted(results.items()):
+        stats = common.percentiles(entry["samples"])
+        errors = sum(count for status, count in entry["status"].items()
+                     if not status.isdigit() or int(status) >= 500)
+        report[name] = {
+            "count": stats["count"],
+            "errors": errors,
+            "status": entry["status"],
+            "throughput_rps": round(stats["count"] / wall, 2),
+            "mean_ms": round(stats["mean_us"] / 1000, 3),
+            "p50_ms": round(stats["p50_us"] / 1000, 3),
+            "p95_ms": round(stats["p95_us"] / 1000, 3),
+            "p99_ms": round(stats["p99_us"] / 1000, 3),
+        }
+    return report
+
+
+def print_report(report, baseline=None):
+    print(f"{'route':<18}{'count':>7}{'err':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, row in report.items():
+        line = (f"{name:<18}{row['count']:>7}{row['errors']:>5}{row['throughput_rps']:>9.1f}"
+                f"{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['p99_ms']:>9.2f}")
+        old = (baseline or {}).get(name)
+        if old and old.get("p95_ms"):
+            change = (row["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100
+            line += f"   p95 {change:+.0f}% vs baseline"
+        print(line)
+
+
+def start_local_server(app):
+    from werkzeug.serving import make_server
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100, help="seeded users")
+    parser.add_argument("--lessons", type=int, default=1000, help="seeded lessons")
+    parser.add_argument("--requests", type=int, default=50, help="scenario loops per client")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--server", action="store_true", help="drive a local HTTP server")
+    target.add_argument("--url", help="drive a running server at this URL")
+    parser.add_argument("--output", help="write the results as JSON here")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+    args = parser.parse_args()
+
+    # One real hash for every seeded user, computed once
+    from werkzeug.security import generate_password_hash
+    import hashing
+    pwd_hash = generate_password_hash(PASSWORD, method=hashing.HASH_METHOD)
+    db_path = common.temp_database(args.users, args.lessons, pwd_hash=pwd_hash)
+    print(f"seeded {args.users} users / {args.lessons} lessons in {db_path}")
+
+    server = None
+    if args.url:
+        make_client = lambda: HttpClient(args.url)
+        mode = f"url {args.url}"
+    else:
+        import logging
+        import app as flask_app
+        flask_app.create_app()
+        # 500s are counted as errors in the report, no need for tracebacks
+        flask_app.app.logger.disabled = True
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        if args.server:
+            server, base_url = start_local_server(flask_app.app)
+            make_client = lambda: HttpClient(base_url)
+            mode = f"local server {base_url}"
+        else:
+            make_client = lambda: TestClient(flask_app.app)
+            mode = "test client"
+
+    results, lock = {}, threading.Lock()
+    threads = [threading.Thread(target=worker,
+                                args=(make_client(), args.requests, args.users, results, lock))
+               for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    if server is not None:
+        server.shutdown()
+
+    report = summarize(results, wall)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)["routes"]
+    print(f"mode: {mode}, {args.concurrency} clients x {args.requests} loops, {wall:.2f}s")
+    print_report(report, baseline)
+
+    if args.output:
+        document = {
+            "meta": {
+                "mode": mode, "users": args.users, "lessons": args.lessons,
+                "requests": args.requests, "concurrency": args.concurrency,
+                "wall_seconds": round(wall, 3), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(), "platform": platform.platform(),
+            },
+            "routes": report,
+        }
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(document, handle, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
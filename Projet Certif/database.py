@@ -0,0 +1,344 @@
+"""
+SHARED SQLITE DATA-ACCESS LAYER
+===============================
+One place to open connections to BDD.db for every script of Projet Certif
+(app.py, PY/app.py, PY/fonctions.py, test.py).
+
+Features:
+- One configurable database path (env var BDD_PATH, or configure())
+- Bounded connection pool: connections are opened once and reused
+- Per-thread affinity: nested `with connection()` in the same thread
+  reuses the connection already held by that thread
+- WAL mode and tuned pragmas applied once, when a connection is created
+- Hit / miss / wait counters that can be scraped (stats(), metrics_text())
+- read_connection() for reads that accept slightly stale data (catalogue,
+  search): the primary pool, or read-only snapshots (see replicas.py)
+
+Usage:
+    from database import connection
+
+    with connection() as conn:
+        rows = conn.execute("SELECT title FROM Lessons").fetchall()
+
+Leaving the `with` block commits (or rolls back on error) and gives the
+connection back to the pool instead of closing it.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# CONFIGURATION
+# =============
+# Default path is resolved from this file, not from the current directory,
+# so the scripts work whatever folder they are launched from.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB_PATH = os.path.join(BASE_DIR, "BDD", "BDD.db")
+DB_PATH = os.environ.get("BDD_PATH", DEFAULT_DB_PATH)
+POOL_SIZE = int(os.environ.get("BDD_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.environ.get("BDD_POOL_TIMEOUT", "5"))
+
+# Pragmas applied to every new connection.
+# journal_mode=WAL is persistent in the file, the others are per connection.
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("foreign_keys", "ON"),
+    ("temp_store", "MEMORY"),
+    ("cache_size", "-16000"),     # negative = KiB, so ~16 MB of page cache
+    ("mmap_size", "268435456"),   # 256 MB memory-mapped reads
+    ("busy_timeout", "5000"),
+)
+
+# Functions called with every new connection (tracing, profiling, ...),
+# register them with add_connection_hook()
+CONNECTION_HOOKS = []
+
+# Class of the connections (an sqlite3.Connection subclass can time the
+# queries, see profiling.py), change it with set_connection_factory()
+CONNECTION_FACTORY = sqlite3.Connection
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became free within the pool timeout."""
+
+
+class PoolClosed(RuntimeError):
+    """Raised when a connection is asked from a pool that was closed."""
+
+
+class ConnectionPool:
+    """
+    Bounded pool of sqlite3 connections shared by all threads.
+
+    - At most `size` connections are ever open at the same time.
+    - A free connection is reused (hit), otherwise a new one is opened
+      (miss) as long as the pool is not full, otherwise the caller waits
+      until another thread gives one back (wait).
+    """
+
+    def __init__(self, path=None, size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                 uri=False, pragmas=None):
+        self.path = path or DB_PATH
+        self.size = size
+        self.timeout = timeout
+        # uri=True: path is a file: URI (mode=ro, immutable=1, ...)
+        self.uri = uri
+        self.pragmas = PRAGMAS if pragmas is None else pragmas
+        self._idle = queue.LifoQueue()   # LIFO: the hottest connection first
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "wait_seconds": 0.0,
+        }
+
+    # OPENING CONNECTIONS
+    # ===================
+    def _open(self):
+        # check_same_thread=False: a connection may be used by another
+        # thread later, the pool guarantees only one thread holds it at once
+        conn = sqlite3.connect(self.path, check_same_thread=False, uri=self.uri,
+                               isolation_level="DEFERRED", factory=CONNECTION_FACTORY)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas:
+            conn.execute(f"PRAGMA {name} = {value}")
+        for hook in CONNECTION_HOOKS:
+            hook(conn)
+        return conn
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self._counters[name] += value
+
+    # ACQUIRE / RELEASE
+    # =================
+    def acquire(self):
+        """Take a connection from the pool (or open one if allowed)."""
+        if self._closed:
+            raise PoolClosed("connection pool is closed")
+        try:
+            conn = self._idle.get_nowait()
+            self._count("hits")
+            return conn
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_open = self._opened < self.size
+            if can_open:
+                self._opened += 1
+                self._counters["misses"] += 1
+        if can_open:
+            try:
+                return self._open()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+
+        # Pool is full: wait for another thread to release a connection
+        start = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            self._count("timeouts")
+            raise PoolTimeout(
+                f"no free connection after {self.timeout}s (size={self.size})")
+        with self._lock:
+            self._counters["waits"] += 1
+            self._counters["wait_seconds"] += time.perf_counter() - start
+        return conn
+
+    def release(self, conn):
+        """Give a connection back to the pool."""
+        if self._closed:
+            conn.close()
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager returning a pooled connection.
+
+        The outermost block of a thread commits on success, rolls back on
+        error and releases the connection. Inner blocks of the same thread
+        reuse the same connection and leave the transaction alone.
+        """
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            self._local.depth += 1
+            self._count("hits")
+            try:
+                yield held
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self.acquire()
+        self._local.conn = conn
+        self._local.depth = 1
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._local.depth = 0
+            self.release(conn)
+
+    def close(self):
+        """Close every idle connection (used at shutdown and in scripts)."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._opened = 0
+
+    # METRICS
+    # =======
+    def stats(self):
+        """Snapshot of the pool counters as a dict."""
+        with self._lock:
+            data = dict(self._counters)
+            data["opened"] = self._opened
+        data["idle"] = self._idle.qsize()
+        data["in_use"] = data["opened"] - data["idle"]
+        data["size"] = self.size
+        return data
+
+    def metrics_text(self, prefix="bdd_pool"):
+        """Counters in Prometheus text format."""
+        data = self.stats()
+        lines = []
+        for name in ("hits", "misses", "waits", "timeouts"):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {data[name]}")
+        lines.append(f"# TYPE {prefix}_wait_seconds_total counter")
+        lines.append(f"{prefix}_wait_seconds_total {data['wait_seconds']:.6f}")
+        for name in ("opened", "idle", "in_use", "size"):
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {data[name]}")
+        return "\n".join(lines) + "\n"
+
+
+# MODULE-LEVEL POOL
+# =================
+# Created lazily so that configure() can still change the path before use.
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def configure(path=None, size=None, timeout=None):
+    """
+    Change the database path / pool size.
+    Closes the current pool, the next connection() builds a new one.
+    """
+    global _pool, DB_PATH, POOL_SIZE, POOL_TIMEOUT
+    with _pool_lock:
+        if path is not None:
+            DB_PATH = path
+        if size is not None:
+            POOL_SIZE = size
+        if timeout is not None:
+            POOL_TIMEOUT = timeout
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def add_connection_hook(hook):
+    """
+    Call hook(conn) on every new connection. The pool is recycled so the
+    connections already open get the hook too.
+    """
+    if hook not in CONNECTION_HOOKS:
+        CONNECTION_HOOKS.append(hook)
+        configure()
+
+
+def set_connection_factory(factory):
+    """Open the next connections with this sqlite3.Connection subclass."""
+    global CONNECTION_FACTORY
+    if factory is not CONNECTION_FACTORY:
+        CONNECTION_FACTORY = factory
+        configure()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_PATH, POOL_SIZE, POOL_TIMEOUT)
+    return _pool
+
+
+def connection():
+    """Shortcut for get_pool().connection()."""
+    return get_pool().connection()
+
+
+def stats():
+    return get_pool().stats()
+
+
+# READS THAT ACCEPT STALE DATA
+# ============================
+# Catalogue and search reads use read_connection(). By default it is the
+# same pool as connection(); replicas.py plugs in a function returning the
+# pool of a read-only snapshot (or None to fall back to the primary).
+_read_pool = None
+
+
+def set_read_pool(getter):
+    """Route read_connection() to getter()'s pool (None: back to the primary)."""
+    global _read_pool
+    _read_pool = getter
+
+
+def read_connection():
+    """Like connection(), for reads that may be a few seconds stale."""
+    getter = _read_pool
+    pool = getter() if getter is not None else None
+    return (pool or get_pool()).connection()
+
+
+# SCHEMA HELPERS
+# ==============
+# Modules that need extra tables, indexes or triggers declare them as a
+# script of idempotent statements (CREATE ... IF NOT EXISTS) and call
+# ensure_schema() before their first query. The script runs once per
+# process and per database path.
+_schemas_applied = set()
+
+
+def ensure_schema(script):
+    key = (DB_PATH, script)
+    if key in _schemas_applied:
+        return
+    with connection() as conn:
+        conn.executescript(script)
+    _schemas_applied.add(key)
+
+
+def metrics_text():
+    return get_pool().metrics_text()
@@ -0,0 +1,146 @@
+"""
+FAVORITES
+=========
+Read / write the Favorites(id_user, id_lesson, date_added) table.
+
+- Favorites_lesson_date_user (id_lesson, date_added, id_user) answers
+  "who favorited this lesson, latest first" from the index alone, without
+  scanning or reading the table (the primary key already covers
+  "favorites of a user")
+- Lesson_popularity and User_favorite_counts hold the counters; triggers
+  on Favorites keep them exact on every insert / delete, so "most
+  favorited lessons" reads the first k rows of an index instead of a
+  GROUP BY over all favorites
+"""
+
+import sqlite3
+from datetime import datetime, timezone
+
+import database
+from queries import LESSON_COLUMNS, Lesson
+
+
+class NotFound(LookupError):
+    """The user or the lesson does not exist (any more)."""
+
+
+SCHEMA = """
+CREATE INDEX IF NOT EXISTS Favorites_lesson_date_user ON Favorites (id_lesson, date_added, id_user);
+DROP INDEX IF EXISTS Favorites_lesson_date;
+
+CREATE TABLE IF NOT EXISTS Lesson_popularity (
+    id_lesson INTEGER PRIMARY KEY REFERENCES Lessons (id_lesson) ON DELETE CASCADE,
+    favorites INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS Lesson_popularity_rank ON Lesson_popularity (favorites DESC, id_lesson);
+
+CREATE TABLE IF NOT EXISTS User_favorite_counts (
+    id_user   INTEGER PRIMARY KEY REFERENCES Users (id_user) ON DELETE CASCADE,
+    favorites INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS Favorites_count_insert AFTER INSERT ON Favorites
+BEGIN
+    INSERT INTO Lesson_popularity (id_lesson, favorites) VALUES (NEW.id_lesson, 1)
+        ON CONFLICT (id_lesson) DO UPDATE SET favorites = favorites + 1;
+    INSERT INTO User_favorite_counts (id_user, favorites) VALUES (NEW.id_user, 1)
+        ON CONFLICT (id_user) DO UPDATE SET favorites = favorites + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS Favorites_count_delete AFTER DELETE ON Favorites
+BEGIN
+    UPDATE Lesson_popularity SET favorites = favorites - 1 WHERE id_lesson = OLD.id_lesson;
+    UPDATE User_favorite_counts SET favorites = favorites - 1 WHERE id_user = OLD.id_user;
+END;
+
+-- Favorites written before the triggers existed (no-op afterwards)
+INSERT OR IGNORE INTO Lesson_popularity (id_lesson, favorites)
+    SELECT id_lesson, COUNT(*) FROM Favorites GROUP BY id_lesson;
+INSERT OR IGNORE INTO User_favorite_counts (id_user, favorites)
+    SELECT id_user, COUNT(*) FROM Favorites GROUP BY id_user;
+"""
+
+# Counters recomputed from scratch (after a bulk import run without the
+# triggers, see importer.py)
+RECOUNT_SCRIPT = """
+DELETE FROM Lesson_popularity;
+INSERT INTO Lesson_popularity (id_lesson, favorites)
+    SELECT id_lesson, COUNT(*) FROM Favorites GROUP BY id_lesson;
+DELETE FROM User_favorite_counts;
+INSERT INTO User_favorite_counts (id_user, favorites)
+    SELECT id_user, COUNT(*) FROM Favorites GROUP BY id_user;
+"""
+
+SQL_ADD = "INSERT OR IGNORE INTO Favorites (id_user, id_lesson, date_added) VALUES (?, ?, ?)"
+SQL_REMOVE = "DELETE FROM Favorites WHERE id_user = ? AND id_lesson = ?"
+SQL_OF_USER = (
+    f"SELECT {', '.join('l.' + c for c in LESSON_COLUMNS.split(', '))}, f.date_added "
+    "FROM Favorites f JOIN Lessons l ON l.id_lesson = f.id_lesson "
+    "WHERE f.id_user = ? ORDER BY f.id_lesson LIMIT ?")
+SQL_OF_LESSON = (
+    "SELECT f.id_user, u.username, f.date_added "
+    "FROM Favorites f JOIN Users u ON u.id_user = f.id_user "
+    "WHERE f.id_lesson = ? ORDER BY f.date_added DESC LIMIT ?")
+SQL_USER_COUNT = "SELECT favorites FROM User_favorite_counts WHERE id_user = ?"
+SQL_LESSON_COUNT = "SELECT favorites FROM Lesson_popularity WHERE id_lesson = ?"
+SQL_TRENDING = (
+    f"SELECT {', '.join('l.' + c for c in LESSON_COLUMNS.split(', '))}, p.favorites "
+    "FROM Lesson_popularity p JOIN Lessons l ON l.id_lesson = p.id_lesson "
+    "WHERE p.favorites > 0 ORDER BY p.favorites DESC, p.id_lesson LIMIT ?")
+
+
+def _ready():
+    database.ensure_schema(SCHEMA)
+
+
+def add(id_user, id_lesson):
+    """
+    Favorite a lesson. Returns False if it already was a favorite.
+    Raises NotFound if the user or the lesson was deleted (foreign keys:
+    INSERT OR IGNORE does not ignore them).
+    """
+    _ready()
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        with database.connection() as conn:
+            return conn.execute(SQL_ADD, (id_user, id_lesson, now)).rowcount == 1
+    except sqlite3.IntegrityError as error:
+        raise NotFound(str(error)) from None
+
+
+def remove(id_user, id_lesson):
+    """Unfavorite a lesson. Returns False if it was not a favorite."""
+    _ready()
+    with database.connection() as conn:
+        return conn.execute(SQL_REMOVE, (id_user, id_lesson)).rowcount == 1
+
+
+def _count(sql, key):
+    with database.connection() as conn:
+        row = conn.execute(sql, (key,)).fetchone()
+    return row[0] if row else 0
+
+
+def of_user(id_user, limit=100):
+    """(lesson, date_added) pairs favorited by a user, plus the total count."""
+    _ready()
+    with database.connection() as conn:
+        rows = conn.execute(SQL_OF_USER, (id_user, limit)).fetchall()
+    return [(Lesson(*row[:4]), row[4]) for row in rows], _count(SQL_USER_COUNT, id_user)
+
+
+def of_lesson(id_lesson, limit=100):
+    """Users who favorited a lesson (latest first), plus the total count."""
+    _ready()
+    with database.connection() as conn:
+        rows = conn.execute(SQL_OF_LESSON, (id_lesson, limit)).fetchall()
+    return [dict(id_user=r[0], username=r[1], date_added=r[2]) for r in rows], \
+        _count(SQL_LESSON_COUNT, id_lesson)
+
+
+def trending(limit=10):
+    """The `limit` most favorited lessons: [(lesson, count), ...]."""
+    _ready()
+    with database.connection() as conn:
+        rows = conn.execute(SQL_TRENDING, (limit,)).fetchall()
+    return [(Lesson(*row[:4]), row[4]) for row in rows]
@@ -0,0 +1,275 @@
+"""
+PASSWORD HASHING POOL
+=====================
+PBKDF2 with hundreds of thousands of iterations takes tens of milliseconds
+of pure CPU. Done inline, it blocks the worker thread (and, through the
+GIL, the other threads of the process) so a burst of logins slows down
+every route.
+
+This module moves hashing and verification to a dedicated, bounded pool
+of processes:
+- HASH_WORKERS processes do the work (0 = inline, for debugging)
+- at most HASH_MAX_PENDING jobs are queued or running, others get
+  HashingBusy instead of piling up
+- Throttle limits attempts per username and per IP address
+- needs_rehash() tells when a stored hash was made with an older cost,
+  so login can upgrade it transparently
+- queue depth and latency percentiles are exposed by metrics_text()
+- *_async() variants let asyncio code await a job (asgi_app.py)
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# CONFIGURATION
+# =============
+HASH_METHOD = os.environ.get("HASH_METHOD", "pbkdf2:sha256:600000")
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_MAX_PENDING = int(os.environ.get("HASH_MAX_PENDING", "64"))
+HASH_WAIT = float(os.environ.get("HASH_WAIT", "2"))   # seconds to wait for a slot
+LOGIN_MAX_PER_USER = int(os.environ.get("LOGIN_MAX_PER_USER", "10"))
+LOGIN_MAX_PER_IP = int(os.environ.get("LOGIN_MAX_PER_IP", "30"))
+LOGIN_WINDOW = float(os.environ.get("LOGIN_WINDOW", "60"))
+
+
+class HashingBusy(Exception):
+    """Too many hashing jobs already pending."""
+
+
+class TooManyAttempts(Exception):
+    """Login attempts over the limit for this username or IP."""
+
+
+# JOBS RUN IN THE WORKER PROCESSES
+# ================================
+# Top-level functions so they can be pickled and sent to the processes.
+def _hash_job(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify_job(pwd_hash, password):
+    return check_password_hash(pwd_hash, password)
+
+
+class HashPool:
+    """Bounded process pool running hash / verify jobs, with metrics."""
+
+    def __init__(self, workers=HASH_WORKERS, max_pending=HASH_MAX_PENDING,
+                 wait=HASH_WAIT, samples=1024):
+        self.workers = workers
+        self.wait = wait
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._rejected = 0
+        self._done = 0
+        self._latencies = deque(maxlen=samples)
+        self.observers = []   # functions called with the duration of each job
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # forkserver: children are not forked from a process
+                    # that already runs the web server threads
+                    methods = multiprocessing.get_all_start_methods()
+                    context = multiprocessing.get_context(
+                        "forkserver" if "forkserver" in methods else "spawn")
+                    self._executor = ProcessPoolExecutor(self.workers, mp_context=context)
+        return self._executor
+
+    def run(self, func, *args):
+        """Run func(*args) in the pool and wait for the result."""
+        if not self._slots.acquire(timeout=self.wait):
+            with self._lock:
+                self._rejected += 1
+            raise HashingBusy("password hashing queue is full")
+        start = time.perf_counter()
+        with self._lock:
+            self._pending += 1
+        try:
+            if self.workers <= 0:
+                return func(*args)
+            return self._get_executor().submit(func, *args).result()
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._pending -= 1
+                self._done += 1
+                self._latencies.append(elapsed)
+            self._slots.release()
+            for observer in self.observers:
+                observer(elapsed)
+
+    async def run_async(self, func, *args):
+        """run() for asyncio code: waits for the slot and the job without a thread."""
+        if not self._slots.acquire(blocking=False):
+            waiting = asyncio.get_running_loop().run_in_executor(
+                None, self._slots.acquire, True, self.wait)
+            try:
+                # shield: cancelling the task must not lose track of the
+                # thread, which may still take the slot afterwards
+                acquired = await asyncio.shield(waiting)
+            except asyncio.CancelledError:
+                waiting.add_done_callback(self._release_if_acquired)
+                raise
+            if not acquired:
+                with self._lock:
+                    self._rejected += 1
+                raise HashingBusy("password hashing queue is full")
+        start = time.perf_counter()
+        with self._lock:
+            self._pending += 1
+        try:
+            if self.workers <= 0:
+                return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+            return await asyncio.wrap_future(self._get_executor().submit(func, *args))
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._pending -= 1
+                self._done += 1
+                self._latencies.append(elapsed)
+            self._slots.release()
+            for observer in self.observers:
+                observer(elapsed)
+
+    def _release_if_acquired(self, future):
+        """Give back a slot taken for a task that was cancelled meanwhile."""
+        if not future.cancelled() and future.exception() is None and future.result():
+            self._slots.release()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    # METRICS
+    # =======
+    def stats(self):
+        with self._lock:
+            samples = sorted(self._latencies)
+            data = {"pending": self._pending, "done": self._done,
+                    "rejected": self._rejected}
+        for name, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+            data[name] = samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+        return data
+
+    def metrics_text(self, prefix="hash"):
+        data = self.stats()
+        return (
+            f"# TYPE {prefix}_queue_depth gauge\n"
+            f"{prefix}_queue_depth {data['pending']}\n"
+            f"# TYPE {prefix}_jobs_total counter\n"
+            f"{prefix}_jobs_total {data['done']}\n"
+            f"# TYPE {prefix}_rejected_total counter\n"
+            f"{prefix}_rejected_total {data['rejected']}\n"
+            f"# TYPE {prefix}_latency_seconds summary\n"
+            f'{prefix}_latency_seconds{{quantile="0.5"}} {data["p50"]:.6f}\n'
+            f'{prefix}_latency_seconds{{quantile="0.95"}} {data["p95"]:.6f}\n'
+            f'{prefix}_latency_seconds{{quantile="0.99"}} {data["p99"]:.6f}\n'
+        )
+
+
+class Throttle:
+    """
+    Sliding-window attempt counter: at most `limit` attempts per key
+    during the last `window` seconds.
+    Keys are kept in the order of their last attempt: the expired ones are
+    at the front and every hit() drops them there, a few at a time. Past
+    max_keys (many usernames tried) the least recently tried key is
+    evicted, so the table never grows and never needs a full scan.
+    """
+
+    def __init__(self, limit, window=LOGIN_WINDOW, max_keys=100000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._attempts = OrderedDict()   # key -> deque of times, oldest key first
+        self._lock = threading.Lock()
+
+    def hit(self, key):
+        """Record one attempt; return False if the key is over the limit."""
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            attempts = self._attempts.get(key)
+            if attempts is None:
+                while len(self._attempts) >= self.max_keys:
+                    self._attempts.popitem(last=False)
+                attempts = self._attempts[key] = deque()
+            else:
+                self._attempts.move_to_end(key)
+            while attempts and attempts[0] <= now - self.window:
+                attempts.popleft()
+            if len(attempts) >= self.limit:
+                return False
+            attempts.append(now)
+            return True
+
+    def reset(self, key):
+        with self._lock:
+            self._attempts.pop(key, None)
+
+    def _purge(self, now):
+        # Stops at the first key tried within the window: O(expired keys)
+        while self._attempts:
+            attempts = next(iter(self._attempts.values()))
+            if attempts and attempts[-1] > now - self.window:
+                break
+            self._attempts.popitem(last=False)
+
+
+# MODULE-LEVEL HELPERS
+# ====================
+pool = HashPool()
+user_throttle = Throttle(LOGIN_MAX_PER_USER)
+ip_throttle = Throttle(LOGIN_MAX_PER_IP)
+
+
+def hash_password(password):
+    """Hash a password with the configured method (in the pool)."""
+    return pool.run(_hash_job, password, HASH_METHOD)
+
+
+def verify_password(pwd_hash, password):
+    """Check a password against a stored hash (in the pool)."""
+    return pool.run(_verify_job, pwd_hash, password)
+
+
+async def hash_password_async(password):
+    return await pool.run_async(_hash_job, password, HASH_METHOD)
+
+
+async def verify_password_async(pwd_hash, password):
+    return await pool.run_async(_verify_job, pwd_hash, password)
+
+
+def needs_rehash(pwd_hash):
+    """True if the hash was not made with HASH_METHOD (e.g. fewer iterations)."""
+    return pwd_hash.split("$", 1)[0] != HASH_METHOD
+
+
+def check_attempt(username, ip):
+    """Count one login attempt; raise TooManyAttempts over the limits."""
+    if not ip_throttle.hit(f"ip:{ip}"):
+        raise TooManyAttempts(f"too many attempts from {ip}")
+    if not user_throttle.hit(f"user:{username}"):
+        raise TooManyAttempts(f"too many attempts for {username}")
+
+
+def login_succeeded(username):
+    """A correct password clears the per-username counter."""
+    user_throttle.reset(f"user:{username}")
+
+
+def metrics_text():
+    return pool.metrics_text()
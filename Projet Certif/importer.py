@@ -0,0 +1,349 @@
+"""
+BULK IMPORTER
+=============
+Load Users, Lessons or Favorites from a CSV (with a header line) or a
+JSONL file (one JSON object per line) without hand-written INSERTs.
+
+- the file is streamed, never loaded whole in memory
+- rows are inserted with executemany(), --batch rows per transaction
+- the secondary indexes and the INSERT triggers of the table are
+  dropped during the load and rebuilt once at the end (an index built
+  on sorted data in one pass is much faster than updated row by row);
+  the UNIQUE constraints stay, they detect the conflicts; their SQL is
+  kept in Import_deferred until they are back, so an import killed
+  half-way is repaired by recover() (next import, or app start)
+- conflicts on the UNIQUE columns (username, tel, email, title, or the
+  primary key) are handled by --on-conflict:
+    skip    keep the existing row, ignore the new one (default)
+    update  overwrite the existing row with the same natural key
+            (username / title / id_user+id_lesson)
+    fail    stop at the first conflict, nothing of the batch is kept
+  a batch that hits an error is retried row by row: only the bad rows
+  are rejected (and written to --rejects if given)
+- progress and the final rows / second go to stderr
+
+Columns (extra columns are ignored):
+    users      username, pwd, birth_date, tel, email [, id_user, role]
+    lessons    id_user, title, file_path [, id_lesson]
+    favorites  id_user, id_lesson [, date_added]
+`pwd` is stored as given: a hash, or a plaintext password that
+users.authenticate() replaces by a hash at the first login.
+
+Command line (from Projet Certif/):
+    python importer.py users users.csv
+    python importer.py lessons lessons.jsonl --on-conflict update
+    python importer.py favorites - --format jsonl < favorites.jsonl
+    python importer.py recover
+"""
+
+import argparse
+import csv
+import io
+import itertools
+import json
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+
+import database
+import favorites
+import migrations
+import replicas
+
+# TABLES
+# ======
+# table: (required columns, optional columns, natural key for --on-conflict update)
+TABLES = {
+    "users": ("Users", ("username", "pwd", "birth_date", "tel", "email"),
+              ("id_user", "role"), ("username",)),
+    "lessons": ("Lessons", ("id_user", "title", "file_path"), ("id_lesson",), ("title",)),
+    "favorites": ("Favorites", ("id_user", "id_lesson"), ("date_added",),
+                  ("id_user", "id_lesson")),
+}
+
+# Recomputed after the load when the table's INSERT triggers were dropped
+# (the replica change counter did not see the new lessons: bump it)
+REBUILD = {"Favorites": favorites.RECOUNT_SCRIPT, "Lessons": replicas.SQL_BUMP}
+
+# Indexes and triggers dropped by an import, until they are recreated
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS Import_deferred (
+    name TEXT PRIMARY KEY,
+    tbl  TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    sql  TEXT NOT NULL
+)
+"""
+
+IMPORT_PRAGMAS = (
+    "PRAGMA synchronous = OFF",      # the load is redone if the machine crashes
+    "PRAGMA cache_size = -262144",   # 256 MB of page cache
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA foreign_keys = ON",
+)
+
+
+class ImportStopped(Exception):
+    """Import stopped (--on-conflict fail, bad file...)."""
+
+
+# READERS
+# =======
+def read_csv(handle):
+    reader = csv.reader(handle)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [name.strip() for name in header]
+    for row in reader:
+        if row:
+            # An empty cell is a missing value (NULL or the column default)
+            yield {name: value for name, value in zip(header, row) if value != ""}
+
+
+def read_jsonl(handle):
+    for number, line in enumerate(handle, 1):
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                raise ImportStopped(f"line {number}: {error}") from None
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+
+def rows_of(records, columns, defaults):
+    """Dicts -> tuples in the order of `columns` (default or None when missing)."""
+    for record in records:
+        yield tuple(defaults.get(column) if record.get(column) is None else record[column]
+                    for column in columns)
+
+
+# SQL
+# ===
+def insert_sql(table, columns, key, on_conflict):
+    placeholders = ", ".join("?" for _ in columns)
+    names = ", ".join(columns)
+    if on_conflict == "skip":
+        return f"INSERT OR IGNORE INTO {table} ({names}) VALUES ({placeholders})"
+    sql = f"INSERT INTO {table} ({names}) VALUES ({placeholders})"
+    if on_conflict == "update":
+        updates = [f"{column} = excluded.{column}" for column in columns if column not in key]
+        sql += f" ON CONFLICT ({', '.join(key)}) DO " + \
+               (f"UPDATE SET {', '.join(updates)}" if updates else "NOTHING")
+    return sql
+
+
+_INSERT_TRIGGER = re.compile(r"\bAFTER\s+INSERT\s+ON\b|\bBEFORE\s+INSERT\s+ON\b", re.I)
+
+
+def defer_indexes(conn, table):
+    """
+    Drop the explicit indexes and INSERT triggers of `table`; return their
+    SQL. The SQL is also saved in Import_deferred, in the same transaction.
+    """
+    saved = []
+    for kind, name, sql in conn.execute(
+            "SELECT type, name, sql FROM sqlite_master "
+            "WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+            (table,)).fetchall():
+        if kind == "trigger" and not _INSERT_TRIGGER.search(sql):
+            continue
+        conn.execute(f"DROP {kind.upper()} {name}")
+        conn.execute("INSERT OR REPLACE INTO Import_deferred (name, tbl, kind, sql) "
+                     "VALUES (?, ?, ?, ?)", (name, table, kind, sql))
+        saved.append((kind, sql))
+    return saved
+
+
+def restore_indexes(conn, table, saved):
+    """Recreate what defer_indexes() dropped (and recompute trigger-kept data)."""
+    existing = {row[0] for row in conn.execute("SELECT sql FROM sqlite_master WHERE sql IS NOT NULL")}
+    for kind, sql in saved:
+        if sql not in existing:   # already recreated by recover()
+            conn.execute(sql)
+    conn.execute("DELETE FROM Import_deferred WHERE tbl = ?", (table,))
+    if any(kind == "trigger" for kind, _ in saved) and table in REBUILD:
+        # executescript() would commit: run the statements one by one
+        for statement in REBUILD[table].split(";"):
+            if statement.strip():
+                conn.execute(statement)
+
+
+# IMPORT
+# ======
+class Report:
+    def __init__(self):
+        self.read = 0
+        self.written = 0
+        self.rejected = 0
+        self.start = time.perf_counter()
+
+    @property
+    def seconds(self):
+        return time.perf_counter() - self.start
+
+    def line(self):
+        rate = self.read / self.seconds if self.seconds else 0
+        return (f"{self.read} rows read, {self.written} written, "
+                f"{self.read - self.written - self.rejected} unchanged, {self.rejected} rejected "
+                f"in {self.seconds:.2f}s ({rate:,.0f} rows/s)")
+
+
+def _load_batch(conn, sql, batch, on_conflict, report, rejects):
+    # One transaction per batch, no SAVEPOINT: inside a savepoint every row
+    # that fires an UPDATE trigger is journaled again (quadratic time).
+    # rowcount, not total_changes: rows written by triggers do not count
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        try:
+            report.written += conn.executemany(sql, batch).rowcount
+        except sqlite3.IntegrityError as error:
+            conn.execute("ROLLBACK")
+            if on_conflict == "fail":
+                raise ImportStopped(
+                    f"conflict near row {report.read - len(batch) + 1}: {error}") from None
+            # Find the bad rows one by one, keep the others (a failed
+            # statement is undone alone, the transaction goes on)
+            conn.execute("BEGIN IMMEDIATE")
+            for row in batch:
+                try:
+                    report.written += conn.execute(sql, row).rowcount
+                except sqlite3.IntegrityError as row_error:
+                    report.rejected += 1
+                    if rejects is not None:
+                        rejects.write(json.dumps({"row": list(row), "error": str(row_error)}) + "\n")
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+
+
+def recover(path=None):
+    """
+    Recreate the indexes and triggers left dropped by an import that did
+    not finish (process killed, machine crash). Returns the tables repaired.
+    """
+    conn = sqlite3.connect(path or database.DB_PATH, isolation_level=None)
+    try:
+        conn.execute("PRAGMA busy_timeout = 5000")
+        conn.execute(SCHEMA)
+        conn.execute("BEGIN IMMEDIATE")
+        pending = {}
+        for table, kind, sql in conn.execute("SELECT tbl, kind, sql FROM Import_deferred"):
+            pending.setdefault(table, []).append((kind, sql))
+        for table, saved in pending.items():
+            restore_indexes(conn, table, saved)
+        conn.execute("COMMIT")
+        return sorted(pending)
+    finally:
+        conn.close()
+
+
+def import_rows(kind, records, on_conflict="skip", batch_size=100000,
+                defer=True, rejects=None, progress=None, path=None):
+    """Load an iterable of dicts into the table of `kind`. Returns a Report."""
+    table, required, optional, key = TABLES[kind]
+    records = iter(records)
+    first = next(records, None)
+    report = Report()
+    if first is None:
+        return report
+    missing = [column for column in required if column not in first]
+    if missing:
+        raise ImportStopped(f"missing columns for {kind}: {', '.join(missing)}")
+    columns = list(required) + [column for column in optional if column in first]
+    defaults = {"role": "user"}
+    if kind == "favorites" and "date_added" not in columns:
+        columns.append("date_added")
+        defaults["date_added"] = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    sql = insert_sql(table, columns, key, on_conflict)
+
+    # A previous import killed half-way: put its indexes back first
+    recover(path)
+    conn = sqlite3.connect(path or database.DB_PATH, isolation_level=None)
+    for pragma in IMPORT_PRAGMAS:
+        conn.execute(pragma)
+    conn.execute("BEGIN IMMEDIATE")
+    saved = defer_indexes(conn, table) if defer else []
+    conn.execute("COMMIT")
+    try:
+        batch = []
+        for row in rows_of(itertools.chain([first], records), columns, defaults):
+            batch.append(row)
+            report.read += 1
+            if len(batch) >= batch_size:
+                # Commit each batch: the WAL stays small and an error later
+                # only loses the current batch
+                _load_batch(conn, sql, batch, on_conflict, report, rejects)
+                batch = []
+                if progress:
+                    progress(report)
+        if batch:
+            _load_batch(conn, sql, batch, on_conflict, report, rejects)
+    finally:
+        # Indexes and triggers come back whatever happened (the batches
+        # already committed are kept). If the process dies before this,
+        # their SQL is still in Import_deferred: recover() recreates them.
+        conn.execute("BEGIN IMMEDIATE")
+        restore_indexes(conn, table, saved)
+        conn.execute("COMMIT")
+        conn.execute("PRAGMA optimize")
+        conn.close()
+    return report
+
+
+# COMMAND LINE
+# ============
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import into BDD.db")
+    parser.add_argument("table", choices=sorted(TABLES) + ["recover"],
+                        help="table to load, or recover: recreate what a killed import dropped")
+    parser.add_argument("file", nargs="?", help="CSV or JSONL file, - for stdin")
+    parser.add_argument("--format", choices=sorted(READERS),
+                        help="default: from the file extension")
+    parser.add_argument("--on-conflict", choices=("skip", "update", "fail"), default="skip")
+    parser.add_argument("--batch", type=int, default=100000, help="rows per transaction")
+    parser.add_argument("--keep-indexes", action="store_true",
+                        help="do not drop / rebuild the secondary indexes")
+    parser.add_argument("--rejects", help="write the rejected rows here (JSONL)")
+    parser.add_argument("--db", help="database path (default: BDD_PATH or BDD/BDD.db)")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        database.configure(path=args.db)
+    # Tables, indexes and triggers the app expects, before deferring them
+    migrations.migrate()
+    if args.table == "recover":
+        print(f"recreated: {', '.join(recover()) or 'nothing to do'}", file=sys.stderr)
+        return 0
+    if args.file is None:
+        parser.error("the file to import is required")
+
+    fmt = args.format or ("jsonl" if args.file.endswith((".jsonl", ".ndjson", ".json")) else "csv")
+    handle = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="") \
+        if args.file == "-" else open(args.file, encoding="utf-8-sig", newline="")
+    rejects = open(args.rejects, "w", encoding="utf-8") if args.rejects else None
+    try:
+        report = import_rows(
+            args.table, READERS[fmt](handle), args.on_conflict, args.batch,
+            defer=not args.keep_indexes, rejects=rejects,
+            progress=lambda r: print(r.line(), file=sys.stderr))
+    except ImportStopped as error:
+        print(f"import stopped: {error}", file=sys.stderr)
+        return 1
+    finally:
+        handle.close()
+        if rejects:
+            rejects.close()
+    print(report.line(), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
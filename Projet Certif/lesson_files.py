@@ -0,0 +1,26 @@
+"""
+LESSON FILES
+============
+Map the file_path column of Lessons to a real PDF under lessons/.
+
+file_path may be written relative to Projet Certif/ ("lessons/poo.pdf"),
+relative to lessons/ ("poo.pdf") or absolute. Whatever the form, the
+resolved file must be inside LESSONS_DIR: a row pointing elsewhere
+("../../etc/passwd") is treated as missing.
+"""
+
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LESSONS_DIR = os.path.realpath(os.environ.get("LESSONS_DIR", os.path.join(BASE_DIR, "lessons")))
+
+
+def resolve_lesson_file(file_path):
+    """Absolute path of an existing file inside LESSONS_DIR, or None."""
+    if not file_path:
+        return None
+    for root in (BASE_DIR, LESSONS_DIR):
+        path = os.path.realpath(os.path.join(root, file_path))
+        if path.startswith(LESSONS_DIR + os.sep) and os.path.isfile(path):
+            return path
+    return None
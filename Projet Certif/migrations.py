@@ -0,0 +1,438 @@
+"""
+SCHEMA MIGRATIONS AND INDEX ADVISOR
+===================================
+BDD.db is shipped as a binary file. This module gives its schema a
+history and checks that the application's queries use indexes.
+
+Migrations:
+- MIGRATIONS is an ordered list of (version, name, SQL script)
+- the version reached is stored in the database itself (PRAGMA user_version)
+- migrate() applies the missing ones, each in its own transaction
+
+Index advisor:
+- query shapes come from the SQL_* constants of the app modules and,
+  optionally, from a recorder that traces the SQL really executed
+  (literal values are replaced by ? so each shape is listed once)
+- each shape goes through EXPLAIN QUERY PLAN; every SCAN of a table is
+  flagged and an index is proposed from the WHERE / ORDER BY columns
+- advise(apply=True) creates the proposed indexes
+
+Command line (from Projet Certif/):
+    python migrations.py status
+    python migrations.py migrate
+    python migrations.py advise [--apply]
+"""
+
+import argparse
+import re
+import sys
+import threading
+
+import database
+import favorites
+import previews
+import queries
+import search
+import sessions
+import users
+
+# MIGRATIONS
+# ==========
+# Each migration is frozen SQL: once a number is released its script never
+# changes (the module SCHEMA strings may move on, a change to them gets a
+# new migration here). The scripts are idempotent (IF NOT EXISTS), so
+# migrating a database on which a module already created its tables is
+# harmless.
+MIGRATIONS = [
+    (1, "users cache generation", """
+    CREATE TABLE IF NOT EXISTS Cache_generation (
+        name    TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    );
+    INSERT OR IGNORE INTO Cache_generation (name, version) VALUES ('Users', 0);
+
+    CREATE TRIGGER IF NOT EXISTS Users_cache_update AFTER UPDATE OF username, pwd ON Users
+    BEGIN
+        UPDATE Cache_generation SET version = version + 1 WHERE name = 'Users';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS Users_cache_delete AFTER DELETE ON Users
+    BEGIN
+        UPDATE Cache_generation SET version = version + 1 WHERE name = 'Users';
+    END;
+    """),
+    (2, "server-side sessions", """
+    CREATE TABLE IF NOT EXISTS Sessions (
+        id       TEXT PRIMARY KEY,
+        username TEXT,
+        data     TEXT NOT NULL,
+        expires  REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS Sessions_username ON Sessions (username);
+    CREATE INDEX IF NOT EXISTS Sessions_expires ON Sessions (expires);
+
+    CREATE TABLE IF NOT EXISTS Cache_generation (
+        name    TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    );
+    INSERT OR IGNORE INTO Cache_generation (name, version) VALUES ('Sessions', 0);
+
+    -- Only revocations of live sessions matter to the other workers,
+    -- the sweep of expired rows does not bump the counter
+    CREATE TRIGGER IF NOT EXISTS Sessions_cache_delete AFTER DELETE ON Sessions
+    WHEN OLD.expires > CAST(strftime('%s', 'now') AS REAL)
+    BEGIN
+        UPDATE Cache_generation SET version = version + 1 WHERE name = 'Sessions';
+    END;
+    """),
+    (3, "lesson previews", """
+    CREATE TABLE IF NOT EXISTS Lesson_previews (
+        id_lesson  INTEGER PRIMARY KEY REFERENCES Lessons (id_lesson) ON DELETE CASCADE,
+        size       INTEGER NOT NULL,
+        mtime_ns   INTEGER NOT NULL,
+        sha256     TEXT NOT NULL,
+        page_count INTEGER NOT NULL,
+        thumbnail  TEXT NOT NULL
+    );
+    """),
+    (4, "full-text search", """
+    CREATE VIRTUAL TABLE IF NOT EXISTS Lessons_fts USING fts5 (
+        title, body,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4'
+    );
+
+    CREATE TABLE IF NOT EXISTS Lessons_fts_state (
+        id_lesson INTEGER PRIMARY KEY REFERENCES Lessons (id_lesson) ON DELETE CASCADE,
+        title     TEXT NOT NULL,
+        size      INTEGER NOT NULL,
+        mtime_ns  INTEGER NOT NULL
+    );
+
+    CREATE TRIGGER IF NOT EXISTS Lessons_fts_delete AFTER DELETE ON Lessons
+    BEGIN
+        DELETE FROM Lessons_fts WHERE rowid = OLD.id_lesson;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS Lessons_fts_update AFTER UPDATE OF title, file_path ON Lessons
+    BEGIN
+        DELETE FROM Lessons_fts_state WHERE id_lesson = OLD.id_lesson;
+    END;
+    """),
+    (5, "favorites indexes and counters", """
+    CREATE INDEX IF NOT EXISTS Favorites_lesson_date ON Favorites (id_lesson, date_added);
+
+    CREATE TABLE IF NOT EXISTS Lesson_popularity (
+        id_lesson INTEGER PRIMARY KEY REFERENCES Lessons (id_lesson) ON DELETE CASCADE,
+        favorites INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS Lesson_popularity_rank ON Lesson_popularity (favorites DESC, id_lesson);
+
+    CREATE TABLE IF NOT EXISTS User_favorite_counts (
+        id_user   INTEGER PRIMARY KEY REFERENCES Users (id_user) ON DELETE CASCADE,
+        favorites INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE TRIGGER IF NOT EXISTS Favorites_count_insert AFTER INSERT ON Favorites
+    BEGIN
+        INSERT INTO Lesson_popularity (id_lesson, favorites) VALUES (NEW.id_lesson, 1)
+            ON CONFLICT (id_lesson) DO UPDATE SET favorites = favorites + 1;
+        INSERT INTO User_favorite_counts (id_user, favorites) VALUES (NEW.id_user, 1)
+            ON CONFLICT (id_user) DO UPDATE SET favorites = favorites + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS Favorites_count_delete AFTER DELETE ON Favorites
+    BEGIN
+        UPDATE Lesson_popularity SET favorites = favorites - 1 WHERE id_lesson = OLD.id_lesson;
+        UPDATE User_favorite_counts SET favorites = favorites - 1 WHERE id_user = OLD.id_user;
+    END;
+
+    -- Favorites written before the triggers existed (no-op afterwards)
+    INSERT OR IGNORE INTO Lesson_popularity (id_lesson, favorites)
+        SELECT id_lesson, COUNT(*) FROM Favorites GROUP BY id_lesson;
+    INSERT OR IGNORE INTO User_favorite_counts (id_user, favorites)
+        SELECT id_user, COUNT(*) FROM Favorites GROUP BY id_user;
+    """),
+    (6, "index Lessons(id_user)", """
+    CREATE INDEX IF NOT EXISTS Lessons_user ON Lessons (id_user, id_lesson);
+    """),
+    (7, "per-session deletion log", """
+    DROP TRIGGER IF EXISTS Sessions_cache_delete;
+    CREATE TABLE IF NOT EXISTS Sessions_deleted (
+        seq     INTEGER PRIMARY KEY AUTOINCREMENT,
+        id      TEXT NOT NULL,
+        deleted REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS Sessions_deleted_at ON Sessions_deleted (deleted);
+    CREATE TRIGGER IF NOT EXISTS Sessions_deleted_log AFTER DELETE ON Sessions
+    WHEN OLD.expires > CAST(strftime('%s', 'now') AS REAL)
+    BEGIN
+        INSERT INTO Sessions_deleted (id, deleted)
+        VALUES (OLD.id, CAST(strftime('%s', 'now') AS REAL));
+    END;
+    """),
+    (8, "read replica change counter", """
+    CREATE TABLE IF NOT EXISTS Cache_generation (
+        name    TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    );
+    INSERT OR IGNORE INTO Cache_generation (name, version) VALUES ('Replicas', 0);
+
+    CREATE TRIGGER IF NOT EXISTS Lessons_replica_insert AFTER INSERT ON Lessons
+    BEGIN
+        UPDATE Cache_generation SET version = version + 1 WHERE name = 'Replicas';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS Lessons_replica_update AFTER UPDATE ON Lessons
+    BEGIN
+        UPDATE Cache_generation SET version = version + 1 WHERE name = 'Replicas';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS Lessons_replica_delete AFTER DELETE ON Lessons
+    BEGIN
+        UPDATE Cache_generation SET version = version + 1 WHERE name = 'Replicas';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS Lessons_fts_state_replica_insert AFTER INSERT ON Lessons_fts_state
+    BEGIN
+        UPDATE Cache_generation SET version = version + 1 WHERE name = 'Replicas';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS Lessons_fts_state_replica_update AFTER UPDATE ON Lessons_fts_state
+    BEGIN
+        UPDATE Cache_generation SET version = version + 1 WHERE name = 'Replicas';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS Lessons_fts_state_replica_delete AFTER DELETE ON Lessons_fts_state
+    BEGIN
+        UPDATE Cache_generation SET version = version + 1 WHERE name = 'Replicas';
+    END;
+    """),
+    (9, "covering index Favorites(id_lesson, date_added, id_user)", """
+    CREATE INDEX IF NOT EXISTS Favorites_lesson_date_user ON Favorites (id_lesson, date_added, id_user);
+    DROP INDEX IF EXISTS Favorites_lesson_date;
+    """),
+]
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(target=None):
+    """Apply the missing migrations (up to `target`). Returns the versions applied."""
+    applied = []
+    with database.connection() as conn:
+        version = current_version(conn)
+        for number, name, script in MIGRATIONS:
+            if number <= version or (target is not None and number > target):
+                continue
+            # executescript() would commit on its own: run the script and
+            # the version bump as one transaction
+            conn.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {number};\nCOMMIT;")
+            applied.append((number, name))
+    return applied
+
+
+# QUERY SHAPES
+# ============
+_QUOTED = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+_QUERY_START = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.I)
+
+
+def normalize(sql):
+    """Replace literal values by ? and collapse IN lists: one text per query shape."""
+    sql = _QUOTED.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(?, ?)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def static_shapes():
+    """The SQL_* query constants of the application modules."""
+    shapes = []
+    for module in (queries, users, sessions, previews, search, favorites):
+        for name in sorted(vars(module)):
+            value = getattr(module, name)
+            if not name.startswith("SQL_"):
+                continue
+            values = value.values() if isinstance(value, dict) else [value]
+            shapes.extend(v for v in values if isinstance(v, str) and _QUERY_START.match(v))
+    shapes.append(queries._in_sql(queries.MIN_CHUNK))
+    return shapes
+
+
+class QueryRecorder:
+    """
+    Trace every statement run on pooled connections and keep the shapes.
+        recorder = QueryRecorder().start()
+        ... use the app ...
+        recorder.shapes()
+    """
+
+    def __init__(self):
+        self._shapes = {}
+        self._lock = threading.Lock()
+
+    def _trace(self, sql):
+        if _QUERY_START.match(sql):
+            shape = normalize(sql)
+            with self._lock:
+                self._shapes[shape] = self._shapes.get(shape, 0) + 1
+
+    def _hook(self, conn):
+        conn.set_trace_callback(self._trace)
+
+    def start(self):
+        database.add_connection_hook(self._hook)
+        return self
+
+    def stop(self):
+        if self._hook in database.CONNECTION_HOOKS:
+            database.CONNECTION_HOOKS.remove(self._hook)
+            database.configure()
+
+    def shapes(self):
+        """{shape: number of executions}"""
+        with self._lock:
+            return dict(self._shapes)
+
+    def dump(self, path):
+        """Write the shapes, one per line, for `advise --shapes path`."""
+        with open(path, "w", encoding="utf-8") as handle:
+            for shape in sorted(self.shapes()):
+                handle.write(shape + "\n")
+
+
+# INDEX ADVISOR
+# =============
+_TABLE_ALIAS = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!WHERE|JOIN|ON|ORDER|GROUP|LIMIT|LEFT|INNER)(\w+))?", re.I)
+_WHERE = re.compile(r"\bWHERE\b(.*?)(?:\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|$)", re.I | re.S)
+_ORDER = re.compile(r"\bORDER BY\b(.*?)(?:\bLIMIT\b|$)", re.I | re.S)
+_CONDITION = re.compile(r"(?:(\w+)\.)?(\w+)\s*(=|>=|<=|>|<|\bIN\b)", re.I)
+_SCAN = re.compile(r"^SCAN (\w+)")
+
+
+def _params(sql):
+    return _QUOTED.sub("", sql).count("?")
+
+
+def explain(conn, sql):
+    """EXPLAIN QUERY PLAN detail lines of a query (parameters bound to NULL)."""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", (None,) * _params(sql)).fetchall()
+    return [row[3] for row in rows]
+
+
+def _propose(sql, table):
+    """Index columns for `table` in a query: equalities first, then range / order."""
+    aliases = {table.lower()}
+    for name, alias in _TABLE_ALIAS.findall(sql):
+        if name.lower() == table.lower() and alias:
+            aliases.add(alias.lower())
+    single_table = len(_TABLE_ALIAS.findall(sql)) == 1
+    equal, ranged = [], []
+    where = _WHERE.search(sql)
+    if where:
+        for alias, column, op in _CONDITION.findall(where.group(1)):
+            if (alias.lower() in aliases) or (not alias and single_table):
+                target = equal if op.upper() in ("=", "IN") else ranged
+                if column not in equal + ranged:
+                    target.append(column)
+    order = _ORDER.search(sql)
+    if order and (equal or ranged):
+        for alias, column in re.findall(r"(?:(\w+)\.)?(\w+)", order.group(1)):
+            if column.upper() in ("ASC", "DESC"):
+                continue
+            if ((alias.lower() in aliases) or (not alias and single_table)) \
+                    and column not in equal + ranged:
+                ranged.append(column)
+    return equal + ranged
+
+
+def advise(shapes=None, apply=False):
+    """
+    EXPLAIN every query shape. Returns a list of findings:
+    {"sql", "plan", "scans", "indexes"} where indexes are the proposed
+    CREATE INDEX statements, one per scanned table that has a filter to
+    index (empty if none has).
+    With apply=True the proposed indexes are created.
+    """
+    shapes = list(shapes) if shapes is not None else static_shapes()
+    findings = []
+    with database.connection() as conn:
+        tables = {row[0].lower(): row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for sql in dict.fromkeys(shapes):
+            try:
+                plan = explain(conn, sql)
+            except database.sqlite3.Error as error:
+                findings.append({"sql": sql, "plan": [f"error: {error}"], "scans": [], "indexes": []})
+                continue
+            scans = [m.group(1) for m in map(_SCAN.match, plan)
+                     if m and "VIRTUAL TABLE" not in m.string and m.group(1).lower() in tables]
+            indexes = []
+            for table in scans:
+                columns = _propose(sql, table)
+                if columns:
+                    name = f"idx_{table}_{'_'.join(columns)}"
+                    index = (f"CREATE INDEX IF NOT EXISTS {name} "
+                             f"ON {tables[table.lower()]} ({', '.join(columns)})")
+                    indexes.append(index)
+                    if apply:
+                        conn.execute(index)
+            findings.append({"sql": sql, "plan": plan, "scans": scans, "indexes": indexes})
+    return findings
+
+
+# COMMAND LINE
+# ============
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BDD.db migrations and index advisor")
+    parser.add_argument("--db", help="database path (default: BDD_PATH or BDD/BDD.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="show the schema version")
+    step = sub.add_parser("migrate", help="apply the missing migrations")
+    step.add_argument("--to", type=int, help="stop at this version")
+    adv = sub.add_parser("advise", help="EXPLAIN the app queries and propose indexes")
+    adv.add_argument("--apply", action="store_true", help="create the proposed indexes")
+    adv.add_argument("--shapes", help="file of recorded query shapes (QueryRecorder.dump), "
+                                      "checked together with the app constants")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        database.configure(path=args.db)
+
+    if args.command == "status":
+        with database.connection() as conn:
+            version = current_version(conn)
+        for number, name, _ in MIGRATIONS:
+            print(f"{'[x]' if number <= version else '[ ]'} {number:>3} {name}")
+    elif args.command == "migrate":
+        for number, name in migrate(args.to) or [(None, "already up to date")]:
+            print(f"applied {number}: {name}" if number else name)
+    else:
+        shapes = static_shapes()
+        if args.shapes:
+            with open(args.shapes, encoding="utf-8") as handle:
+                shapes += [line.strip() for line in handle if line.strip()]
+        findings = advise(shapes, apply=args.apply)
+        for finding in findings:
+            if finding["plan"] and finding["plan"][0].startswith("error"):
+                print(f"{finding['sql']}\n    {finding['plan'][0]} (run `migrate` first?)")
+        flagged = [f for f in findings if f["scans"]]
+        for finding in flagged:
+            print(finding["sql"])
+            for line in finding["plan"]:
+                print(f"    {line}")
+            for index in finding["indexes"] or ["full scan by design (no filter to index)"]:
+                print(f"    -> {index}")
+        print(f"{len(findings)} queries checked, {len(flagged)} with a SCAN"
+              + (", indexes created" if args.apply else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
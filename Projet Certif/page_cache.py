@@ -0,0 +1,127 @@
+"""
+TEMPLATE AND PAGE CACHE
+=======================
+The home page and the login form are almost static: rendering them with
+Jinja on every request is wasted work.
+
+- configure_environment() gives the Jinja environment a bytecode cache
+  on disk (TEMPLATE_CACHE_DIR) and compiles every template at startup,
+  so no request ever parses a template
+- PageCache.page() renders a page once and keeps the bytes in memory,
+  with a strong ETag (the browser gets 304 as long as it did not change)
+- PageCache.user_page() is for pages that only differ by the username:
+  the page is rendered once around a placeholder and split in two, each
+  request only escapes the username and joins head + username + tail
+
+With TEMPLATES_AUTO_RELOAD (Flask debug mode) a changed template file
+is detected and the cached pages are rendered again.
+"""
+
+import hashlib
+import os
+import threading
+from typing import NamedTuple
+
+import jinja2
+from markupsafe import escape
+
+# CONFIGURATION
+# =============
+TEMPLATE_CACHE_DIR = os.environ.get(
+    "TEMPLATE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "jinja"))
+
+# Rendered in place of the username, then split on. Private-use characters:
+# autoescape leaves them alone and no real username contains them.
+PLACEHOLDER = "\ue000username\ue000"
+
+
+class Page(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def configure_environment(env, cache_dir=TEMPLATE_CACHE_DIR):
+    """Bytecode cache + compile every template now. Returns the template names."""
+    os.makedirs(cache_dir, exist_ok=True)
+    env.bytecode_cache = jinja2.FileSystemBytecodeCache(cache_dir)
+    names = [name for name in env.list_templates() if name.endswith(".html")]
+    for name in names:
+        env.get_template(name)
+    return names
+
+
+def _etag(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part)
+    return digest.hexdigest()[:32]
+
+
+class PageCache:
+    """Rendered pages in memory, keyed by template name and (constant) context."""
+
+    def __init__(self, env):
+        self.env = env
+        self._pages = {}   # key -> (template, Page or (head, tail, etag))
+        self._lock = threading.Lock()
+
+    def _get(self, key, name, render):
+        entry = self._pages.get(key)
+        if entry is not None:
+            template, value = entry
+            if not self.env.auto_reload or template.is_up_to_date:
+                return value
+        template = self.env.get_template(name)
+        value = render(template)
+        with self._lock:
+            self._pages[key] = (template, value)
+        return value
+
+    def page(self, name, **context):
+        """The whole page, rendered once (context values must be hashable)."""
+        def render(template):
+            body = template.render(**context).encode("utf-8")
+            return Page(body, _etag(body))
+        return self._get((name, None, tuple(sorted(context.items()))), name, render)
+
+    def user_page(self, name, username, **context):
+        """The page for one username, from the cached head and tail."""
+        def render(template):
+            html = template.render(username=PLACEHOLDER, **context)
+            head, found, tail = html.partition(PLACEHOLDER)
+            if not found:
+                raise ValueError(f"{name} does not display the username")
+            head, tail = head.encode("utf-8"), tail.encode("utf-8")
+            return head, tail, _etag(head, b"\0", tail)
+        head, tail, etag = self._get((name, PLACEHOLDER, tuple(sorted(context.items()))),
+                                     name, render)
+        user = str(escape(username)).encode("utf-8")
+        return Page(head + user + tail, f"{etag}-{_etag(user)[:16]}")
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+
+# FLASK GLUE
+# ==========
+def install(app):
+    """
+    Attach a PageCache (app.extensions). The templates are compiled later,
+    by configure_environment(app.jinja_env) when the server starts.
+    """
+    cache = app.extensions["page_cache"] = PageCache(app.jinja_env)
+    return cache
+
+
+def respond(page, private=False):
+    """Response for a cached page: ETag, revalidation, 304 when unchanged."""
+    from flask import Response, request
+    response = Response(page.body, mimetype="text/html")
+    response.set_etag(page.etag)
+    # no-cache = the browser keeps the page but asks each time (If-None-Match)
+    response.cache_control.no_cache = True
+    if private:
+        response.cache_control.private = True
+    return response.make_conditional(request)
@@ -0,0 +1,139 @@
+"""
+MINIMAL PDF READER
+==================
+Just enough PDF parsing for the lesson files (simple, text-only PDFs such
+as the ReportLab ones in lessons/), without any third-party package:
+
+- page_count(data): number of pages
+- page_texts(data): text of each page, from the Tj / TJ operators of the
+  content streams (ASCII85 and Flate filters are decoded)
+
+If pypdf is installed, page_texts() uses it instead, it copes with far
+more PDFs (fonts with custom encodings, object streams, ...).
+"""
+
+import base64
+import re
+import zlib
+
+try:
+    import pypdf
+except ImportError:   # optional dependency
+    pypdf = None
+
+_OBJECT = re.compile(rb"(\d+)\s+(\d+)\s+obj\b(.*?)\bendobj", re.S)
+_STREAM = re.compile(rb"stream\r?\n(.*?)\r?\n?endstream", re.S)
+_PAGE = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+_PAGES_COUNT = re.compile(rb"/Type\s*/Pages\b")
+_COUNT = re.compile(rb"/Count\s+(\d+)")
+_CONTENTS = re.compile(rb"/Contents\s+(?:(\d+)\s+\d+\s+R|\[([^\]]*)\])")
+_REF = re.compile(rb"(\d+)\s+\d+\s+R")
+_FILTERS = re.compile(rb"/(ASCII85Decode|A85|FlateDecode|Fl|ASCIIHexDecode|AHx)\b")
+_TEXT_OP = re.compile(rb"\((?:\\.|[^\\)])*\)\s*(?:Tj|'|\")|\[(?:[^\]\\]|\\.)*\]\s*TJ|T\*|Td|TD|ET", re.S)
+_STRING = re.compile(rb"\(((?:\\.|[^\\)])*)\)", re.S)
+_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f",
+            b"(": b"(", b")": b")", b"\\": b"\\"}
+
+
+def _objects(data):
+    """{object number: raw body} (the last definition wins, like in a PDF update)."""
+    return {int(match.group(1)): match.group(3) for match in _OBJECT.finditer(data)}
+
+
+def page_count(data):
+    """Number of pages of a PDF given as bytes (0 if it cannot be read)."""
+    objects = _objects(data)
+    counts = [int(m.group(1)) for body in objects.values() if _PAGES_COUNT.search(body)
+              for m in [_COUNT.search(body)] if m]
+    if counts:
+        return max(counts)   # the root Pages node holds the total
+    return sum(1 for body in objects.values() if _PAGE.search(body))
+
+
+def _decode_stream(body):
+    match = _STREAM.search(body)
+    if not match:
+        return b""
+    raw = match.group(1)
+    header = body[:match.start()]
+    for name in _FILTERS.findall(header):
+        if name in (b"ASCII85Decode", b"A85"):
+            raw = raw.strip()
+            if raw.startswith(b"<~"):
+                raw = raw[2:]
+            raw = base64.a85decode(raw.rstrip(b"~>").rstrip(b"~"), ignorechars=b" \t\r\n")
+        elif name in (b"FlateDecode", b"Fl"):
+            raw = zlib.decompress(raw)
+        elif name in (b"ASCIIHexDecode", b"AHx"):
+            raw = bytes.fromhex(re.sub(rb"\s|>", b"", raw).decode("ascii"))
+    return raw
+
+
+def _unescape(raw):
+    out = bytearray()
+    i = 0
+    while i < len(raw):
+        char = raw[i:i + 1]
+        if char == b"\\" and i + 1 < len(raw):
+            nxt = raw[i + 1:i + 2]
+            if nxt in _ESCAPES:
+                out += _ESCAPES[nxt]
+                i += 2
+                continue
+            octal = re.match(rb"[0-7]{1,3}", raw[i + 1:i + 4])
+            if octal:
+                out.append(int(octal.group(0), 8) & 0xFF)
+                i += 1 + len(octal.group(0))
+                continue
+            i += 1
+            continue
+        out += char
+        i += 1
+    return bytes(out)
+
+
+def _content_text(content):
+    parts = []
+    for match in _TEXT_OP.finditer(content):
+        op = match.group(0)
+        if op in (b"T*", b"Td", b"TD", b"ET"):
+            if parts and parts[-1] != "\n":
+                parts.append("\n")
+            continue
+        for string in _STRING.findall(op):
+            parts.append(_unescape(string).decode("cp1252", errors="replace"))
+    return "".join(parts).strip()
+
+
+def _page_texts_builtin(data):
+    objects = _objects(data)
+    texts = []
+    for number in sorted(objects):
+        body = objects[number]
+        if not _PAGE.search(body):
+            continue
+        contents = _CONTENTS.search(body)
+        refs = []
+        if contents:
+            refs = [int(contents.group(1))] if contents.group(1) else \
+                [int(r) for r in _REF.findall(contents.group(2))]
+        chunks = []
+        for ref in refs:
+            try:
+                chunks.append(_content_text(_decode_stream(objects.get(ref, b""))))
+            except (ValueError, zlib.error):
+                continue   # filter we cannot decode: skip this stream
+        texts.append("\n".join(chunk for chunk in chunks if chunk))
+    return texts
+
+
+def page_texts(data):
+    """List with the text of each page."""
+    if pypdf is not None:
+        import io
+        try:
+            reader = pypdf.PdfReader(io.BytesIO(data))
+            return [page.extract_text() or "" for page in reader.pages]
+        except Exception:
+            pass   # fall back on the built-in reader
+    return _page_texts_builtin(data)
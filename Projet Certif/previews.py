@@ -0,0 +1,257 @@
+"""
+LESSON PREVIEWS
+===============
+Page count and first-page thumbnail of every lesson PDF, computed ahead of
+time by a background job instead of at request time.
+
+- Thumbnails are stored in a content-addressed cache: the file name is the
+  SHA-256 of the PDF, so two lessons with the same PDF share one image and
+  a changed PDF gets a new one.
+- The Lesson_previews table remembers, per lesson, the size and mtime of
+  the PDF seen last time: re-indexing only re-reads and re-renders the
+  files whose size or mtime changed (incremental).
+- Rendering uses PyMuPDF if installed, else the `pdftoppm` command, else
+  an SVG card with the title and first lines of text of page 1.
+"""
+
+import hashlib
+import html
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+import database
+import lesson_files
+import pdf_utils
+import queries
+
+try:
+    import fitz   # PyMuPDF, optional
+except ImportError:
+    fitz = None
+
+PREVIEW_CACHE_DIR = os.environ.get(
+    "PREVIEW_CACHE_DIR", os.path.join(lesson_files.BASE_DIR, "cache", "previews"))
+PREVIEW_WIDTH = int(os.environ.get("PREVIEW_WIDTH", "240"))
+PREVIEW_INTERVAL = float(os.environ.get("PREVIEW_INTERVAL", "300"))
+PREVIEW_QUEUE_MAX = 1000   # lessons waiting for the indexer between two passes
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS Lesson_previews (
+    id_lesson  INTEGER PRIMARY KEY REFERENCES Lessons (id_lesson) ON DELETE CASCADE,
+    size       INTEGER NOT NULL,
+    mtime_ns   INTEGER NOT NULL,
+    sha256     TEXT NOT NULL,
+    page_count INTEGER NOT NULL,
+    thumbnail  TEXT NOT NULL
+);
+"""
+
+SQL_GET = ("SELECT id_lesson, size, mtime_ns, sha256, page_count, thumbnail "
+           "FROM Lesson_previews WHERE id_lesson = ?")
+SQL_ALL_STATES = "SELECT id_lesson, size, mtime_ns FROM Lesson_previews"
+SQL_SAVE = ("INSERT OR REPLACE INTO Lesson_previews "
+            "(id_lesson, size, mtime_ns, sha256, page_count, thumbnail) "
+            "VALUES (?, ?, ?, ?, ?, ?)")
+
+
+# RENDERERS
+# =========
+def _render_fitz(pdf_path, target):
+    with fitz.open(pdf_path) as document:
+        page = document[0]
+        zoom = PREVIEW_WIDTH / page.rect.width
+        page.get_pixmap(matrix=fitz.Matrix(zoom, zoom)).save(target)
+
+
+def _render_pdftoppm(pdf_path, target):
+    prefix = target[:-len(".png")]
+    subprocess.run(
+        ["pdftoppm", "-png", "-singlefile", "-f", "1", "-l", "1",
+         "-scale-to", str(PREVIEW_WIDTH), pdf_path, prefix],
+        check=True, capture_output=True, timeout=30)
+
+
+def _render_svg(title, text, target):
+    height = int(PREVIEW_WIDTH * 1.414)   # A4 ratio
+    lines = [line for line in text.splitlines() if line.strip()][:14]
+    rows = []
+    y = 40
+    for number, line in enumerate(lines):
+        size = 16 if number == 0 else 11
+        weight = "bold" if number == 0 else "normal"
+        rows.append(f'<text x="16" y="{y}" font-size="{size}" font-weight="{weight}">'
+                    f'{html.escape(line[:40])}</text>')
+        y += size + 8
+    svg = (f'<svg xmlns="http://www.w3.org/2000/svg" width="{PREVIEW_WIDTH}" height="{height}" '
+           f'viewBox="0 0 {PREVIEW_WIDTH} {height}" font-family="Helvetica, Arial, sans-serif">'
+           f'<title>{html.escape(title)}</title>'
+           f'<rect width="100%" height="100%" fill="#fff" stroke="#ccc"/>'
+           + "".join(rows) + "</svg>")
+    with open(target, "w", encoding="utf-8") as handle:
+        handle.write(svg)
+
+
+def _render(pdf_path, data, title, sha):
+    """Write the thumbnail of page 1 in the cache, return its file name."""
+    os.makedirs(PREVIEW_CACHE_DIR, exist_ok=True)
+    attempts = []
+    if fitz is not None:
+        attempts.append((".png", lambda tmp: _render_fitz(pdf_path, tmp)))
+    if shutil.which("pdftoppm"):
+        attempts.append((".png", lambda tmp: _render_pdftoppm(pdf_path, tmp)))
+    first_page = (pdf_utils.page_texts(data) or [""])[0]
+    attempts.append((".svg", lambda tmp: _render_svg(title, first_page, tmp)))
+
+    for extension, render in attempts:
+        name = sha + extension
+        target = os.path.join(PREVIEW_CACHE_DIR, name)
+        if os.path.exists(target):
+            return name
+        # Render to a temporary file then rename: a reader never sees a
+        # half-written image, even with several workers indexing at once
+        handle, tmp = tempfile.mkstemp(suffix=extension, dir=PREVIEW_CACHE_DIR)
+        os.close(handle)
+        try:
+            render(tmp)
+            os.replace(tmp, target)
+            return name
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    raise RuntimeError(f"cannot render a preview of {pdf_path}")
+
+
+# INDEXING
+# ========
+def index_lesson(lesson, known=None):
+    """
+    (Re)build the preview of one lesson if its PDF changed.
+    `known` is the (size, mtime_ns) stored last time, if already fetched.
+    Returns True if something was (re)computed.
+    """
+    database.ensure_schema(SCHEMA)
+    path = lesson_files.resolve_lesson_file(lesson.file_path)
+    if path is None:
+        return False
+    stat = os.stat(path)
+    if known is None:
+        with database.connection() as conn:
+            row = conn.execute(SQL_GET, (lesson.id_lesson,)).fetchone()
+        known = (row[1], row[2]) if row else None
+    if known == (stat.st_size, stat.st_mtime_ns):
+        return False
+
+    with open(path, "rb") as handle:
+        data = handle.read()
+    sha = hashlib.sha256(data).hexdigest()
+    thumbnail = _render(path, data, lesson.title, sha)
+    with database.connection() as conn:
+        conn.execute(SQL_SAVE, (lesson.id_lesson, stat.st_size, stat.st_mtime_ns,
+                                sha, pdf_utils.page_count(data), thumbnail))
+    return True
+
+
+def reindex():
+    """Incremental pass over every lesson. Returns the number rebuilt."""
+    database.ensure_schema(SCHEMA)
+    with database.connection() as conn:
+        known = {row[0]: (row[1], row[2]) for row in conn.execute(SQL_ALL_STATES)}
+    # Load the lessons first: inside the iter_lessons() connection every
+    # index_lesson() write would join one transaction held for the whole
+    # pass (write lock included). Here each lesson commits on its own.
+    lessons = list(queries.iter_lessons())
+    rebuilt = 0
+    for lesson in lessons:
+        try:
+            if index_lesson(lesson, known.get(lesson.id_lesson, ())):
+                rebuilt += 1
+        except (OSError, RuntimeError):
+            continue   # unreadable file: retried at the next pass
+    return rebuilt
+
+
+def get_preview(id_lesson, queue=True):
+    """
+    Preview row of a lesson as a dict (page_count, sha256, path of the
+    thumbnail), or None. Nothing is rendered here: with queue=True a
+    lesson that was never indexed is handed to the background indexer,
+    the preview exists a moment later.
+    """
+    database.ensure_schema(SCHEMA)
+    with database.connection() as conn:
+        row = conn.execute(SQL_GET, (id_lesson,)).fetchone()
+    if row is None:
+        if queue:
+            request_index(id_lesson)
+        return None
+    return {
+        "id_lesson": row[0],
+        "sha256": row[3],
+        "page_count": row[4],
+        "thumbnail": os.path.join(PREVIEW_CACHE_DIR, row[5]),
+    }
+
+
+# BACKGROUND JOB
+# ==============
+_indexer = None
+_pending = set()
+_pending_lock = threading.Lock()
+_wake = threading.Event()
+
+
+def request_index(id_lesson):
+    """Ask the indexer thread to index this lesson now, not at the next pass."""
+    with _pending_lock:
+        if len(_pending) >= PREVIEW_QUEUE_MAX:
+            return   # the next full pass will get it
+        _pending.add(id_lesson)
+    _wake.set()
+
+
+def _index_pending():
+    with _pending_lock:
+        ids = sorted(_pending)
+        _pending.clear()
+    for id_lesson in ids:
+        lesson = queries.lesson_by_id(id_lesson)
+        if lesson is None:
+            continue
+        try:
+            index_lesson(lesson)
+        except (OSError, RuntimeError):
+            continue
+
+
+def start_indexer(interval=PREVIEW_INTERVAL):
+    """
+    Run reindex() now and then every `interval` seconds, in a daemon thread.
+    Between two passes it indexes the lessons queued by request_index().
+    """
+    global _indexer
+    if _indexer is not None or interval <= 0:
+        return _indexer
+
+    def loop():
+        while True:
+            try:
+                reindex()
+            except Exception:
+                pass   # database busy: next pass
+            deadline = time.monotonic() + interval
+            while _wake.wait(max(0, deadline - time.monotonic())):
+                _wake.clear()
+                try:
+                    _index_pending()
+                except Exception:
+                    pass
+                if time.monotonic() >= deadline:
+                    break
+
+    _indexer = threading.Thread(target=loop, name="preview-indexer", daemon=True)
+    _indexer.start()
+    return _indexer
@@ -0,0 +1,426 @@
+"""
+REQUEST PROFILING
+=================
+Opt-in profiler for the Flask apps (PROFILING=1 in the environment).
+
+Per request it records:
+- wall time and CPU time of the worker thread (until the response body
+  is fully sent, so streamed responses are counted entirely)
+- SQL: number of statements and time spent in them (execute + fetch),
+  measured by an instrumented sqlite3.Connection class given to the
+  pool (database.set_connection_factory)
+- template rendering time (Flask signals) and password hashing time
+  (hashing.pool.observers)
+
+Statements slower than SLOW_QUERY_MS go to a rolling slow-query log
+(last SLOW_QUERY_LOG entries) with the types of their bound parameters,
+never the values (session ids, password hashes, ...).
+
+Everything is aggregated per route (the URL rule, not the raw path) and
+exposed by install(app) at:
+- /__metrics        Prometheus text: these numbers + pool + hashing
+- /__slow_queries   JSON slow-query log
+
+Both are only answered to requests from the machine itself (loopback
+address) or carrying `Authorization: Bearer <PROFILING_TOKEN>`, anybody
+else gets 403. check_access() applies the same rule to the app's other
+metrics routes (/metrics/hash, /metrics/bdd, /metrics/replicas).
+
+When PROFILING is not set, install() only adds /__metrics (pool and
+hashing metrics): no middleware, no connection class, no signal, so a
+disabled profiler costs nothing per request.
+"""
+
+import hmac
+import ipaddress
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+import database
+import hashing
+import replicas
+
+# CONFIGURATION
+# =============
+PROFILING = os.environ.get("PROFILING") == "1"
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "50"))
+SLOW_QUERY_LOG = int(os.environ.get("SLOW_QUERY_LOG", "200"))
+# Token giving access to the endpoints from another machine (empty = local only)
+PROFILING_TOKEN = os.environ.get("PROFILING_TOKEN", "")
+
+PROMETHEUS_TYPE = "text/plain; version=0.0.4"
+
+# The request being profiled in this thread (None outside a request)
+_current = threading.local()
+
+
+def _request():
+    return getattr(_current, "request", None)
+
+
+# SQL TIMING
+# ==========
+class SlowQueryLog:
+    """Rolling log of the slowest statements, with their parameter types."""
+
+    def __init__(self, threshold_ms=SLOW_QUERY_MS, size=SLOW_QUERY_LOG):
+        self.threshold = threshold_ms / 1000
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def record(self, sql, params, elapsed):
+        if elapsed < self.threshold:
+            return
+        request = _request()
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "ms": round(elapsed * 1000, 3),
+            "sql": " ".join(sql.split()),
+            "params": _param_types(params),
+            "route": request.route if request else None,
+        }
+        with self._lock:
+            self._entries.append(entry)
+            self.total += 1
+
+    def entries(self):
+        """Latest first."""
+        with self._lock:
+            return list(reversed(self._entries))
+
+
+slow_queries = SlowQueryLog()
+
+
+def _param_types(params):
+    """Types of the bound parameters: enough to tell a query shape apart,
+    nothing secret (the values may be session ids or password hashes)."""
+    if params is None:
+        return []
+    values = params.values() if isinstance(params, dict) else params
+    return [type(value).__name__ for value in values]
+
+
+def _record_sql(sql, params, elapsed, statements=1):
+    request = _request()
+    if request is not None:
+        request.sql_count += statements
+        request.sql_time += elapsed
+    slow_queries.record(sql, params, elapsed)
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor timing execute() and the fetches that follow it."""
+
+    _sql = None
+    _params = None
+    _elapsed = 0.0
+
+    def _finish(self):
+        # The time of a SELECT is only known once its rows are read
+        if self._sql is not None:
+            _record_sql(self._sql, self._params, self._elapsed)
+            self._sql = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._sql, self._params = sql, parameters
+            self._elapsed = time.perf_counter() - start
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_sql(sql, None, time.perf_counter() - start)
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._elapsed += time.perf_counter() - start
+
+    def fetchone(self):
+        return self._timed(super().fetchone)
+
+    def fetchmany(self, size=None):
+        if size is None:
+            size = self.arraysize
+        return self._timed(super().fetchmany, size)
+
+    def fetchall(self):
+        try:
+            return self._timed(super().fetchall)
+        finally:
+            self._finish()
+
+    def __next__(self):
+        try:
+            return self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """sqlite3 connection whose cursors are ProfiledCursor."""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script):
+        start = time.perf_counter()
+        try:
+            return super().executescript(script)
+        finally:
+            _record_sql(script, None, time.perf_counter() - start)
+
+
+def connection_class():
+    """Class to give to sqlite3.connect(factory=...) for apps without the pool."""
+    return ProfiledConnection if PROFILING else sqlite3.Connection
+
+
+# PER-ROUTE AGGREGATES
+# ====================
+class RequestProfile:
+    __slots__ = ("route", "sql_count", "sql_time", "template_time", "hash_time",
+                 "_template_start")
+
+    def __init__(self, route):
+        self.route = route
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.hash_time = 0.0
+        self._template_start = None
+
+
+FIELDS = ("wall", "cpu", "sql", "template", "hash")
+
+
+class RouteStats:
+    """Request count and time sums per route and status class."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def add(self, profile, status, wall, cpu):
+        key = (profile.route, status)
+        values = (wall, cpu, profile.sql_time, profile.template_time, profile.hash_time)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                entry = self._data[key] = {"count": 0, "queries": 0, "max_wall": 0.0,
+                                           **{field: 0.0 for field in FIELDS}}
+            entry["count"] += 1
+            entry["queries"] += profile.sql_count
+            entry["max_wall"] = max(entry["max_wall"], wall)
+            for field, value in zip(FIELDS, values):
+                entry[field] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {key: dict(entry) for key, entry in self._data.items()}
+
+
+routes = RouteStats()
+
+
+# WSGI MIDDLEWARE
+# ===============
+class _ProfiledBody:
+    """Response iterable closing the profile once it is sent or closed."""
+
+    def __init__(self, body, finish):
+        self._body = body
+        self._finish = finish
+
+    def __iter__(self):
+        yield from self._body
+        self._finish()
+
+    def close(self):
+        try:
+            if hasattr(self._body, "close"):
+                self._body.close()
+        finally:
+            self._finish()
+
+
+class ProfilingMiddleware:
+    """
+    Wrap a WSGI app and profile every request.
+        app.wsgi_app = ProfilingMiddleware(app.wsgi_app)
+    The route label is environ["profiling.route"] if the app sets it
+    (install() does, with the Flask URL rule), else the raw path.
+    """
+
+    def __init__(self, wsgi_app, stats=routes):
+        self.wsgi_app = wsgi_app
+        self.stats = stats
+
+    def __call__(self, environ, start_response):
+        profile = RequestProfile(environ.get("PATH_INFO", ""))
+        status = ["000"]
+        done = []
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        _current.request = profile
+
+        def profiled_start_response(status_line, headers, exc_info=None):
+            status[0] = status_line[:3]
+            return start_response(status_line, headers, exc_info)
+
+        def finish():
+            if done:
+                return
+            done.append(True)
+            if _current.request is profile:
+                _current.request = None
+            profile.route = environ.get("profiling.route", profile.route)
+            self.stats.add(profile, status[0][0] + "xx",
+                           time.perf_counter() - wall_start,
+                           time.thread_time() - cpu_start)
+
+        try:
+            body = self.wsgi_app(environ, profiled_start_response)
+        except BaseException:
+            status[0] = "500"
+            finish()
+            raise
+        return _ProfiledBody(body, finish)
+
+
+# FLASK INTEGRATION
+# =================
+def _on_template_start(sender, template, context, **extra):
+    profile = _request()
+    if profile is not None:
+        profile._template_start = time.perf_counter()
+
+
+def _on_template_done(sender, template, context, **extra):
+    profile = _request()
+    if profile is not None and profile._template_start is not None:
+        profile.template_time += time.perf_counter() - profile._template_start
+        profile._template_start = None
+
+
+def _on_hash(elapsed):
+    profile = _request()
+    if profile is not None:
+        profile.hash_time += elapsed
+
+
+def _label_route():
+    from flask import request
+    rule = request.url_rule
+    request.environ["profiling.route"] = rule.rule if rule is not None else "<unmatched>"
+
+
+def metrics_text():
+    """Per-route profile (if enabled) + connection pool + hashing pool."""
+    lines = []
+    if PROFILING:
+        data = routes.snapshot()
+        lines.append("# TYPE http_requests_total counter")
+        for (route, status), entry in sorted(data.items()):
+            lines.append(f'http_requests_total{{route="{route}",status="{status}"}} {entry["count"]}')
+        for field in FIELDS:
+            name = f"http_request_{field}_seconds"
+            lines.append(f"# TYPE {name} summary")
+            for (route, status), entry in sorted(data.items()):
+                labels = f'route="{route}",status="{status}"'
+                lines.append(f"{name}_sum{{{labels}}} {entry[field]:.6f}")
+                lines.append(f"{name}_count{{{labels}}} {entry['count']}")
+        lines.append("# TYPE http_request_wall_seconds_max gauge")
+        for (route, status), entry in sorted(data.items()):
+            lines.append(f'http_request_wall_seconds_max{{route="{route}",status="{status}"}} '
+                         f'{entry["max_wall"]:.6f}')
+        lines.append("# TYPE http_request_queries_total counter")
+        for (route, status), entry in sorted(data.items()):
+            lines.append(f'http_request_queries_total{{route="{route}",status="{status}"}} '
+                         f'{entry["queries"]}')
+        lines.append("# TYPE sql_slow_queries_total counter")
+        lines.append(f"sql_slow_queries_total {slow_queries.total}")
+    text = "\n".join(lines) + "\n" if lines else ""
+    return text + database.metrics_text() + replicas.metrics_text() + hashing.metrics_text()
+
+
+def allowed(remote_addr, authorization):
+    """Local request, or one that carries the profiling token."""
+    if PROFILING_TOKEN:
+        scheme, _, token = (authorization or "").partition(" ")
+        if scheme.lower() == "bearer" and hmac.compare_digest(
+                token.strip().encode(), PROFILING_TOKEN.encode()):
+            return True
+    try:
+        return ipaddress.ip_address(remote_addr or "").is_loopback
+    except ValueError:
+        return False
+
+
+def check_access():
+    """Abort the current Flask request with 403 unless allowed()."""
+    from flask import abort, request
+    if not allowed(request.remote_addr, request.headers.get("Authorization")):
+        abort(403)
+
+
+def install(app, enabled=None):
+    """
+    Add /__metrics and /__slow_queries to a Flask app and, if profiling
+    is enabled (PROFILING=1 or enabled=True), the middleware and hooks.
+    """
+    global PROFILING
+    if enabled is not None:
+        PROFILING = enabled
+
+    @app.route("/__metrics")
+    def profiling_metrics():
+        check_access()
+        return metrics_text(), 200, {"Content-Type": PROMETHEUS_TYPE}
+
+    @app.route("/__slow_queries")
+    def profiling_slow_queries():
+        check_access()
+        return {"enabled": PROFILING, "threshold_ms": slow_queries.threshold * 1000,
+                "queries": slow_queries.entries()}
+
+    if not PROFILING:
+        return app
+
+    from flask import before_render_template, template_rendered
+    app.wsgi_app = ProfilingMiddleware(app.wsgi_app)
+    app.before_request(_label_route)
+    before_render_template.connect(_on_template_start, app)
+    template_rendered.connect(_on_template_done, app)
+    if _on_hash not in hashing.pool.observers:
+        hashing.pool.observers.append(_on_hash)
+    database.set_connection_factory(ProfiledConnection)
+    return app
@@ -0,0 +1,184 @@
+"""
+LESSON QUERIES
+==============
+Typed read API over the Lessons table.
+
+Every query only uses bound parameters (`?`), so the SQL text is the same
+for every call: SQLite parses and plans it once and the sqlite3 statement
+cache reuses the prepared statement afterwards.
+
+The column to filter on is never pasted from user input: `select` must be
+a key of COLUMNS, which maps it to a real column name.
+
+Catalogue reads go through read_connection(): with READ_REPLICAS=1 they
+are served by a read-only snapshot a few seconds old (replicas.py).
+iter_lessons() stays on the primary, the background indexers need every
+lesson as soon as it is written.
+"""
+
+import sqlite3
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+from database import connection, read_connection
+
+
+class Lesson(NamedTuple):
+    id_lesson: int
+    id_user: int
+    title: str
+    file_path: str
+
+
+LESSON_COLUMNS = "id_lesson, id_user, title, file_path"
+
+# WHITELIST OF FILTER COLUMNS
+# ===========================
+# 'lesson' -> id_lesson, 'user' -> id_user (same keys as the old id_{select})
+COLUMNS = {
+    "lesson": "id_lesson",
+    "user": "id_user",
+}
+
+# SQL texts are built once, from the whitelist only
+SQL_BY_COLUMN = {
+    key: f"SELECT {LESSON_COLUMNS} FROM Lessons WHERE {column} = ? ORDER BY id_lesson"
+    for key, column in COLUMNS.items()
+}
+
+
+def _column_sql(select: str) -> str:
+    try:
+        return SQL_BY_COLUMN[select]
+    except KeyError:
+        raise ValueError(
+            f"unknown column {select!r}, expected one of {sorted(COLUMNS)}") from None
+
+
+def lessons_by(select: str, value: int) -> List[Lesson]:
+    """Lessons whose id_{select} equals value ('lesson' or 'user')."""
+    sql = _column_sql(select)
+    with read_connection() as conn:
+        return [Lesson(*row) for row in conn.execute(sql, (value,))]
+
+
+def lessons_by_user(id_user: int) -> List[Lesson]:
+    """Every lesson written by one user."""
+    return lessons_by("user", id_user)
+
+
+def lesson_by_id(id_lesson: int, fresh: bool = False) -> Optional[Lesson]:
+    """
+    One lesson, or None if the id does not exist.
+    fresh=True reads the primary database, never a replica snapshot.
+    """
+    with (connection() if fresh else read_connection()) as conn:
+        row = conn.execute(SQL_BY_COLUMN["lesson"], (id_lesson,)).fetchone()
+    return Lesson(*row) if row is not None else None
+
+
+# BATCH LOOKUPS
+# =============
+# An IN (...) list can hold at most SQLITE_LIMIT_VARIABLE_NUMBER parameters
+# (999 on old builds, 32766 since SQLite 3.32). Ids are sent by chunks under
+# that limit, so N ids cost ceil(N / chunk) queries instead of N.
+# Each chunk is padded (by repeating its last id) up to a power of two, so
+# only a handful of different SQL texts exist and they stay in the
+# statement cache.
+MAX_CHUNK = 512
+MIN_CHUNK = 8
+
+
+def _max_variables(conn):
+    try:
+        return conn.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+    except AttributeError:   # Python < 3.11
+        return 999
+
+
+def _bucket(n, limit):
+    size = MIN_CHUNK
+    while size < n:
+        size *= 2
+    return min(size, limit)
+
+
+def _in_sql(size):
+    return (f"SELECT {LESSON_COLUMNS} FROM Lessons "
+            f"WHERE id_lesson IN ({', '.join('?' * size)}) ORDER BY id_lesson")
+
+
+def iter_lessons_by_ids(ids: Iterable[int], chunk_size: int = MAX_CHUNK) -> Iterator[Lesson]:
+    """
+    Yield the lessons for several ids, lazily, chunk after chunk.
+    Duplicated and unknown ids are skipped; ids come out sorted.
+    """
+    unique = sorted(set(ids))
+    if not unique:
+        return
+    with read_connection() as conn:
+        limit = min(chunk_size, _max_variables(conn))
+        for start in range(0, len(unique), limit):
+            chunk = unique[start:start + limit]
+            size = _bucket(len(chunk), limit)
+            params = chunk + [chunk[-1]] * (size - len(chunk))
+            for row in conn.execute(_in_sql(size), params):
+                yield Lesson(*row)
+
+
+def lessons_by_ids(ids: Iterable[int]) -> List[Lesson]:
+    """Lessons for several ids, in id order (unknown ids are skipped)."""
+    return list(iter_lessons_by_ids(ids))
+
+
+# PAGES AND FULL SCANS
+# ====================
+SQL_PAGE = (f"SELECT {LESSON_COLUMNS} FROM Lessons "
+            f"ORDER BY id_lesson LIMIT ? OFFSET ?")
+SQL_ALL = f"SELECT {LESSON_COLUMNS} FROM Lessons ORDER BY id_lesson"
+
+
+def lessons_page(offset: int = 0, limit: int = 50) -> List[Lesson]:
+    """One page of lessons in id order."""
+    with read_connection() as conn:
+        return [Lesson(*row) for row in conn.execute(SQL_PAGE, (limit, offset))]
+
+
+def iter_lessons(batch_size: int = 256) -> Iterator[Lesson]:
+    """
+    Yield every lesson without building the whole list in memory.
+    Rows are read from SQLite `batch_size` at a time (fetchmany).
+    """
+    with connection() as conn:
+        cursor = conn.execute(SQL_ALL)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield Lesson(*row)
+
+
+# KEYSET PAGINATION
+# =================
+# "WHERE id_lesson > last id seen" walks the primary key index directly,
+# whereas OFFSET has to read and throw away every skipped row.
+SQL_AFTER = (f"SELECT {LESSON_COLUMNS} FROM Lessons "
+             f"WHERE id_lesson > ? ORDER BY id_lesson LIMIT ?")
+SQL_AFTER_BY_USER = (f"SELECT {LESSON_COLUMNS} FROM Lessons "
+                     f"WHERE id_user = ? AND id_lesson > ? ORDER BY id_lesson LIMIT ?")
+
+
+def iter_lessons_after(after: int = 0, limit: int = 50,
+                       id_user: Optional[int] = None) -> Iterator[Lesson]:
+    """
+    Yield at most `limit` lessons with id_lesson > after, in id order,
+    optionally only those of one user. Pass the last id seen as `after`
+    to get the next page.
+    """
+    if id_user is None:
+        sql, params = SQL_AFTER, (after, limit)
+    else:
+        sql, params = SQL_AFTER_BY_USER, (id_user, after, limit)
+    with read_connection() as conn:
+        for row in conn.execute(sql, params):
+            yield Lesson(*row)
@@ -0,0 +1,307 @@
+"""
+READ REPLICAS
+=============
+Read-only snapshot copies of BDD.db for the catalogue and search reads,
+so that a long import or a burst of writes on the primary does not slow
+them down.
+
+- refresh() copies the primary with the SQLite backup API into a new
+  file of REPLICA_DIR, switched to the rollback journal so it can be
+  opened with `mode=ro&immutable=1`: SQLite then takes no lock at all
+  and never looks at the primary or its WAL
+- the copy is skipped when the tables read from the snapshots (Lessons,
+  search index) did not change since the last one: triggers bump a
+  counter in Cache_generation. Sessions, users and favorites are written
+  all the time but read on the primary, they never cause a copy
+- database.read_connection() (queries.py, search.py) is routed to the
+  pool of the newest snapshot; writes, sessions and favorites keep
+  using database.connection() on the primary
+- staleness = age of the data of the snapshot. Past REPLICA_MAX_STALENESS
+  (refresh failing or too slow) reads go back to the primary: a reader
+  never sees data older than that bound
+- a snapshot is deleted two generations later, once no reader can still
+  hold one of its connections
+
+Enabled with READ_REPLICAS=1, refreshed every REPLICA_INTERVAL seconds
+(keep it well under REPLICA_MAX_STALENESS). Off by default: in WAL mode
+the writer does not block the readers of the primary, and
+bench/bench_replicas.py shows no gain for the snapshots on one machine
+(reads/s slightly lower). Turn it on only where a measurement says so.
+"""
+
+import glob
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import database
+import search
+
+# CONFIGURATION
+# =============
+READ_REPLICAS = os.environ.get("READ_REPLICAS") == "1"
+REPLICA_DIR = os.environ.get(
+    "REPLICA_DIR", os.path.join(database.BASE_DIR, "cache", "replicas"))
+REPLICA_INTERVAL = float(os.environ.get("REPLICA_INTERVAL", "5"))
+REPLICA_MAX_STALENESS = float(os.environ.get("REPLICA_MAX_STALENESS", "30"))
+
+# Pragmas of the snapshot connections: nothing to write, no WAL, no lock
+READ_PRAGMAS = (
+    ("query_only", "ON"),
+    ("temp_store", "MEMORY"),
+    ("cache_size", "-16000"),
+    ("mmap_size", "268435456"),
+)
+
+
+# Counter of the writes that make a snapshot out of date. Lessons_fts
+# is a virtual table (no trigger): search.py writes Lessons_fts_state in
+# the same transaction as every change to it.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS Cache_generation (
+    name    TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO Cache_generation (name, version) VALUES ('Replicas', 0);
+""" + "".join(f"""
+CREATE TRIGGER IF NOT EXISTS {table}_replica_{event.lower()} AFTER {event} ON {table}
+BEGIN
+    UPDATE Cache_generation SET version = version + 1 WHERE name = 'Replicas';
+END;
+""" for table in ("Lessons", "Lessons_fts_state") for event in ("INSERT", "UPDATE", "DELETE"))
+
+SQL_VERSION = "SELECT version FROM Cache_generation WHERE name = 'Replicas'"
+# For writers that bypass the triggers (importer.py drops them during a load)
+SQL_BUMP = "UPDATE Cache_generation SET version = version + 1 WHERE name = 'Replicas'"
+
+
+def snapshot_uri(path):
+    return Path(os.path.abspath(path)).as_uri() + "?mode=ro&immutable=1"
+
+
+class Snapshot:
+    """One snapshot file and the pool of read-only connections on it."""
+
+    def __init__(self, path, generation, taken_at):
+        self.path = path
+        self.generation = generation
+        self.taken_at = taken_at   # time.monotonic() when the copy started
+        self.pool = database.ConnectionPool(
+            snapshot_uri(path), database.POOL_SIZE, database.POOL_TIMEOUT,
+            uri=True, pragmas=READ_PRAGMAS)
+
+    def close(self):
+        self.pool.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass   # still open somewhere (Windows): removed by a later refresh
+
+
+class ReplicaSet:
+    """
+    The current snapshot of the primary database, refreshed by refresh().
+    pool() is the function given to database.set_read_pool().
+    """
+
+    def __init__(self, directory=REPLICA_DIR, max_staleness=REPLICA_MAX_STALENESS):
+        self.directory = directory
+        self.max_staleness = max_staleness
+        self.current = None
+        self._retired = []
+        self._source = None      # (path, connection) kept open between refreshes
+        self._version = None
+        self._generation = 0
+        self._lock = threading.Lock()        # one refresh at a time
+        self._count_lock = threading.Lock()
+        self._counters = {
+            "refreshes": 0,
+            "unchanged": 0,
+            "failures": 0,
+            "copy_seconds": 0.0,
+            "replica_reads": 0,
+            "primary_reads": 0,
+        }
+        self.last_copy_seconds = 0.0
+
+    def _count(self, name, value=1):
+        with self._count_lock:
+            self._counters[name] += value
+
+    def _source_connection(self):
+        path = database.DB_PATH
+        if self._source is None or self._source[0] != path:
+            if self._source is not None:
+                self._source[1].close()
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute("PRAGMA busy_timeout = 5000")
+            self._source = (path, conn)
+            self._version = None
+        return self._source[1]
+
+    # REFRESH
+    # =======
+    def refresh(self):
+        """Take a new snapshot if the primary changed. Returns True if copied."""
+        database.ensure_schema(search.SCHEMA)   # Lessons_fts_state, for the triggers
+        database.ensure_schema(SCHEMA)
+        with self._lock:
+            try:
+                return self._refresh()
+            except sqlite3.Error:
+                self._count("failures")
+                raise
+
+    def _refresh(self):
+        source = self._source_connection()
+        start = time.monotonic()
+        # Read before the copy: a write that lands during it only makes the
+        # next refresh copy again
+        version = source.execute(SQL_VERSION).fetchone()[0]
+        if self.current is not None and version == self._version:
+            # Nothing the snapshots serve changed since the copy: still exact
+            self.current.taken_at = start
+            self._count("unchanged")
+            return False
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._generation += 1
+        path = os.path.join(self.directory, f"BDD-{os.getpid()}-{self._generation}.db")
+        target = sqlite3.connect(path)
+        try:
+            # One step: the copy is a consistent state of the primary (in WAL
+            # mode the writers are not blocked while it runs)
+            source.backup(target)
+            target.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            target.close()
+        self.last_copy_seconds = time.monotonic() - start
+        self._count("refreshes")
+        self._count("copy_seconds", self.last_copy_seconds)
+
+        self._version = version
+        previous, self.current = self.current, Snapshot(path, self._generation, start)
+        if previous is not None:
+            self._retired.append(previous)
+        # Keep the previous snapshot open: a reader may have picked its pool
+        # just before the switch
+        while len(self._retired) > 1:
+            self._retired.pop(0).close()
+        self._remove_leftovers()
+        return True
+
+    def _remove_leftovers(self):
+        keep = {os.path.abspath(s.path) for s in [self.current, *self._retired] if s}
+        for path in glob.glob(os.path.join(self.directory, f"BDD-{os.getpid()}-*.db")):
+            if os.path.abspath(path) not in keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    # READS
+    # =====
+    def staleness(self):
+        """Seconds since the data of the current snapshot was read (None: no snapshot)."""
+        current = self.current
+        return None if current is None else time.monotonic() - current.taken_at
+
+    def pool(self):
+        """Pool of the current snapshot, or None when missing or too stale."""
+        current = self.current
+        if current is None or time.monotonic() - current.taken_at > self.max_staleness:
+            self._count("primary_reads")
+            return None
+        self._count("replica_reads")
+        return current.pool
+
+    def close(self):
+        with self._lock:
+            for snapshot in [*self._retired, self.current]:
+                if snapshot is not None:
+                    snapshot.close()
+            self._retired, self.current = [], None
+            if self._source is not None:
+                self._source[1].close()
+                self._source = None
+
+    # METRICS
+    # =======
+    def stats(self):
+        with self._count_lock:
+            data = dict(self._counters)
+        staleness = self.staleness()
+        data["staleness_seconds"] = -1 if staleness is None else staleness
+        data["max_staleness_seconds"] = self.max_staleness
+        data["last_copy_seconds"] = self.last_copy_seconds
+        data["generation"] = self.current.generation if self.current else 0
+        return data
+
+    def metrics_text(self, prefix="bdd_replica"):
+        """Counters and staleness in Prometheus text format."""
+        data = self.stats()
+        lines = []
+        for name in ("refreshes", "unchanged", "failures", "replica_reads", "primary_reads"):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {data[name]}")
+        lines.append(f"# TYPE {prefix}_copy_seconds_total counter")
+        lines.append(f"{prefix}_copy_seconds_total {data['copy_seconds']:.6f}")
+        for name in ("staleness_seconds", "max_staleness_seconds", "last_copy_seconds"):
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {data[name]:.3f}")
+        lines.append(f"# TYPE {prefix}_generation gauge")
+        lines.append(f"{prefix}_generation {data['generation']}")
+        return "\n".join(lines) + "\n"
+
+
+# MODULE-LEVEL REPLICAS
+# =====================
+replicas = None
+_refresher = None
+
+
+def start(interval=REPLICA_INTERVAL, enabled=None):
+    """
+    Take a first snapshot, route database.read_connection() to it and
+    refresh it every `interval` seconds in a daemon thread.
+    Does nothing unless enabled (default: READ_REPLICAS). Returns the ReplicaSet.
+    """
+    global replicas, _refresher
+    if not (READ_REPLICAS if enabled is None else enabled):
+        return None
+    if replicas is not None:
+        return replicas
+    replica_set = replicas = ReplicaSet()
+    replica_set.refresh()
+    database.set_read_pool(replica_set.pool)
+
+    def loop():
+        while replicas is replica_set:
+            time.sleep(interval)
+            try:
+                replica_set.refresh()
+            except (sqlite3.Error, OSError):
+                pass   # primary busy / disk full: reads fall back past the bound
+
+    if interval > 0:
+        _refresher = threading.Thread(target=loop, name="replica-refresh", daemon=True)
+        _refresher.start()
+    return replicas
+
+
+def stop():
+    """Send the reads back to the primary and delete the snapshots."""
+    global replicas, _refresher
+    current, replicas, _refresher = replicas, None, None
+    database.set_read_pool(None)
+    if current is not None:
+        current.close()
+
+
+def metrics_text():
+    if replicas is None:
+        return "# TYPE bdd_replica_enabled gauge\nbdd_replica_enabled 0\n"
+    return ("# TYPE bdd_replica_enabled gauge\nbdd_replica_enabled 1\n"
+            + replicas.metrics_text())
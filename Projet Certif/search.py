@@ -0,0 +1,178 @@
+"""
+FULL-TEXT SEARCH
+================
+SQLite FTS5 index over the lesson titles and the text of their PDFs.
+
+- Lessons_fts (rowid = id_lesson) holds title + body text
+- Lessons_fts_state remembers, per lesson, the title, size and mtime of
+  the PDF that were indexed: update_index() only re-extracts lessons that
+  are new or whose file / title changed, it never rebuilds everything
+- triggers on Lessons remove deleted lessons from the index and mark
+  edited ones for the next pass
+- search() ranks with BM25 (title weighs more than body), returns a
+  highlighted snippet and matches word prefixes ("fonc" -> "fonctions");
+  it reads through database.read_connection() (replica snapshot if enabled)
+"""
+
+import html
+import os
+import re
+import threading
+import time
+
+import database
+import lesson_files
+import pdf_utils
+import queries
+
+SEARCH_INTERVAL = float(os.environ.get("SEARCH_INTERVAL", "300"))
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS Lessons_fts USING fts5 (
+    title, body,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3 4'
+);
+
+CREATE TABLE IF NOT EXISTS Lessons_fts_state (
+    id_lesson INTEGER PRIMARY KEY REFERENCES Lessons (id_lesson) ON DELETE CASCADE,
+    title     TEXT NOT NULL,
+    size      INTEGER NOT NULL,
+    mtime_ns  INTEGER NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS Lessons_fts_delete AFTER DELETE ON Lessons
+BEGIN
+    DELETE FROM Lessons_fts WHERE rowid = OLD.id_lesson;
+END;
+
+CREATE TRIGGER IF NOT EXISTS Lessons_fts_update AFTER UPDATE OF title, file_path ON Lessons
+BEGIN
+    DELETE FROM Lessons_fts_state WHERE id_lesson = OLD.id_lesson;
+END;
+"""
+
+SQL_STATES = "SELECT id_lesson, title, size, mtime_ns FROM Lessons_fts_state"
+SQL_STATE = "SELECT id_lesson, title, size, mtime_ns FROM Lessons_fts_state WHERE id_lesson = ?"
+SQL_FTS_DELETE = "DELETE FROM Lessons_fts WHERE rowid = ?"
+SQL_FTS_INSERT = "INSERT INTO Lessons_fts (rowid, title, body) VALUES (?, ?, ?)"
+SQL_STATE_SAVE = ("INSERT OR REPLACE INTO Lessons_fts_state (id_lesson, title, size, mtime_ns) "
+                  "VALUES (?, ?, ?, ?)")
+SQL_SEARCH = (
+    "SELECT rowid, title, "
+    "snippet(Lessons_fts, -1, char(2), char(3), '…', 16), "
+    f"bm25(Lessons_fts, {TITLE_WEIGHT}, {BODY_WEIGHT}) AS rank "
+    "FROM Lessons_fts WHERE Lessons_fts MATCH ? ORDER BY rank LIMIT ?"
+)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+# INDEXING
+# ========
+def _file_state(lesson):
+    path = lesson_files.resolve_lesson_file(lesson.file_path)
+    if path is None:
+        return None, 0, 0
+    stat = os.stat(path)
+    return path, stat.st_size, stat.st_mtime_ns
+
+
+def index_lesson(lesson, known=None):
+    """
+    Put one lesson in the index if it is new or changed.
+    Call it right after adding or editing a lesson to make it searchable
+    at once. Returns True if the lesson was (re)indexed.
+    """
+    database.ensure_schema(SCHEMA)
+    path, size, mtime_ns = _file_state(lesson)
+    if known is None:
+        with database.connection() as conn:
+            row = conn.execute(SQL_STATE, (lesson.id_lesson,)).fetchone()
+        known = tuple(row[1:]) if row else ()
+    if known == (lesson.title, size, mtime_ns):
+        return False
+
+    body = ""
+    if path is not None:
+        with open(path, "rb") as handle:
+            body = "\n".join(pdf_utils.page_texts(handle.read()))
+    with database.connection() as conn:
+        conn.execute(SQL_FTS_DELETE, (lesson.id_lesson,))
+        conn.execute(SQL_FTS_INSERT, (lesson.id_lesson, lesson.title, body))
+        conn.execute(SQL_STATE_SAVE, (lesson.id_lesson, lesson.title, size, mtime_ns))
+    return True
+
+
+def update_index():
+    """Incremental pass over every lesson. Returns the number (re)indexed."""
+    database.ensure_schema(SCHEMA)
+    with database.connection() as conn:
+        known = {row[0]: tuple(row[1:]) for row in conn.execute(SQL_STATES)}
+    # Load the lessons first: inside the iter_lessons() connection every
+    # index_lesson() write would join one transaction held for the whole
+    # pass (write lock included). Here each lesson commits on its own.
+    lessons = list(queries.iter_lessons())
+    updated = 0
+    for lesson in lessons:
+        try:
+            if index_lesson(lesson, known.get(lesson.id_lesson, ())):
+                updated += 1
+        except OSError:
+            continue   # unreadable file: retried at the next pass
+    return updated
+
+
+_indexer = None
+
+
+def start_indexer(interval=SEARCH_INTERVAL):
+    """Run update_index() now and then every `interval` seconds, in a daemon thread."""
+    global _indexer
+    if _indexer is not None or interval <= 0:
+        return _indexer
+
+    def loop():
+        while True:
+            try:
+                update_index()
+            except Exception:
+                pass   # database busy: next pass
+            time.sleep(interval)
+
+    _indexer = threading.Thread(target=loop, name="search-indexer", daemon=True)
+    _indexer.start()
+    return _indexer
+
+
+# SEARCHING
+# =========
+def build_match(text):
+    """
+    Turn free text into an FTS5 query: every word must match, as a prefix.
+    Words are quoted, so FTS5 operators typed by the user are just words.
+    """
+    words = _WORD.findall(text)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _highlight(snippet):
+    # Markers are control characters so the text can be escaped safely
+    return html.escape(snippet or "").replace("\x02", "<mark>").replace("\x03", "</mark>")
+
+
+def search(text, limit=20):
+    """Best lessons for a query: [{id_lesson, title, snippet, score}, ...]."""
+    match = build_match(text)
+    if not match:
+        return []
+    database.ensure_schema(SCHEMA)
+    with database.read_connection() as conn:
+        rows = conn.execute(SQL_SEARCH, (match, limit)).fetchall()
+    return [
+        {"id_lesson": row[0], "title": row[1], "snippet": _highlight(row[2]),
+         "score": round(-row[3], 4)}
+        for row in rows
+    ]
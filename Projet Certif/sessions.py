@@ -0,0 +1,330 @@
+"""
+SERVER-SIDE SESSIONS
+====================
+Flask's default session is a signed cookie: every request decodes and
+HMAC-checks it, and logout cannot revoke anything (a copied cookie stays
+valid). With this backend the cookie only holds an opaque random id, and
+the session data lives on the server:
+
+- Sessions table in BDD.db (shared by every worker)
+- in front of it, an in-process LRU with TTL, so most requests find their
+  session in memory (O(1) dict lookup, no query)
+- deleting a live session (logout) logs its id in Sessions_deleted; each
+  worker reads the new ids (at most every SESSION_CACHE_POLL seconds) and
+  drops only those sessions from its LRU
+- revoke_user(username) deletes every session of a user and bumps a
+  generation counter: each worker empties its whole LRU when it sees it
+  move
+- regenerate() gives a session a new id on login (session fixation)
+- a background thread deletes expired rows every SESSION_SWEEP seconds
+
+Install it with sessions.install(app); SESSION_BACKEND=cookie keeps
+Flask's cookie sessions.
+"""
+
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+import database
+
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "server")
+SESSION_TTL = float(os.environ.get("SESSION_TTL", str(7 * 24 * 3600)))
+SESSION_CACHE_SIZE = int(os.environ.get("SESSION_CACHE_SIZE", "10000"))
+SESSION_CACHE_POLL = float(os.environ.get("SESSION_CACHE_POLL", "1"))
+SESSION_SWEEP = float(os.environ.get("SESSION_SWEEP", "300"))
+# Cookie attributes, shared by the Flask app (install()) and asgi_app.py.
+# SESSION_COOKIE_SECURE=1 once the site is served over HTTPS only.
+SESSION_COOKIE_SAMESITE = os.environ.get("SESSION_COOKIE_SAMESITE", "Lax")
+SESSION_COOKIE_SECURE = os.environ.get("SESSION_COOKIE_SECURE") == "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS Sessions (
+    id       TEXT PRIMARY KEY,
+    username TEXT,
+    data     TEXT NOT NULL,
+    expires  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS Sessions_username ON Sessions (username);
+CREATE INDEX IF NOT EXISTS Sessions_expires ON Sessions (expires);
+
+CREATE TABLE IF NOT EXISTS Cache_generation (
+    name    TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO Cache_generation (name, version) VALUES ('Sessions', 0);
+
+-- Only deletions of live sessions matter to the other workers, the sweep
+-- of expired rows is not logged. AUTOINCREMENT: a seq is never reused, so
+-- a worker can remember the last one it has seen.
+DROP TRIGGER IF EXISTS Sessions_cache_delete;
+CREATE TABLE IF NOT EXISTS Sessions_deleted (
+    seq     INTEGER PRIMARY KEY AUTOINCREMENT,
+    id      TEXT NOT NULL,
+    deleted REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS Sessions_deleted_at ON Sessions_deleted (deleted);
+CREATE TRIGGER IF NOT EXISTS Sessions_deleted_log AFTER DELETE ON Sessions
+WHEN OLD.expires > CAST(strftime('%s', 'now') AS REAL)
+BEGIN
+    INSERT INTO Sessions_deleted (id, deleted)
+    VALUES (OLD.id, CAST(strftime('%s', 'now') AS REAL));
+END;
+"""
+
+SQL_GET = "SELECT username, data, expires FROM Sessions WHERE id = ? AND expires > ?"
+SQL_SAVE = ("INSERT INTO Sessions (id, username, data, expires) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET username = excluded.username, "
+            "data = excluded.data, expires = excluded.expires")
+SQL_DELETE = "DELETE FROM Sessions WHERE id = ?"
+SQL_DELETE_USER = "DELETE FROM Sessions WHERE username = ?"
+SQL_SWEEP = "DELETE FROM Sessions WHERE expires <= ?"
+SQL_GENERATION = "SELECT version FROM Cache_generation WHERE name = 'Sessions'"
+SQL_BUMP_GENERATION = "UPDATE Cache_generation SET version = version + 1 WHERE name = 'Sessions'"
+SQL_DELETED = "SELECT seq, id FROM Sessions_deleted WHERE seq > ? ORDER BY seq"
+SQL_DELETED_LAST = "SELECT MAX(seq) FROM Sessions_deleted"
+SQL_DELETED_PRUNE = "DELETE FROM Sessions_deleted WHERE deleted <= ?"
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session dict that remembers its id and whether it was changed."""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.replaced = None   # old id after regenerate(), deleted on save
+
+    def regenerate(self):
+        """
+        New id for the same data. Called on login: an id planted in the
+        browser before (session fixation) never gets the privileges.
+        """
+        if not self.new:
+            self.replaced = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.new = True
+        self.modified = True
+
+
+class SessionStore:
+    """SQLite table + LRU front with TTL."""
+
+    def __init__(self, ttl=SESSION_TTL, size=SESSION_CACHE_SIZE,
+                 poll=SESSION_CACHE_POLL, sweep=SESSION_SWEEP):
+        self.ttl = ttl
+        self.size = size
+        self.poll = poll
+        self.sweep_interval = sweep
+        # Sessions_deleted rows are kept this long: a worker that did not
+        # poll for longer may have missed some and empties its whole LRU
+        self.keep = max(sweep, 60.0)
+        self._lru = OrderedDict()   # sid -> (data dict, username, expires)
+        self._lock = threading.Lock()
+        # One poll at a time; guards the fields below
+        self._poll_lock = threading.Lock()
+        self._generation = None
+        self._deleted_seq = None
+        self._polled = 0.0
+        self._next_poll = 0.0
+        self._sweeper = None
+        self.hits = 0
+        self.misses = 0
+
+    def _ready(self):
+        database.ensure_schema(SCHEMA)
+        if self._sweeper is None and self.sweep_interval > 0:
+            with self._lock:
+                if self._sweeper is None:
+                    self._sweeper = threading.Thread(
+                        target=self._sweep_loop, name="session-sweeper", daemon=True)
+                    self._sweeper.start()
+
+    def _check_generation(self, now):
+        if now < self._next_poll:
+            return
+        with self._poll_lock:
+            if now < self._next_poll:
+                return   # polled by another thread while this one waited
+            wall = time.time()
+            deleted = None
+            with database.connection() as conn:
+                row = conn.execute(SQL_GENERATION).fetchone()
+                if self._deleted_seq is not None and wall - self._polled < self.keep:
+                    deleted = conn.execute(SQL_DELETED, (self._deleted_seq,)).fetchall()
+                else:
+                    last = conn.execute(SQL_DELETED_LAST).fetchone()[0]
+            generation = row[0] if row else 0
+            with self._lock:
+                if deleted is None or generation != self._generation:
+                    # first poll, log entries possibly pruned, or revoke_user
+                    self._lru.clear()
+                else:
+                    for _, sid in deleted:
+                        self._lru.pop(sid, None)
+            self._generation = generation
+            if deleted is None:
+                self._deleted_seq = last or 0
+            elif deleted:
+                self._deleted_seq = deleted[-1][0]
+            self._polled = wall
+            # Last: a thread that sees the new _next_poll and skips the poll
+            # reads an LRU already cleaned by this one
+            self._next_poll = now + self.poll
+
+    def _remember(self, sid, data, username, expires):
+        with self._lock:
+            self._lru[sid] = (data, username, expires)
+            self._lru.move_to_end(sid)
+            while len(self._lru) > self.size:
+                self._lru.popitem(last=False)
+
+    # READ / WRITE
+    # ============
+    def load(self, sid):
+        """Session data for an id, or None if unknown / expired / revoked."""
+        self._ready()
+        now = time.time()
+        self._check_generation(time.monotonic())
+        with self._lock:
+            entry = self._lru.get(sid)
+            if entry is not None:
+                if entry[2] > now:
+                    self._lru.move_to_end(sid)
+                    self.hits += 1
+                    return dict(entry[0])
+                del self._lru[sid]
+            self.misses += 1
+        with database.connection() as conn:
+            row = conn.execute(SQL_GET, (sid, now)).fetchone()
+        if row is None:
+            return None
+        data = json.loads(row[1])
+        self._remember(sid, data, row[0], row[2])
+        return dict(data)
+
+    def save(self, sid, data):
+        self._ready()
+        expires = time.time() + self.ttl
+        username = data.get("username")
+        with database.connection() as conn:
+            conn.execute(SQL_SAVE, (sid, username, json.dumps(data), expires))
+        self._remember(sid, dict(data), username, expires)
+        return expires
+
+    def delete(self, sid):
+        self._ready()
+        with self._lock:
+            self._lru.pop(sid, None)
+        with database.connection() as conn:
+            conn.execute(SQL_DELETE, (sid,))
+
+    def revoke_user(self, username):
+        """Delete every session of a user, in every worker. Returns the count."""
+        self._ready()
+        with self._lock:
+            for sid in [sid for sid, entry in self._lru.items() if entry[1] == username]:
+                del self._lru[sid]
+        with database.connection() as conn:
+            count = conn.execute(SQL_DELETE_USER, (username,)).rowcount
+            conn.execute(SQL_BUMP_GENERATION)
+        return count
+
+    # EXPIRY
+    # ======
+    def sweep(self):
+        """Delete expired sessions (table and LRU). Returns the row count."""
+        now = time.time()
+        with self._lock:
+            for sid in [sid for sid, entry in self._lru.items() if entry[2] <= now]:
+                del self._lru[sid]
+        with database.connection() as conn:
+            conn.execute(SQL_DELETED_PRUNE, (now - self.keep,))
+            return conn.execute(SQL_SWEEP, (now,)).rowcount
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception:
+                pass   # database busy or closed: retry at the next round
+
+
+class ServerSessionInterface(SessionInterface):
+    """Flask glue: the cookie carries only the session id."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data = self.store.load(sid)
+            if data is not None:
+                return ServerSession(data, sid=sid)
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.replaced is not None:
+            self.store.delete(session.replaced)
+            session.replaced = None
+        if session or not session.new:
+            # the response depends on the session cookie: no shared caching
+            response.vary.add("Cookie")
+        if not session:
+            # Emptied session (logout): forget it on the server too
+            if not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(
+                    name, domain=domain, path=path,
+                    secure=self.get_cookie_secure(app),
+                    samesite=self.get_cookie_samesite(app),
+                    httponly=self.get_cookie_httponly(app),
+                )
+            return
+        if not session.modified:
+            return
+        self.store.save(session.sid, dict(session))
+        response.set_cookie(
+            name, session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain, path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+store = SessionStore()
+
+
+def install(app, backend=None):
+    """Use the server-side backend for app (unless backend is 'cookie')."""
+    app.config["SESSION_COOKIE_SAMESITE"] = SESSION_COOKIE_SAMESITE
+    app.config["SESSION_COOKIE_SECURE"] = SESSION_COOKIE_SECURE
+    if (backend or SESSION_BACKEND) == "server":
+        app.session_interface = ServerSessionInterface(store)
+    return app
+
+
+def revoke_user(username):
+    return store.revoke_user(username)
+
+
+def regenerate(session):
+    """New session id (login). Flask's cookie sessions have no id to rotate."""
+    if isinstance(session, ServerSession):
+        session.regenerate()
@@ -1,5 +1,6 @@
 # from flask import Flask, render_template,send_file
-import sqlite3
+from database import connection
+from queries import lesson_by_id, lessons_by_ids
 
 # app = Flask(__name__)
 
@@ -23,30 +24,23 @@ import sqlite3
 #     return render_template("test.html", lignes=data)
 
 def compter_id() :
-    conn = sqlite3.connect("BDD/BDD.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT id_lesson FROM Lessons")
-    donnees = [x[0] for x in cursor.fetchall()]
-    conn.close()
+    with connection() as conn:
+        cursor = conn.execute("SELECT id_lesson FROM Lessons")
+        donnees = [x[0] for x in cursor.fetchall()]
     return donnees
 
 def lire_db(id) :
-    conn = sqlite3.connect("BDD/BDD.db")
-    cursor = conn.cursor()
-    cursor.execute(f"SELECT file_path FROM Lessons WHERE id_lesson = {id}")
-    donnees = [x[0] for x in cursor.fetchall()]
-    conn.close()
-    return donnees
+    lesson = lesson_by_id(id)
+    return [lesson.file_path] if lesson else []
 
-for id in compter_id() :
-    print(lire_db(id))
+# Une seule requête (par paquet d'ids) au lieu d'un lire_db() par id
+for lesson in lessons_by_ids(compter_id()) :
+    print([lesson.file_path])
 
 def lire_db_test() :
-    conn = sqlite3.connect("BDD/BDD.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT file_path FROM Lessons")
-    donnees = [x[0] for x in cursor.fetchall()]
-    conn.close()
+    with connection() as conn:
+        cursor = conn.execute("SELECT file_path FROM Lessons")
+        donnees = [x[0] for x in cursor.fetchall()]
     return donnees
 
 print(lire_db_test())
@@ -0,0 +1,241 @@
+"""
+USER STORE
+==========
+Accounts live in the Users table of BDD.db (not in a Python dict), so they
+survive restarts and every gunicorn worker sees the same users.
+
+Login checks go through a small in-process cache username -> password hash:
+- only existing users are cached (an unknown username always asks the
+  database, so a user registered by another worker is found at once)
+- entries expire after USER_CACHE_TTL seconds
+- a write in this process drops the entry immediately
+- a write in another process bumps a generation counter (triggers on
+  Users, see SCHEMA); each worker reads that counter at most every
+  USER_CACHE_POLL seconds and empties its cache when it moved
+
+So a steady stream of logins costs about one tiny query per second and
+per worker, instead of one query per login.
+
+authenticate() checks a password: hashes go through the hashing pool,
+plaintext passwords left by the first version of the app are compared
+in constant time and replaced by a hash at the first good login.
+authenticate_async() does the same for asyncio code (asgi_app.py).
+"""
+
+import asyncio
+import hmac
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import database
+import hashing
+
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", "60"))
+USER_CACHE_POLL = float(os.environ.get("USER_CACHE_POLL", "1"))
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "10000"))
+
+# Stored values starting like this are werkzeug hashes, anything else is
+# a legacy plaintext password
+HASH_PREFIXES = ("pbkdf2:", "scrypt:")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS Cache_generation (
+    name    TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO Cache_generation (name, version) VALUES ('Users', 0);
+
+CREATE TRIGGER IF NOT EXISTS Users_cache_update AFTER UPDATE OF username, pwd ON Users
+BEGIN
+    UPDATE Cache_generation SET version = version + 1 WHERE name = 'Users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS Users_cache_delete AFTER DELETE ON Users
+BEGIN
+    UPDATE Cache_generation SET version = version + 1 WHERE name = 'Users';
+END;
+"""
+
+SQL_HASH = "SELECT pwd FROM Users WHERE username = ?"
+SQL_ID = "SELECT id_user FROM Users WHERE username = ?"
+SQL_GENERATION = "SELECT version FROM Cache_generation WHERE name = 'Users'"
+SQL_INSERT = ("INSERT INTO Users (username, pwd, birth_date, tel, email) "
+              "VALUES (?, ?, ?, ?, ?)")
+SQL_UPDATE_HASH = "UPDATE Users SET pwd = ? WHERE username = ?"
+
+
+class UserExists(Exception):
+    """Username, phone number or email already used by another account."""
+
+
+class HashCache:
+    """Thread-safe LRU username -> (hash, expiry) with TTL and generation check."""
+
+    def __init__(self, ttl=USER_CACHE_TTL, poll=USER_CACHE_POLL, size=USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.poll = poll
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._next_poll = 0.0
+
+    def _check_generation(self, now):
+        if now < self._next_poll:
+            return
+        self._next_poll = now + self.poll
+        with database.connection() as conn:
+            row = conn.execute(SQL_GENERATION).fetchone()
+        generation = row[0] if row else 0
+        if generation != self._generation:
+            with self._lock:
+                self._data.clear()
+            self._generation = generation
+
+    def get(self, username):
+        now = time.monotonic()
+        self._check_generation(now)
+        with self._lock:
+            entry = self._data.get(username)
+            if entry is None:
+                return None
+            if entry[1] < now:
+                del self._data[username]
+                return None
+            self._data.move_to_end(username)
+            return entry[0]
+
+    def put(self, username, pwd_hash):
+        with self._lock:
+            self._data[username] = (pwd_hash, time.monotonic() + self.ttl)
+            self._data.move_to_end(username)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, username=None):
+        with self._lock:
+            if username is None:
+                self._data.clear()
+            else:
+                self._data.pop(username, None)
+
+
+_cache = HashCache()
+
+
+def _ensure_schema():
+    database.ensure_schema(SCHEMA)
+
+
+def get_password_hash(username):
+    """Stored hash of a user, or None if the username does not exist."""
+    _ensure_schema()
+    pwd_hash = _cache.get(username)
+    if pwd_hash is not None:
+        return pwd_hash
+    with database.connection() as conn:
+        row = conn.execute(SQL_HASH, (username,)).fetchone()
+    if row is None:
+        return None
+    _cache.put(username, row[0])
+    return row[0]
+
+
+def get_user_id(username):
+    """id_user of a username, or None."""
+    with database.connection() as conn:
+        row = conn.execute(SQL_ID, (username,)).fetchone()
+    return row[0] if row else None
+
+
+def create_user(username, pwd_hash, birth_date, tel, email):
+    """
+    Insert a new account and return its id_user.
+    Raises UserExists if username, tel or email is already taken.
+    """
+    _ensure_schema()
+    try:
+        with database.connection() as conn:
+            cursor = conn.execute(SQL_INSERT, (username, pwd_hash, birth_date, tel, email))
+            id_user = cursor.lastrowid
+    except sqlite3.IntegrityError as error:
+        raise UserExists(str(error)) from None
+    _cache.invalidate(username)
+    return id_user
+
+
+def update_password_hash(username, pwd_hash):
+    """Replace the stored hash (password change or rehash)."""
+    _ensure_schema()
+    with database.connection() as conn:
+        conn.execute(SQL_UPDATE_HASH, (pwd_hash, username))
+    _cache.put(username, pwd_hash)
+
+
+def invalidate(username=None):
+    """Drop one username (or everything) from this worker's cache."""
+    _cache.invalidate(username)
+
+
+def is_hashed(pwd):
+    """True for a werkzeug hash ("method$salt$hash"), False for plaintext."""
+    return pwd.startswith(HASH_PREFIXES) and pwd.count("$") == 2
+
+
+def authenticate(username, password):
+    """
+    True if `password` is the password of `username`.
+    A plaintext or old-cost stored password is replaced by a new hash.
+    Raises hashing.HashingBusy if the hashing pool is full.
+    """
+    stored = get_password_hash(username)
+    if stored is None:
+        return False
+    if is_hashed(stored):
+        if not hashing.verify_password(stored, password):
+            return False
+    elif not _plaintext_matches(stored, password):
+        return False
+    if _needs_upgrade(stored):
+        try:
+            update_password_hash(username, hashing.hash_password(password))
+        except hashing.HashingBusy:
+            pass   # not urgent, it will be done at the next login
+    return True
+
+
+async def authenticate_async(username, password, run=None):
+    """
+    authenticate() for asyncio code: hashes are awaited on the hashing
+    pool, the database calls go through `run(func, *args)` (a coroutine,
+    e.g. the database threads of asgi_app.py; default executor if None).
+    """
+    if run is None:
+        async def run(func, *args):
+            return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+    stored = await run(get_password_hash, username)
+    if stored is None:
+        return False
+    if is_hashed(stored):
+        if not await hashing.verify_password_async(stored, password):
+            return False
+    elif not _plaintext_matches(stored, password):
+        return False
+    if _needs_upgrade(stored):
+        try:
+            await run(update_password_hash, username, await hashing.hash_password_async(password))
+        except hashing.HashingBusy:
+            pass   # not urgent, it will be done at the next login
+    return True
+
+
+def _plaintext_matches(stored, password):
+    return hmac.compare_digest(stored.encode("utf-8"), password.encode("utf-8"))
+
+
+def _needs_upgrade(stored):
+    """Plaintext, or a hash made with an older cost."""
+    return not is_hashed(stored) or hashing.needs_rehash(stored)
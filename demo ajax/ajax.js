@@ -1,6 +1,7 @@
 villes = ["Valenciennes", "Denain", "Nantes"];
     
-villes.forEach(function(ville) {
+// Météo : seulement sur la page qui a une zone #resultats (index.php)
+if (document.getElementById("resultats")) villes.forEach(function(ville) {
 
     requete = new XMLHttpRequest();
     lien = 'https://api.weatherapi.com/v1/forecast.json?key=064012d2ca954542948141920262004&q=' + ville;
@@ -17,4 +18,38 @@ villes.forEach(function(ville) {
         }
     }
 
-});
\ No newline at end of file
+});
+
+
+// CONNEXION EN AJAX
+// =================
+// Le formulaire de connexion.html est envoyé à /connexion (app.py) sans
+// recharger la page. Le serveur répond un petit JSON :
+//   {"ok":true,"username":"..."} ou {"ok":false,"error":"..."}
+formulaire = document.getElementById("loginForm");
+
+if (formulaire) formulaire.addEventListener("submit", function(event) {
+    event.preventDefault();
+
+    requete = new XMLHttpRequest();
+    requete.open('POST', '/connexion');
+    // FormData -> corps multipart, lu côté Flask par request.form
+    requete.send(new FormData(formulaire));
+    requete.onreadystatechange = function(event) {
+        if (this.readyState == XMLHttpRequest.DONE) {
+            zone = document.getElementById("message");
+            try {
+                reponse = JSON.parse(this.responseText);
+            } catch (erreur) {
+                reponse = {ok: false, error: "réponse invalide (" + this.status + ")"};
+            }
+            if (reponse.ok) {
+                zone.textContent = "Connexion réussie ! Bienvenue " + reponse.username;
+            } else if (this.status === 401) {
+                zone.textContent = "Erreur : Identifiant ou mot de passe incorrect.";
+            } else {
+                zone.textContent = "Erreur : " + reponse.error;
+            }
+        }
+    }
+});